@@ -1,16 +1,35 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from ..memory import Memory
+from ..question_bank import reference_for
 from ..schemas import FinalFeedback, SoftSkills, GapItem
 
 
+# версия логики отчёта: поднимать при изменении правил/порогов ниже,
+# чтобы пакетный пересчёт (resummarize) понял, что старые отчёты устарели
+REPORT_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class Penalties:
+    """штрафы к уверенности за каждый сигнал (доля от 1.0); версия — в RuntimeConfig"""
+
+    offtopic: float = 0.05
+    hallucination: float = 0.15
+
+
+DEFAULT_PENALTIES = Penalties()
+
+
 @dataclass
 class HiringManagerAgent:
 
-    def summarize(self, profile: Dict[str, Any], memory: Memory) -> FinalFeedback:
+    def summarize(self, profile: Dict[str, Any], memory: Memory, penalties: Optional[Penalties] = None) -> FinalFeedback:
+        penalties = penalties or DEFAULT_PENALTIES
+
         # 1) Hard skills aggregation
         per_topic: Dict[str, List[Dict[str, Any]]] = {}
         for e in memory.evaluations:
@@ -35,7 +54,8 @@ class HiringManagerAgent:
                             f"Ответ оценен как {last['eval']} (coverage={last['coverage']}). "
                             f"Не хватило пунктов: {last['missing']}"
                         ),
-                        correct_answer=last["reference_answer"],
+                        # эталон разыменовываем только здесь, для финального отчёта
+                        correct_answer=reference_for(last),
                     )
                 )
 
@@ -78,7 +98,9 @@ class HiringManagerAgent:
         ratio = (correct / total) if total else 0.0
 
         # penalties: оффтоп и галлюцинации снижают доверие
-        penalty = (memory.signals.get("offtopic_count", 0) * 0.05) + (memory.signals.get("hallucination_flags", 0) * 0.15)
+        penalty = (memory.signals.get("offtopic_count", 0) * penalties.offtopic) + (
+            memory.signals.get("hallucination_flags", 0) * penalties.hallucination
+        )
         confidence = max(25, min(95, int((ratio * 100) - penalty * 100 + 40)))
 
         # очень простая оценка "уровня" (можно усложнить банком вопросов)
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from ..memory import Memory
-from ..question_bank import pick_question, Question
-from ..scoring import score_answer, estimate_clarity
+from ..question_bank import QUESTIONS, Question, position_key
+from ..selection import QuestionSelector
+from ..scoring import StreamingTurnScorer, score_turn
+from ..execution import StageExecutor, INLINE
 from ..llm.base import Message
+from ..llm.budget import LatencyBudget, agenerate_within_budget, generate_within_budget
+from ..llm.prompts import PromptTemplate, REGISTRY
+from ..usage import SessionUsage
 
 
 OBSERVER_SYSTEM = """Ты — Observer/ментор. Ты НЕ говоришь кандидату напрямую.
@@ -18,6 +27,30 @@ OBSERVER_SYSTEM = """Ты — Observer/ментор. Ты НЕ говоришь
 Верни только текст вопроса или короткий план.
 """
 
+# Порядок частей промпта важен для префикс-кэша сервера:
+# system + shared одинаковы для всех сессий профиля, session — для всех ходов сессии,
+# а всё, что меняется каждый ход, идет в suffix в самом конце.
+OBSERVER_TEMPLATE = REGISTRY.register(
+    PromptTemplate(
+        name="observer",
+        system=OBSERVER_SYSTEM,
+        shared=(
+            "Роль: технический интервьюер на позицию {grade} {position}.\n"
+            "Рубрика оценки: correct — покрыто большинство ключевых пунктов; partial — часть пунктов; "
+            "wrong — ключевые пункты не названы; unknown — кандидат признал незнание.\n"
+            "Шкала сложности 1..5: 1–2 — базовые определения, 3 — практика и компромиссы, "
+            "4–5 — проектирование и масштабирование."
+        ),
+        session="Вводные кандидата: position={position} exp={experience}",
+        suffix=(
+            "Текущая сложность={difficulty}\n"
+            "Сформулируй ОДИН вопрос для интервью.\n"
+            "Тема: {topic}; сложность ~{question_difficulty}.\n"
+            "Не повторяй недавно заданные темы: {recent_topics}.\n"
+        ),
+    )
+)
+
 
 @dataclass
 class ObserverPlan:
@@ -25,22 +58,145 @@ class ObserverPlan:
     internal_note: str
 
 
+def _adapt(memory: Memory, eval_label: str, last_question: Optional[Question]) -> Tuple[int, int, int, Optional[str]]:
+    """
+    Правила адаптивности без изменения памяти:
+    -> (correct_streak, incorrect_streak, difficulty_delta, preferred_topic)
+    """
+    correct, incorrect = memory.correct_streak, memory.incorrect_streak
+    if last_question is not None:
+        if eval_label == "correct":
+            correct, incorrect = correct + 1, 0
+        elif eval_label in ("wrong", "unknown"):
+            correct, incorrect = 0, incorrect + 1
+        else:
+            # partial: сбрасываем оба, чтобы не дергать сложность резко
+            correct, incorrect = 0, 0
+
+    delta = 0
+    if correct >= 2:
+        delta = 1
+    if incorrect >= 2:
+        delta = -1
+
+    # если кандидат "плывет" — дожимаем ту же тему
+    preferred_topic = None
+    if eval_label in ("wrong", "unknown") and last_question is not None:
+        preferred_topic = last_question.topic
+    elif memory.focus_topics:
+        # иначе — ещё не затронутая слабая тема из прошлых сессий
+        preferred_topic = next((t for t in memory.focus_topics if t not in memory.asked_topics), None)
+    return correct, incorrect, delta, preferred_topic
+
+
+@dataclass
+class _Draft:
+    """промежуточный итог хода до переформулировки вопроса LLM"""
+
+    flags: Dict[str, bool]
+    eval_label: str
+    coverage: float
+    difficulty_delta: int
+    preferred_topic: Optional[str]
+    route: str
+    role_reversal_answer: Optional[str]
+    next_q: Question
+    forced_route: str
+
+
+@dataclass
+class LiveAnswer:
+    """
+    Ответ, который ещё набирается/надиктовывается: оценка по кускам + предварительно выбранный вопрос.
+    key — (сложность, тема-дожим), при которых выбран question; если финальная оценка даст тот же key,
+    analyze_turn берет этот вопрос, а не выбирает заново.
+    rng_before/rng_after — состояние RNG сессии до и после выбора: предварительные выборы не сдвигают
+    последовательность seed'а, итог тот же, что без потоковой оценки.
+    """
+
+    scorer: StreamingTurnScorer
+    key: Optional[Tuple[int, Optional[str]]] = None
+    question: Optional[Question] = None
+    rng_before: Any = None
+    rng_after: Any = None
+
+
 class ObserverAgent:
 
-    def __init__(self, llm=None):
+    def __init__(
+        self,
+        llm=None,
+        budget: Optional[LatencyBudget] = None,
+        executor: Optional[StageExecutor] = None,
+    ):
         self.llm = llm  # опционально
+        # где считать CPU-стадию (скоринг): по умолчанию в текущем потоке
+        self.executor = executor or INLINE
+        # бюджет латентности LLM на ход: при превышении используем банковский вопрос
+        self.budget = budget or LatencyBudget.from_env()
+        # бюджет промпта в токенах: контекст интервью режется под него
+        self.prompt_token_budget = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "1500"))
+        self._executor: Optional[ThreadPoolExecutor] = None
 
-    def analyze_turn(
+    def _llm_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="observer-llm")
+        return self._executor
+
+    def _selector(self, memory: Memory) -> QuestionSelector:
+        if memory.selector is None:
+            questions = memory.bank.questions if memory.bank is not None else QUESTIONS
+            memory.selector = QuestionSelector(questions, seed=memory.selection_seed)
+        return memory.selector
+
+    def _pick_next(self, memory: Memory, key: Tuple[int, Optional[str]]) -> Question:
+        difficulty, preferred_topic = key
+        return self._selector(memory).pick(
+            difficulty=difficulty,
+            asked_ids=memory.asked_question_ids,
+            asked_topics=memory.asked_topics,
+            preferred_topic=preferred_topic,
+        )
+
+    def begin_answer(self, last_question: Optional[Question]) -> LiveAnswer:
+        return LiveAnswer(scorer=StreamingTurnScorer(last_question))
+
+    def feed_answer(self, memory: Memory, live: LiveAnswer, chunk: str) -> Dict[str, Any]:
+        """
+        Очередной кусок ответа: обновляем оценку и, если она сменила ветку адаптивности,
+        заново выбираем следующий вопрос. Память не меняется — всё фиксирует analyze_turn.
+        """
+        cpu = live.scorer.feed(chunk)
+        question = live.scorer.question
+        label = cpu["score"]["label"] if cpu["score"] is not None else "unknown"
+        _, _, delta, preferred_topic = _adapt(memory, label, question)
+        key = (max(1, min(5, memory.difficulty + delta)), preferred_topic)
+        if key != live.key:
+            selector = self._selector(memory)
+            if live.key is None:
+                live.rng_before = selector.getstate()
+            else:
+                selector.setstate(live.rng_before)
+            live.key = key
+            live.question = self._pick_next(memory, key)
+            live.rng_after = selector.getstate()
+        return {
+            **cpu,
+            "next_qid": live.question.qid if live.question is not None else None,
+        }
+
+    def _apply(
         self,
-        profile: Dict[str, Any],
         memory: Memory,
         last_question: Optional[Question],
         user_answer: str,
-        forced_route: str = "evaluate",
-        router_flags: Optional[Dict[str, bool]] = None,
-    ) -> ObserverPlan:
-
-        router_flags = router_flags or {}
+        cpu: Dict[str, Any],
+        forced_route: str,
+        router_flags: Dict[str, bool],
+        live: Optional[LiveAnswer],
+        live_scored: bool,
+    ) -> _Draft:
+        """всё, что не ждёт ни CPU-пула, ни LLM: обновление памяти и выбор следующего вопроса"""
 
         # 1) фиксируем флаги для отчета/логов (Observer доверяет Router)
         flags = {
@@ -49,8 +205,8 @@ class ObserverAgent:
             "role_reversal": bool(router_flags.get("role_reversal", False)),
         }
 
-        # 2) soft-signal: ясность ответа
-        memory.signals["clarity_votes"].append(estimate_clarity(user_answer))
+        # soft-signal: ясность ответа
+        memory.signals["clarity_votes"].append(cpu["clarity"])
 
         # Доп. счётчики “поведения”
         if flags["role_reversal"]:
@@ -67,7 +223,7 @@ class ObserverAgent:
         missing: list[str] = []
 
         if last_question is not None:
-            sc = score_answer(user_answer, last_question.expected_points)
+            sc = cpu["score"]
             eval_label = sc["label"]
             coverage = sc["coverage"]
             missing = sc["missing"]
@@ -82,29 +238,15 @@ class ObserverAgent:
                     "eval": eval_label,
                     "coverage": coverage,
                     "missing": missing,
-                    "reference_answer": last_question.reference_answer,
+                    # эталон не копируем: для внешнего банка — смещение в таблице строк
+                    **last_question.reference_fields(),
                 }
             )
 
-            # 4) обновляем streak'и для адаптивности
-            if eval_label == "correct":
-                memory.correct_streak += 1
-                memory.incorrect_streak = 0
-            elif eval_label in ("wrong", "unknown"):
-                memory.incorrect_streak += 1
-                memory.correct_streak = 0
-            else:
-                # partial: сбрасываем оба, чтобы не дергать сложность резко
-                memory.correct_streak = 0
-                memory.incorrect_streak = 0
-
-        # 5) адаптивность сложности
-        difficulty_delta = 0
-        if memory.correct_streak >= 2:
-            difficulty_delta = 1
-        if memory.incorrect_streak >= 2:
-            difficulty_delta = -1
-
+        # 4-5) streak'и и адаптивность сложности
+        memory.correct_streak, memory.incorrect_streak, difficulty_delta, preferred_topic = _adapt(
+            memory, eval_label, last_question
+        )
         memory.bump_difficulty(difficulty_delta)
 
         # 6) преобразуем forced_route в route для Interviewer
@@ -124,64 +266,177 @@ class ObserverAgent:
                 "По микросервисам: часто есть смешанная архитектура — часть монолита + отдельные сервисы вокруг критичных доменов."
             )
 
-        # 7) если кандидат "плывет"
-        preferred_topic = None
-        if eval_label in ("wrong", "unknown") and last_question is not None:
-            preferred_topic = last_question.topic
-
-        # 8) выбираем следующий вопрос из банка
-        next_q = pick_question(
-            difficulty=memory.difficulty,
-            asked_ids=memory.asked_question_ids,
-            asked_topics=memory.asked_topics,
-            preferred_topic=preferred_topic,
-        )
+        # 7-8) выбираем следующий вопрос из банка (preferred_topic — если кандидат "плывет");
+        # вопрос, выбранный заранее по ходу ответа, годится, если ветка адаптивности та же
+        key = (memory.difficulty, preferred_topic)
+        if live_scored and live is not None and live.key == key and live.question is not None:
+            next_q = live.question
+            self._selector(memory).setstate(live.rng_after)
+        else:
+            if live is not None and live.key is not None:
+                self._selector(memory).setstate(live.rng_before)
+            next_q = self._pick_next(memory, key)
 
         # отмечаем, что этот вопрос мы собираемся задавать
         memory.asked_question_ids.append(next_q.qid)
         memory.asked_topics.append(next_q.topic)
 
-        # 9) (опционально) попросим LLM переформулировать вопрос, чтобы он звучал "по-человечески”"
-        next_question_text = next_q.text
-        if self.llm is not None and route == "next_question":
-            prompt_user = (
-                f"Вводные: position={profile['position']} grade={profile['target_grade']} exp={profile['experience']}\n"
-                f"Текущая сложность={memory.difficulty}\n"
-                f"Сформулируй ОДИН вопрос для интервью.\n"
-                f"Тема: {next_q.topic}; сложность ~{next_q.difficulty}.\n"
-                f"Не повторяй недавно заданные темы: {memory.asked_topics[-6:]}.\n"
-            )
-            try:
-                llm_text = self.llm.generate(
-                    [Message("system", OBSERVER_SYSTEM), Message("user", prompt_user)],
-                    temperature=0.2,
-                )
-                # минимальная валидация: вопрос должен быть вопросом и не слишком длинным
-                if "?" in llm_text and 10 < len(llm_text.strip()) < 400:
-                    next_question_text = llm_text.strip()
-            except Exception:
-                # если LLM упала — просто используем банковский вопрос
-                pass
+        return _Draft(
+            flags=flags,
+            eval_label=eval_label,
+            coverage=coverage,
+            difficulty_delta=difficulty_delta,
+            preferred_topic=preferred_topic,
+            route=route,
+            role_reversal_answer=role_reversal_answer,
+            next_q=next_q,
+            forced_route=forced_route,
+        )
+
+    def _rephrase_messages(self, profile: Dict[str, Any], memory: Memory, next_q: Question) -> List[Message]:
+        # общий префикс — по ключу позиции: "Backend Developer" и "Python backend" делят одну запись и один кэш сервера
+        prefix = REGISTRY.prefix("observer", position=position_key(profile["position"]), grade=profile["target_grade"])
+        prefix.append(OBSERVER_TEMPLATE.render_session(position=profile["position"], experience=profile["experience"]))
+        prompt_suffix = OBSERVER_TEMPLATE.render_suffix(
+            difficulty=memory.difficulty,
+            topic=next_q.topic,
+            question_difficulty=next_q.difficulty,
+            recent_topics=memory.asked_topics[-6:],
+        )
+        return memory.context.build_messages(
+            prefix=prefix,
+            suffix=prompt_suffix,
+            token_budget=self.prompt_token_budget,
+        )
+
+    @staticmethod
+    def _accept(next_q: Question, llm_text: Optional[str]) -> Tuple[str, str]:
+        # минимальная валидация: вопрос должен быть вопросом и не слишком длинным
+        if llm_text is not None and "?" in llm_text and 10 < len(llm_text.strip()) < 400:
+            return llm_text.strip(), "ok"
+        return next_q.text, "fallback"
 
+    def _plan(self, memory: Memory, d: _Draft, next_question_text: str, llm_status: Optional[str]) -> ObserverPlan:
         # 10) готовим "план" для Interviewer
         plan: Dict[str, Any] = {
-            "eval": eval_label,
-            "coverage": round(coverage, 2),
-            "flags": flags,
-            "route": route,
-            "difficulty_delta": difficulty_delta,
+            "eval": d.eval_label,
+            "coverage": round(d.coverage, 2),
+            "flags": d.flags,
+            "route": d.route,
+            "difficulty_delta": d.difficulty_delta,
             "difficulty_now": memory.difficulty,
-            "preferred_topic": preferred_topic,
+            "preferred_topic": d.preferred_topic,
             "next_question": next_question_text,
         }
-        if role_reversal_answer:
-            plan["role_reversal_answer"] = role_reversal_answer
+        if d.role_reversal_answer:
+            plan["role_reversal_answer"] = d.role_reversal_answer
 
         # 11) короткая внутренняя заметка для лога (то, что будет видно жюри)
         internal_note = (
-            f"eval={eval_label} coverage={round(coverage,2)} "
+            f"eval={d.eval_label} coverage={round(d.coverage,2)} "
             f"streak(c/i)={memory.correct_streak}/{memory.incorrect_streak} "
-            f"router_route={forced_route} flags={flags} diff={memory.difficulty} -> next={next_q.qid}"
+            f"router_route={d.forced_route} flags={d.flags} diff={memory.difficulty} -> next={d.next_q.qid}"
         )
+        if llm_status is not None:
+            internal_note += f" llm={llm_status}"
 
         return ObserverPlan(plan=plan, internal_note=internal_note)
+
+    def analyze_turn(
+        self,
+        profile: Dict[str, Any],
+        memory: Memory,
+        last_question: Optional[Question],
+        user_answer: str,
+        forced_route: str = "evaluate",
+        router_flags: Optional[Dict[str, bool]] = None,
+        allow_llm: bool = True,
+        live: Optional[LiveAnswer] = None,
+        usage: Optional[SessionUsage] = None,
+    ) -> ObserverPlan:
+        # live — ответ, оцененный по кускам (feed_answer); если текст совпал, повторно не скорим
+        # usage — расходы сессии: CPU скоринга и вызовы LLM
+
+        # 2) CPU-стадия: ясность ответа + оценка ответа на прошлый вопрос (если он был)
+        live_scored = live is not None and live.scorer.question is last_question and live.scorer.text == user_answer
+        if live_scored:
+            cpu = live.scorer.snapshot()
+        else:
+            wall0 = time.perf_counter()
+            cpu, cpu_s = self.executor.call_timed(
+                score_turn,
+                user_answer,
+                last_question,
+            )
+            if usage is not None:
+                usage.add_stage("score", time.perf_counter() - wall0, cpu_s)
+
+        with usage.stage("plan") if usage is not None else nullcontext():
+            d = self._apply(memory, last_question, user_answer, cpu, forced_route, router_flags or {}, live, live_scored)
+
+        # 9) (опционально) попросим LLM переформулировать вопрос, чтобы он звучал "по-человечески”"
+        next_question_text = d.next_q.text
+        llm_status = None
+        if self.llm is not None and d.route == "next_question" and not allow_llm:
+            # перегрузка: планировщик снял LLM с этого хода — сразу банковский вопрос
+            llm_status = "shed"
+        elif self.llm is not None and d.route == "next_question":
+            # если LLM не уложилась в бюджет или упала — просто используем банковский вопрос
+            llm_text = generate_within_budget(
+                self.llm,
+                self._rephrase_messages(profile, memory, d.next_q),
+                executor=self._llm_executor(),
+                budget=self.budget,
+                temperature=0.2,
+                stage="observer.rephrase",
+                usage=usage,
+            )
+            next_question_text, llm_status = self._accept(d.next_q, llm_text)
+
+        return self._plan(memory, d, next_question_text, llm_status)
+
+    async def analyze_turn_async(
+        self,
+        profile: Dict[str, Any],
+        memory: Memory,
+        last_question: Optional[Question],
+        user_answer: str,
+        forced_route: str = "evaluate",
+        router_flags: Optional[Dict[str, bool]] = None,
+        allow_llm: bool = True,
+        live: Optional[LiveAnswer] = None,
+        usage: Optional[SessionUsage] = None,
+    ) -> ObserverPlan:
+        """
+        То же, что analyze_turn, для asyncio: скоринг ждём через StageExecutor.run, LLM — через
+        agenerate_within_budget; event loop в это время обслуживает другие сессии.
+        """
+        live_scored = live is not None and live.scorer.question is last_question and live.scorer.text == user_answer
+        if live_scored:
+            cpu = live.scorer.snapshot()
+        else:
+            wall0 = time.perf_counter()
+            cpu, cpu_s = await self.executor.run_timed(score_turn, user_answer, last_question)
+            if usage is not None:
+                usage.add_stage("score", time.perf_counter() - wall0, cpu_s)
+
+        with usage.stage("plan") if usage is not None else nullcontext():
+            d = self._apply(memory, last_question, user_answer, cpu, forced_route, router_flags or {}, live, live_scored)
+
+        next_question_text = d.next_q.text
+        llm_status = None
+        if self.llm is not None and d.route == "next_question" and not allow_llm:
+            llm_status = "shed"
+        elif self.llm is not None and d.route == "next_question":
+            llm_text = await agenerate_within_budget(
+                self.llm,
+                self._rephrase_messages(profile, memory, d.next_q),
+                executor=self._llm_executor(),
+                budget=self.budget,
+                temperature=0.2,
+                stage="observer.rephrase",
+                usage=usage,
+            )
+            next_question_text, llm_status = self._accept(d.next_q, llm_text)
+
+        return self._plan(memory, d, next_question_text, llm_status)
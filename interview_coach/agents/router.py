@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 import re
 
+from .router_model import ROUTES, RouterBackend
+
 
 # команды остановки интервью
 STOP_PATTERNS = [
@@ -19,6 +21,20 @@ def is_stop(text: str) -> bool:
     return any(re.search(p, t) for p in STOP_PATTERNS)
 
 
+@dataclass(frozen=True)
+class RouterRules:
+    """ключевые слова эвристик маршрутизации (подстроки в нижнем регистре); версия — в RuntimeConfig"""
+
+    offtopic: Tuple[str, ...] = ("погода", "дожд", "снег", "политик", "выбор", "котик", "мем", "анекдот")
+    # ловушка: "Python 4.0 уберут for..."
+    hallucination: Tuple[str, ...] = ("python 4.0", "уберут циклы for", "циклы for уберут", "заменят на нейронные связи")
+    # role reversal — кандидат задаёт вопросы про работу/процессы/стек
+    role_reversal: Tuple[str, ...] = ("какие задачи", "испытатель", "микросервис", "стек", "команда", "процессы")
+
+
+DEFAULT_RULES = RouterRules()
+
+
 @dataclass
 class RouteDecision:
     route: str  # stop | role_reversal | hallucination | offtopic | evaluate
@@ -26,31 +42,78 @@ class RouteDecision:
     note: str
 
 
+_NOTES = {
+    "role_reversal": "Candidate asked about the job; answer briefly then resume interview.",
+    "hallucination": "Detected likely false/absurd claim; challenge politely and continue.",
+    "offtopic": "Off-topic detected; steer back to interview.",
+    "evaluate": "Proceed with evaluation & next question selection.",
+}
+
+
 class RouterAgent:
+    """
+    Маршрутизация реплики кандидата.
+    backend — локальный классификатор (например, HashedLinearRouter): если он уверен хотя бы
+    на min_confidence, решает он; иначе — прежние правила по ключевым словам.
+    """
 
-    def decide(self, user_text: str) -> RouteDecision:
-        t = user_text.strip().lower()
+    def __init__(self, backend: Optional[RouterBackend] = None, min_confidence: float = 0.8):
+        self.backend = backend
+        self.min_confidence = min_confidence
 
+    def decide(self, user_text: str, rules: Optional[RouterRules] = None) -> RouteDecision:
+        """rules — ключевые слова версии конфигурации, к которой привязана сессия (None — встроенные)"""
         # 1) стоп — сразу финальный отчёт
         if is_stop(user_text):
             return RouteDecision("stop", {"stop": True}, "User requested to stop interview.")
+        prediction = self.backend.predict(user_text) if self.backend is not None else None
+        return self._decide(user_text, prediction, rules)
+
+    def decide_many(self, texts: Sequence[str], rules: Optional[RouterRules] = None) -> List[RouteDecision]:
+        """пакетная маршрутизация (replay, переразметка логов): модель вызывается одним пакетом"""
+        todo = [i for i, t in enumerate(texts) if not is_stop(t)]
+        preds: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+        if self.backend is not None and todo:
+            for i, p in zip(todo, self.backend.predict_many([texts[i] for i in todo])):
+                preds[i] = p
+        return [
+            RouteDecision("stop", {"stop": True}, "User requested to stop interview.")
+            if is_stop(t)
+            else self._decide(t, preds[i], rules)
+            for i, t in enumerate(texts)
+        ]
+
+    def _decide(
+        self,
+        user_text: str,
+        prediction: Optional[Tuple[str, float]],
+        rules: Optional[RouterRules] = None,
+    ) -> RouteDecision:
+        if prediction is not None:
+            route, confidence = prediction
+            if route in ROUTES and confidence >= self.min_confidence:
+                flags = {k: route == k for k in ("offtopic", "hallucination", "role_reversal")}
+                return RouteDecision(route, flags, f"{_NOTES[route]} (model p={confidence:.2f})")
+        return self.decide_by_rules(user_text, rules)
+
+    def decide_by_rules(self, user_text: str, rules: Optional[RouterRules] = None) -> RouteDecision:
+        t = user_text.strip().lower()
+        rules = rules or DEFAULT_RULES
 
         # 2) простые эвристики для робастности
         flags = {
-            "offtopic": any(k in t for k in ["погода", "дожд", "снег", "политик", "выбор", "котик", "мем", "анекдот"]),
-            # ловушка: "Python 4.0 уберут for..."
-            "hallucination": any(k in t for k in ["python 4.0", "уберут циклы for", "циклы for уберут", "заменят на нейронные связи"]),
-            # role reversal — кандидат задаёт вопросы про работу/процессы/стек
-            "role_reversal": ("?" in t) and any(k in t for k in ["какие задачи", "испытатель", "микросервис", "стек", "команда", "процессы"]),
+            "offtopic": any(k in t for k in rules.offtopic),
+            "hallucination": any(k in t for k in rules.hallucination),
+            "role_reversal": ("?" in t) and any(k in t for k in rules.role_reversal),
         }
 
         # 3) приоритеты: сначала role reversal, потом галлюцинации, потом оффтоп
         if flags["role_reversal"]:
-            return RouteDecision("role_reversal", flags, "Candidate asked about the job; answer briefly then resume interview.")
+            return RouteDecision("role_reversal", flags, _NOTES["role_reversal"])
         if flags["hallucination"]:
-            return RouteDecision("hallucination", flags, "Detected likely false/absurd claim; challenge politely and continue.")
+            return RouteDecision("hallucination", flags, _NOTES["hallucination"])
         if flags["offtopic"]:
-            return RouteDecision("offtopic", flags, "Off-topic detected; steer back to interview.")
+            return RouteDecision("offtopic", flags, _NOTES["offtopic"])
 
         # 4) стандартный путь: техническая оценка + следующий вопрос
-        return RouteDecision("evaluate", flags, "Proceed with evaluation & next question selection.")
+        return RouteDecision("evaluate", flags, _NOTES["evaluate"])
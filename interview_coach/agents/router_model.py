@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+# классы, которые различает модель; stop остается за точными правилами (is_stop)
+ROUTES: Tuple[str, ...] = ("evaluate", "offtopic", "hallucination", "role_reversal")
+
+_WS = re.compile(r"\s+")
+_WORD = re.compile(r"[\w.]+")
+
+
+class RouterBackend(Protocol):
+    """модель маршрутизации: (route, уверенность 0..1) или None, если сказать нечего"""
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        ...
+
+    def predict_many(self, texts: Sequence[str]) -> List[Optional[Tuple[str, float]]]:
+        ...
+
+
+def features(text: str, dim: int) -> List[int]:
+    """
+    Хэшированные признаки сообщения (без словаря — модель не растет с корпусом):
+    слова, пары слов, символьные 3-граммы слов (ловят словоформы: "погода/погоду/погоды") и "?".
+    crc32, а не hash(): индексы одинаковые во всех процессах.
+    """
+    t = _WS.sub(" ", text.strip().lower())
+    words = _WORD.findall(t)
+    feats = ["bias"]
+    if "?" in t:
+        feats.append("has:?")
+    feats.extend("w:" + w for w in words)
+    feats.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f" {w} "
+        feats.extend("c:" + padded[i: i + 3] for i in range(len(padded) - 2))
+    mask = dim - 1
+    return sorted({zlib.crc32(f.encode("utf-8")) & mask for f in feats})
+
+
+class HashedLinearRouter:
+    """
+    Линейная модель (multinomial logistic regression) на хэшированных признаках.
+    Веса хранятся разреженно: признак -> веса по классам; предсказание — несколько десятков
+    обращений к dict, т.е. десятки микросекунд на сообщение на CPU.
+    """
+
+    def __init__(self, dim: int = 1 << 18, classes: Sequence[str] = ROUTES):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.dim = dim
+        self.classes: Tuple[str, ...] = tuple(classes)
+        self.weights: Dict[int, List[float]] = {}
+
+    def _probs(self, feats: Iterable[int]) -> List[float]:
+        k = len(self.classes)
+        scores = [0.0] * k
+        for f in feats:
+            w = self.weights.get(f)
+            if w is not None:
+                for c in range(k):
+                    scores[c] += w[c]
+        top = max(scores)
+        exp = [math.exp(s - top) for s in scores]
+        total = sum(exp)
+        return [e / total for e in exp]
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        if not self.weights:
+            return None
+        probs = self._probs(features(text, self.dim))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.classes[best], probs[best]
+
+    def predict_many(self, texts: Sequence[str]) -> List[Optional[Tuple[str, float]]]:
+        """пакетный режим для replay/переразметки логов"""
+        return [self.predict(t) for t in texts]
+
+    def fit(
+        self,
+        samples: Sequence[Tuple[str, str]],
+        epochs: int = 12,
+        lr: float = 0.3,
+        l2: float = 1e-5,
+        seed: int = 0,
+    ) -> "HashedLinearRouter":
+        """SGD по (текст, route); route вне classes пропускаются"""
+        index = {c: i for i, c in enumerate(self.classes)}
+        data = [(features(t, self.dim), index[r]) for t, r in samples if r in index]
+        rnd = random.Random(seed)
+        k = len(self.classes)
+        for epoch in range(epochs):
+            rnd.shuffle(data)
+            step = lr / (1 + epoch)
+            for feats, y in data:
+                probs = self._probs(feats)
+                for f in feats:
+                    w = self.weights.get(f)
+                    if w is None:
+                        w = self.weights[f] = [0.0] * k
+                    for c in range(k):
+                        grad = probs[c] - (1.0 if c == y else 0.0)
+                        w[c] -= step * (grad + l2 * w[c])
+        # почти нулевые веса не храним
+        self.weights = {f: w for f, w in self.weights.items() if max(abs(x) for x in w) > 1e-4}
+        return self
+
+    def save(self, path: str) -> None:
+        data = {
+            "dim": self.dim,
+            "classes": list(self.classes),
+            "weights": {str(f): [round(x, 6) for x in w] for f, w in self.weights.items()},
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLinearRouter":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        model = cls(dim=int(data["dim"]), classes=data["classes"])
+        model.weights = {int(f): [float(x) for x in w] for f, w in data["weights"].items()}
+        return model
+
+
+_ROUTE_IN_LOG = re.compile(r"^\[Router\]: route=(\w+)", re.MULTILINE)
+
+
+def samples_from_logs(logs: Iterable[object]) -> List[Tuple[str, str]]:
+    """
+    (сообщение кандидата, route) из InterviewLog: берется route, записанный Router'ом в internal_thoughts.
+    Это разметка правилами — для обучения её дополняют/поправляют ручной разметкой (labels JSONL).
+    """
+    out: List[Tuple[str, str]] = []
+    for log in logs:
+        for turn in getattr(log, "turns", []):
+            m = _ROUTE_IN_LOG.search(turn.internal_thoughts)
+            if m:
+                out.append((turn.user_message, m.group(1)))
+    return out
+
+
+def samples_from_labels(path: str) -> List[Tuple[str, str]]:
+    """ручная разметка: JSONL со строками {"text": ..., "route": ...}"""
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                out.append((rec["text"], rec["route"]))
+    return out
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .schemas import InterviewLog
+from .log_store import atomic_write_text, check_session_id, dump_log
+
+
+def _zstd():
+    # zstandard нужен только для архива — импортируем лениво
+    try:
+        import zstandard
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("Log archive requires the 'zstandard' package: pip install zstandard") from e
+    return zstandard
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    session_id: str
+    participant_name: str
+    date: str  # YYYY-MM-DD (дата архивации завершенной сессии)
+    bundle: str  # "" — сессия ещё не свернута (лежит в pending/)
+    offset: int
+    length: int
+
+
+class LogArchive:
+    """
+    Архив завершенных интервью.
+
+    root/
+      pending/<date>__<session_id>.json — завершенные сессии, ещё не попавшие в бандл
+      rolling/<bundle>/...              — сессии, забранные сворачиванием, которое идет прямо сейчас
+      bundles/<bundle>.zst              — склеенные zstd-фреймы, по одному на сессию
+      bundles/<bundle>.dict             — словарь, обученный на сессиях этого бандла
+      index.sqlite                      — где лежит каждая сессия (поиск по участнику/дате)
+
+    Каждая сессия — отдельный фрейм, поэтому чтение одной сессии = seek + распаковка одного фрейма.
+    Общий словарь забирает повторяющиеся куски (reference answers, internal_thoughts, ключи JSON).
+
+    add() только кладет файл в pending/ — ход кандидата не ждёт сжатия. Сворачивает roll():
+    скрипт archive_logs (roll/watch) или фоновый поток start(). Несколько процессов могут сворачивать
+    один архив одновременно: файл забирается переименованием в rolling/<bundle>/, и достается ровно одному.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        bundle_size: int = 256,
+        dict_size: int = 64 * 1024,
+        level: int = 19,
+        poll_s: float = 60.0,
+        stale_s: float = 3600.0,
+    ):
+        self.root = Path(root)
+        self.bundle_size = bundle_size
+        self.dict_size = dict_size
+        self.level = level
+        # фоновый поток: раз в poll_s сворачивает, если накопилось bundle_size сессий
+        self.poll_s = poll_s
+        # rolling/<bundle> старше stale_s — след упавшего сворачивания, его файлы возвращаем в pending/
+        self.stale_s = stale_s
+
+        self.pending_dir = self.root / "pending"
+        self.rolling_dir = self.root / "rolling"
+        self.bundles_dir = self.root / "bundles"
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        self.rolling_dir.mkdir(parents=True, exist_ok=True)
+        self.bundles_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+        self._dicts: Dict[str, Optional[bytes]] = {}
+        with self._index() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " session_id TEXT PRIMARY KEY,"
+                " participant_name TEXT NOT NULL,"
+                " date TEXT NOT NULL,"
+                " bundle TEXT NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " length INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_participant ON entries(participant_name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_date ON entries(date)")
+
+    @contextmanager
+    def _index(self) -> Iterator[sqlite3.Connection]:
+        """соединение с индексом на один блок: commit при успехе, и всегда close"""
+        conn = sqlite3.connect(str(self.root / "index.sqlite"), timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- запись ---
+
+    def add(self, session_id: str, log: InterviewLog, date: Optional[str] = None) -> int:
+        """кладем завершенную сессию в очередь на сворачивание; возвращает число записанных байт"""
+        check_session_id(session_id)
+        date = date or dt.date.today().isoformat()
+        return atomic_write_text(self.pending_dir / f"{date}__{session_id}.json", dump_log(log))
+
+    def pending_count(self) -> int:
+        return sum(1 for _ in self.pending_dir.glob("*.json"))
+
+    def roll(self, min_sessions: int = 1) -> Optional[str]:
+        """
+        сворачиваем ожидающие сессии в новый бандл, возвращаем его имя;
+        None — ожидающих меньше min_sessions (или их забрал другой процесс)
+        """
+        with self._lock:
+            self._reclaim_stale()
+            files = sorted(self.pending_dir.glob("*.json"))
+            if not files or len(files) < min_sessions:
+                return None
+
+            bundle = f"bundle-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.time_ns() % 10**9:09d}"
+            staging = self.rolling_dir / bundle
+            staging.mkdir()
+            claimed = []
+            for f in files:
+                try:
+                    os.rename(f, staging / f.name)
+                except FileNotFoundError:
+                    continue  # файл уже забрал другой процесс
+                claimed.append(staging / f.name)
+            if not claimed:
+                staging.rmdir()
+                return None
+
+            try:
+                rows = self._write_bundle(bundle, claimed)
+                with self._index() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (session_id, participant_name, date, bundle, offset, length) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except BaseException:
+                # бандл не попал в индекс — сессии возвращаются в очередь, недописанные файлы удаляем
+                for suffix in (".zst", ".dict"):
+                    try:
+                        (self.bundles_dir / f"{bundle}{suffix}").unlink()
+                    except FileNotFoundError:
+                        pass
+                self._unstage(staging)
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+            return bundle
+
+    def _write_bundle(self, bundle: str, files: List[Path]) -> List[tuple]:
+        zstd = _zstd()
+        samples = [f.read_bytes() for f in files]
+
+        # словарь обучаем на самих сессиях бандла; если образцов мало — сжимаем без словаря
+        dict_data: Optional[bytes] = None
+        try:
+            dict_data = zstd.train_dictionary(self.dict_size, samples).as_bytes()
+        except Exception:
+            dict_data = None
+
+        cctx = zstd.ZstdCompressor(
+            level=self.level,
+            dict_data=zstd.ZstdCompressionDict(dict_data) if dict_data else None,
+        )
+
+        # словарь пишем до бандла: читатель, нашедший сессию в индексе, всегда найдет и словарь
+        if dict_data:
+            (self.bundles_dir / f"{bundle}.dict").write_bytes(dict_data)
+        rows = []
+        offset = 0
+        with open(self.bundles_dir / f"{bundle}.zst", "wb") as out:
+            for f, raw in zip(files, samples):
+                date, _, session_id = f.stem.partition("__")
+                frame = cctx.compress(raw)
+                out.write(frame)
+                participant = InterviewLog.model_validate_json(raw).participant_name
+                rows.append((session_id, participant, date, bundle, offset, len(frame)))
+                offset += len(frame)
+        return rows
+
+    def _unstage(self, staging: Path) -> None:
+        for f in staging.glob("*.json"):
+            try:
+                os.replace(f, self.pending_dir / f.name)
+            except FileNotFoundError:
+                pass  # тот же каталог разбирает другой процесс
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def _reclaim_stale(self) -> None:
+        """
+        сворачивание упало посреди работы: если бандл успел попасть в индекс — остатки просто удаляем,
+        иначе возвращаем сессии в pending/
+        """
+        now = time.time()
+        for staging in self.rolling_dir.iterdir():
+            try:
+                if now - staging.stat().st_mtime < self.stale_s:
+                    continue
+            except FileNotFoundError:
+                continue
+            with self._index() as conn:
+                indexed = conn.execute("SELECT 1 FROM entries WHERE bundle = ? LIMIT 1", (staging.name,)).fetchone()
+            if indexed:
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                self._unstage(staging)
+
+    # --- фоновое сворачивание ---
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            try:
+                self.roll(min_sessions=self.bundle_size)
+                self.last_error = None
+            except Exception as e:
+                # сессии остались в pending/ — попробуем на следующем цикле
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def start(self) -> "LogArchive":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="log-archive-roll", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- чтение ---
+
+    def find(
+        self,
+        participant: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> List[ArchiveEntry]:
+        """поиск по индексу, без чтения бандлов; ещё не свернутые сессии — по файлам в pending/"""
+        where, args = [], []
+        if participant is not None:
+            where.append("participant_name = ?")
+            args.append(participant)
+        if date_from is not None:
+            where.append("date >= ?")
+            args.append(date_from)
+        if date_to is not None:
+            where.append("date <= ?")
+            args.append(date_to)
+        sql = "SELECT session_id, participant_name, date, bundle, offset, length FROM entries"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._index() as conn:
+            entries = {row[0]: ArchiveEntry(*row) for row in conn.execute(sql, args).fetchall()}
+
+        for path in self._unrolled():
+            date, _, session_id = path.stem.partition("__")
+            if session_id in entries:
+                continue
+            if (date_from is not None and date < date_from) or (date_to is not None and date > date_to):
+                continue
+            try:
+                name = InterviewLog.model_validate_json(path.read_bytes()).participant_name
+            except FileNotFoundError:
+                continue  # как раз свернули — в индекс попадет уже следующим find()
+            if participant is None or name == participant:
+                entries[session_id] = ArchiveEntry(session_id, name, date, "", 0, 0)
+        return sorted(entries.values(), key=lambda e: (e.date, e.session_id))
+
+    def _unrolled(self, session_id: str = "*") -> List[Path]:
+        pattern = f"*__{session_id}.json"
+        return sorted(self.pending_dir.glob(pattern)) + sorted(self.rolling_dir.glob(f"*/{pattern}"))
+
+    def _lookup(self, session_id: str) -> Optional[ArchiveEntry]:
+        with self._index() as conn:
+            row = conn.execute(
+                "SELECT session_id, participant_name, date, bundle, offset, length FROM entries WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return ArchiveEntry(*row) if row else None
+
+    def get(self, session_id: str) -> Optional[InterviewLog]:
+        entry = self._lookup(session_id)
+        if entry is not None:
+            return self.read(entry)
+        return self._read_unrolled(session_id)
+
+    def _read_unrolled(self, session_id: str) -> Optional[InterviewLog]:
+        check_session_id(session_id)
+        for path in self._unrolled(session_id):
+            try:
+                return InterviewLog.model_validate_json(path.read_bytes())
+            except FileNotFoundError:
+                continue
+        # файл мог уйти в бандл между чтением индекса и pending/
+        entry = self._lookup(session_id)
+        return self.read(entry) if entry is not None else None
+
+    def read(self, entry: ArchiveEntry) -> InterviewLog:
+        """читаем и распаковываем ровно один фрейм сессии"""
+        if not entry.bundle:
+            log = self._read_unrolled(entry.session_id)
+            if log is None:
+                raise FileNotFoundError(f"session {entry.session_id} is no longer in the archive")
+            return log
+
+        zstd = _zstd()
+        with open(self.bundles_dir / f"{entry.bundle}.zst", "rb") as f:
+            f.seek(entry.offset)
+            frame = f.read(entry.length)
+
+        dict_data = self._bundle_dict(entry.bundle)
+        dctx = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(dict_data) if dict_data else None)
+        return InterviewLog.model_validate_json(dctx.decompress(frame))
+
+    def iter_logs(self, **filters) -> Iterator[InterviewLog]:
+        for entry in self.find(**filters):
+            yield self.read(entry)
+
+    def _bundle_dict(self, bundle: str) -> Optional[bytes]:
+        if bundle not in self._dicts:
+            p = self.bundles_dir / f"{bundle}.dict"
+            self._dicts[bundle] = p.read_bytes() if p.exists() else None
+        return self._dicts[bundle]
@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 
 from .schemas import CandidateProfile
 from .logger import InterviewLogger
+from .log_store import open_store
 from .memory import Memory
 
 from .agents.router import RouterAgent
@@ -14,17 +15,33 @@ from .agents.interviewer import InterviewerAgent
 from .agents.hiring_manager import HiringManagerAgent
 
 from .orchestrator import Orchestrator
+from .execution import StageExecutor
+from .skills import SkillStore
+from .config import ConfigWatcher
 
 
 def build_llm():
     provider = os.getenv("LLM_PROVIDER", "").strip().lower()
+    cassette = os.getenv("LLM_CASSETTE", "").strip()
 
+    llm = None
     if provider == "openai_compat":
         from .llm.openai_compatible import OpenAICompatibleLLM
-        return OpenAICompatibleLLM()
+        llm = OpenAICompatibleLLM()
+    elif provider == "replay":
+        # ответы из записанной кассеты: без сети и без задержек
+        from .llm.cassette import ReplayLLM
+        if not cassette:
+            raise ValueError("LLM_PROVIDER=replay requires LLM_CASSETTE=<path>")
+        return ReplayLLM(cassette, match=os.getenv("LLM_REPLAY_MATCH", "strict").strip().lower())
 
     # Можно добавить сюда другие провайдеры при желании.
-    return None
+
+    # LLM_CASSETTE у живого провайдера — записываем пары запрос/ответ для последующего replay
+    if llm is not None and cassette:
+        from .llm.cassette import RecordingLLM
+        llm = RecordingLLM(llm, cassette)
+    return llm
 
 
 def main():
@@ -45,16 +62,35 @@ def main():
         experience=experience,
     )
 
-    # Лог по ТЗ
+    # Лог по ТЗ: по умолчанию один файл, LOG_STORE=sqlite:<path>|sharded:<dir> — общее хранилище сессий
     log_path = os.getenv("LOG_PATH", "interview_log.json")
-    logger = InterviewLogger(log_path)
+    log_store = os.getenv("LOG_STORE", "").strip()
+    log_archive = os.getenv("LOG_ARCHIVE", "").strip()
+    archive = None
+    if log_archive:
+        from .archive import LogArchive
+        archive = LogArchive(log_archive)
+    store = open_store(log_store) if log_store else None
+    # LOG_FLUSH_EVERY=N — писать лог раз в N ходов (старт и финальный отчёт — всегда)
+    flush_every = int(os.getenv("LOG_FLUSH_EVERY", "1"))
+    logger = InterviewLogger(log_path, store=store, flush_every=flush_every, archive=archive)
 
     # Память и агенты
     memory = Memory()
+    # ROUTER_MODEL=<model.json> — локальный классификатор маршрутов (scripts/train_router.py), правила — запасной путь
+    router_model = os.getenv("ROUTER_MODEL", "").strip()
     router = RouterAgent()
+    if router_model:
+        from .agents.router_model import HashedLinearRouter
+        router = RouterAgent(
+            backend=HashedLinearRouter.load(router_model),
+            min_confidence=float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8")),
+        )
 
     llm = build_llm()
-    observer = ObserverAgent(llm=llm)
+    # CPU_WORKERS>0 — скоринг и итоговый отчёт считаются в пуле процессов
+    executor = StageExecutor.from_env()
+    observer = ObserverAgent(llm=llm, executor=executor)
     interviewer = InterviewerAgent()
     hiring_manager = HiringManagerAgent()
 
@@ -65,8 +101,25 @@ def main():
         hiring_manager=hiring_manager,
         logger=logger,
         memory=memory,
+        executor=executor,
+        # SKILL_STORE=<path.db> — повторные кандидаты стартуют с прошлого уровня
+        skills=SkillStore(os.environ["SKILL_STORE"]) if os.getenv("SKILL_STORE", "").strip() else None,
+        # CONFIG_PATH=<config.json> — пороги/ключевые слова/штрафы/банк с горячей перезагрузкой
+        config_source=ConfigWatcher(os.environ["CONFIG_PATH"]).start() if os.getenv("CONFIG_PATH", "").strip() else None,
     )
 
+    try:
+        run_interview(orch, profile, logger)
+    finally:
+        # пул процессов, поток ConfigWatcher и соединения хранилища — не оставляем висеть до выхода интерпретатора
+        executor.shutdown()
+        if orch.config_source is not None:
+            orch.config_source.stop()
+        if store is not None:
+            store.close()
+
+
+def run_interview(orch: Orchestrator, profile: CandidateProfile, logger: InterviewLogger) -> None:
     # Старт интервью
     interviewer_msg = orch.start(profile)
     print("\nInterviewer:", interviewer_msg)
@@ -79,15 +132,12 @@ def main():
 
         # stop - финальный отчет сохранен
         if next_msg is None:
-            print("\nInterviewer: Спасибо! Интервью остановлено. Финальный фидбэк сохранён в", log_path)
+            print("\nInterviewer: Спасибо! Интервью остановлено. Финальный фидбэк сохранён в", logger.describe_target())
 
             # Для удобства показываем итог в консоли
-            try:
-                data = json.loads(open(log_path, "r", encoding="utf-8").read())
+            if logger.log is not None and logger.log.final_feedback is not None:
                 print("\n=== FINAL FEEDBACK (json) ===")
-                print(json.dumps(data.get("final_feedback", {}), ensure_ascii=False, indent=2))
-            except Exception:
-                pass
+                print(json.dumps(logger.log.final_feedback.model_dump(), ensure_ascii=False, indent=2))
 
             break
 
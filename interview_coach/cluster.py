@@ -0,0 +1,528 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .orchestrator import Orchestrator
+from .schemas import CandidateProfile
+
+# кадр протокола: [u32 big-endian длина][JSON в utf-8]; один запрос — один ответ, соединение переиспользуется
+_HEADER = struct.Struct(">I")
+MAX_FRAME = 64 << 20
+
+
+class WorkerError(RuntimeError):
+    """воркер вернул ошибку на запрос (текст исключения на его стороне)"""
+
+
+def send_msg(sock: socket.socket, obj: Any) -> None:
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_msg(sock: socket.socket) -> Any:
+    """следующий кадр или None, если соединение закрыто"""
+    head = _recv_exact(sock, _HEADER.size)
+    if head is None:
+        return None
+    (n,) = _HEADER.unpack(head)
+    if n > MAX_FRAME:
+        raise ValueError(f"frame too large: {n} bytes")
+    body = _recv_exact(sock, n)
+    if body is None:
+        raise ConnectionError("connection closed mid-frame")
+    return json.loads(body.decode("utf-8"))
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """unix:<path> | tcp:<host>:<port> | <host>:<port> -> (семейство сокета, адрес)"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if address.startswith("tcp:"):
+        address = address[len("tcp:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"bad address: {address!r} (expected unix:<path> or tcp:<host>:<port>)")
+    return socket.AF_INET, (host, int(port))
+
+
+def connect(address: str, timeout_s: Optional[float] = None) -> socket.socket:
+    family, addr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(timeout_s)
+    sock.connect(addr)
+    return sock
+
+
+class HashRing:
+    """
+    Консистентное хэширование session_id -> узел.
+    У каждого узла vnodes точек на кольце: при добавлении/удалении узла переезжает ~1/N сессий,
+    а не почти все, как при hash % N. sha1, а не hash(): раскладка одинакова во всех процессах.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self._points: List[Tuple[int, str]] = []
+        self._keys: List[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted({node for _, node in self._points})
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self._points.extend((self._hash(f"{node}#{i}"), node) for i in range(self.vnodes))
+        self._points.sort()
+        self._keys = [h for h, _ in self._points]
+
+    def remove(self, node: str) -> None:
+        self._points = [p for p in self._points if p[1] != node]
+        self._keys = [h for h, _ in self._points]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring._points = list(self._points)
+        ring._keys = list(self._keys)
+        return ring
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("hash ring is empty")
+        i = bisect.bisect(self._keys, self._hash(key)) % len(self._points)
+        return self._points[i][1]
+
+
+@dataclass
+class _Session:
+    orch: Orchestrator
+    profile: CandidateProfile
+    # последняя реплика интервьюера: следующий ход отвечает на неё
+    message: str
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # состояние отдано на перенос: ходов здесь больше нет, пока не придет drop (переехала) или thaw (остается)
+    frozen: bool = False
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    # соединения координатора долгоживущие, но при старте их открывается много сразу:
+    # с очередью по умолчанию (5) лишние connect на unix-сокете падают с EAGAIN
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    request_queue_size = 128
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SessionWorker:
+    """
+    Процесс-воркер: держит Orchestrator'ы своих сессий в памяти и выполняет их ходы по запросам координатора.
+    factory(session_id) -> Orchestrator с агентами/логгером/executor'ом этого процесса.
+
+    Операции (JSON {"op": ..., ...} -> {"ok": true, "result": ...} | {"ok": false, "error": ...}):
+    - start(session_id, profile) -> приветствие
+    - turn(session_id, user_msg) -> {"reply": текст, "question_id": ...} | {"reply": None, "final_feedback": ...} на стопе
+    - export(session_id) -> состояние сессии; сессия замораживается, но остается здесь до drop
+    - import(session_id, state); drop(session_id) — перенос завершен; thaw(session_id) — перенос отменен
+    - sessions, stats, ping, shutdown
+    """
+
+    def __init__(self, address: str, factory: Callable[[str], Orchestrator], name: Optional[str] = None):
+        self.address = address
+        self.factory = factory
+        self.name = name or address
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.BaseServer] = None
+        self.turns = 0
+        self.imported = 0
+        self.exported = 0
+
+    def _session(self, session_id: str) -> _Session:
+        with self._lock:
+            s = self._sessions.get(session_id)
+        if s is None:
+            raise KeyError(f"unknown session: {session_id}")
+        return s
+
+    def _add(self, session_id: str, s: _Session) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                raise ValueError(f"session already exists: {session_id}")
+            self._sessions[session_id] = s
+
+    def _drop(self, session_id: str) -> Optional[_Session]:
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    # --- операции ---
+
+    def op_start(self, session_id: str, profile: Dict[str, Any]) -> str:
+        prof = CandidateProfile.model_validate(profile)
+        orch = self.factory(session_id)
+        greeting = orch.start(prof)
+        self._add(session_id, _Session(orch=orch, profile=prof, message=greeting))
+        return greeting
+
+    def op_turn(self, session_id: str, user_msg: str) -> Dict[str, Any]:
+        s = self._session(session_id)
+        with s.lock:
+            if s.frozen:
+                raise RuntimeError(f"session is being moved: {session_id}")
+            reply = s.orch.handle_user_message(s.profile, s.message, user_msg)
+            with self._lock:
+                self.turns += 1
+            if reply is None:
+                self._drop(session_id)
+                log = s.orch.logger.log
+                feedback = log.final_feedback.model_dump() if log is not None and log.final_feedback is not None else None
+                return {"reply": None, "final_feedback": feedback}
+            s.message = reply
+            q = s.orch.last_question
+            return {"reply": reply, "question_id": q.qid if q is not None else None}
+
+    def op_export(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """None — сессии здесь уже нет (например, успела завершиться)"""
+        with self._lock:
+            s = self._sessions.get(session_id)
+        if s is None:
+            return None
+        with s.lock:
+            state = {
+                "profile": s.profile.model_dump(),
+                "message": s.message,
+                "session": s.orch.export_session(),
+            }
+            # не удаляем: если импорт на другом узле не удастся, сессия продолжится здесь (thaw)
+            s.frozen = True
+        return state
+
+    def op_import(self, session_id: str, state: Dict[str, Any]) -> bool:
+        orch = self.factory(session_id)
+        orch.import_session(state["session"])
+        prof = CandidateProfile.model_validate(state["profile"])
+        self._add(session_id, _Session(orch=orch, profile=prof, message=state["message"]))
+        with self._lock:
+            self.imported += 1
+        return True
+
+    def op_drop(self, session_id: str) -> bool:
+        dropped = self._drop(session_id) is not None
+        if dropped:
+            with self._lock:
+                self.exported += 1
+        return dropped
+
+    def op_thaw(self, session_id: str) -> bool:
+        s = self._session(session_id)
+        with s.lock:
+            s.frozen = False
+        return True
+
+    def op_sessions(self) -> List[str]:
+        """сессии, которые обслуживаются здесь (замороженные копии уже принадлежат другому узлу)"""
+        with self._lock:
+            return sorted(sid for sid, s in self._sessions.items() if not s.frozen)
+
+    def op_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "pid": os.getpid(),
+                "sessions": len(self._sessions),
+                "turns": self.turns,
+                "imported": self.imported,
+                "exported": self.exported,
+            }
+
+    def op_ping(self) -> str:
+        return "pong"
+
+    def op_shutdown(self) -> bool:
+        # ответ уходит раньше, чем сервер остановится
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return True
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = getattr(self, f"op_{request.get('op')}", None)
+        if op is None:
+            return {"ok": False, "error": f"unknown op: {request.get('op')!r}"}
+        args = {k: v for k, v in request.items() if k != "op"}
+        try:
+            return {"ok": True, "result": op(**args)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # --- сервер ---
+
+    def serve_forever(self) -> None:
+        worker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                while True:
+                    try:
+                        request = recv_msg(self.request)
+                    except (OSError, ValueError):
+                        return
+                    if request is None:
+                        return
+                    send_msg(self.request, worker.handle(request))
+
+        family, addr = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.unlink(addr)
+            server: socketserver.BaseServer = _UnixServer(addr, Handler)
+        else:
+            server = _TCPServer(addr, Handler)
+        self._server = server
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if family == socket.AF_UNIX and os.path.exists(addr):
+                os.unlink(addr)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class WorkerClient:
+    """клиент одного воркера: пул соединений (по одному на одновременный запрос), запрос-ответ JSON"""
+
+    def __init__(self, address: str, timeout_s: Optional[float] = 60.0):
+        self.address = address
+        self.timeout_s = timeout_s
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def call(self, op: str, **args: Any) -> Any:
+        with self._lock:
+            sock = self._idle.pop() if self._idle else None
+        if sock is None:
+            sock = connect(self.address, self.timeout_s)
+        try:
+            send_msg(sock, {"op": op, **args})
+            response = recv_msg(sock)
+        except BaseException:
+            sock.close()
+            raise
+        if response is None:
+            sock.close()
+            raise ConnectionError(f"worker {self.address} closed the connection")
+        with self._lock:
+            self._idle.append(sock)
+        if not response.get("ok"):
+            raise WorkerError(f"{self.address}: {op}: {response.get('error')}")
+        return response.get("result")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+
+class Coordinator:
+    """
+    Маршрутизация сессий по воркерам: узел новой сессии — по HashRing от session_id, все ходы сессии идут туда,
+    где лежит её Memory. Ходы одной сессии выполняются строго по очереди, разных — параллельно.
+
+    add_node/remove_node меняют кольцо и переносят затронутые сессии между ходами:
+    export (сессия замораживается на источнике) -> import на новом узле -> drop на источнике.
+    Если импорт не удался, сессия размораживается и остается на старом узле; rebalance() повторит перенос.
+    Пока сессия переезжает, её ходы ждут; остальные сессии обслуживаются как обычно.
+    """
+
+    def __init__(self, nodes: Dict[str, str], vnodes: int = 128, timeout_s: Optional[float] = 60.0):
+        self.timeout_s = timeout_s
+        self._ring = HashRing(nodes, vnodes=vnodes)
+        self._clients: Dict[str, WorkerClient] = {name: WorkerClient(addr, timeout_s) for name, addr in nodes.items()}
+        # где сейчас живет каждая известная сессия; после смены кольца может отличаться от ring.node_for до переноса
+        self._owners: Dict[str, str] = {}
+        self._session_locks: Dict[str, threading.Lock] = {}
+        # только словари в памяти: сетевые вызовы под этой блокировкой не делаются
+        self._lock = threading.Lock()
+        self.moved = 0
+        self.failed_moves = 0
+        self.last_error: Optional[str] = None
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+
+    def owner(self, session_id: str) -> str:
+        with self._lock:
+            return self._owners.get(session_id) or self._ring.node_for(session_id)
+
+    def _route(self, session_id: str) -> Tuple[str, WorkerClient]:
+        with self._lock:
+            node = self._owners.get(session_id) or self._ring.node_for(session_id)
+            self._owners[session_id] = node
+            return node, self._clients[node]
+
+    def start(self, session_id: str, profile: CandidateProfile) -> str:
+        # узел фиксируется до вызова: перенос этой сессии (под той же блокировкой сессии) дождется её старта
+        with self._session_lock(session_id):
+            _, client = self._route(session_id)
+            try:
+                return client.call("start", session_id=session_id, profile=profile.model_dump())
+            except BaseException:
+                with self._lock:
+                    self._owners.pop(session_id, None)
+                raise
+
+    def turn(self, session_id: str, user_msg: str) -> Dict[str, Any]:
+        """{"reply": ..., "question_id": ...}; reply=None — сессия завершена, в ответе final_feedback"""
+        with self._session_lock(session_id):
+            _, client = self._route(session_id)
+            result = client.call("turn", session_id=session_id, user_msg=user_msg)
+            if result.get("reply") is None:
+                with self._lock:
+                    self._owners.pop(session_id, None)
+                    self._session_locks.pop(session_id, None)
+        return result
+
+    def _move(self, session_id: str, src: str, dst: str, clients: Dict[str, WorkerClient]) -> bool:
+        """перенести одну сессию между её ходами; False — переносить было нечего (завершилась, уже перенесена)"""
+        with self._session_lock(session_id):
+            with self._lock:
+                if self._owners.get(session_id) != src:
+                    return False
+            source, target = clients[src], clients[dst]
+            state = source.call("export", session_id=session_id)
+            if state is None:
+                with self._lock:
+                    self._owners.pop(session_id, None)
+                return False
+            try:
+                target.call("import", session_id=session_id, state=state)
+            except Exception:
+                # источник ничего не удалял: размораживаем, сессия продолжается на старом узле
+                source.call("thaw", session_id=session_id)
+                raise
+            with self._lock:
+                self._owners[session_id] = dst
+            try:
+                source.call("drop", session_id=session_id)
+            except (OSError, WorkerError) as e:
+                # на источнике осталась замороженная копия: ходов она не примет, владелец уже dst
+                self.last_error = f"drop {session_id} on {src}: {e}"
+            return True
+
+    def _rebalance(self, ring: HashRing, clients: Dict[str, WorkerClient]) -> int:
+        # сессии, о которых координатор не знает (например, после его рестарта), — со всех узлов, до блокировки
+        listed: Dict[str, str] = {}
+        for name, client in clients.items():
+            try:
+                for sid in client.call("sessions"):
+                    listed.setdefault(sid, name)
+            except (OSError, WorkerError) as e:
+                self.last_error = f"sessions on {name}: {e}"
+
+        with self._lock:
+            for sid, name in listed.items():
+                self._owners.setdefault(sid, name)
+            self._ring = ring
+            self._clients = clients
+            movers = [(sid, src, ring.node_for(sid)) for sid, src in self._owners.items() if ring.node_for(sid) != src]
+
+        moved = failed = 0
+        for sid, src, dst in movers:
+            try:
+                moved += self._move(sid, src, dst, clients)
+            except Exception as e:
+                # остальные сессии переносим дальше; эта остается на src
+                failed += 1
+                self.last_error = f"move {sid} {src}->{dst}: {type(e).__name__}: {e}"
+        with self._lock:
+            self.moved += moved
+            self.failed_moves += failed
+        return moved
+
+    def rebalance(self) -> int:
+        """повторить перенос сессий, которые живут не на своем узле кольца (после неудачных переносов)"""
+        with self._lock:
+            ring = self._ring.copy()
+            clients = dict(self._clients)
+        return self._rebalance(ring, clients)
+
+    def add_node(self, name: str, address: str) -> int:
+        """новый узел; возвращает число перенесенных на него сессий"""
+        with self._lock:
+            ring = self._ring.copy()
+            clients = dict(self._clients)
+        ring.add(name)
+        clients[name] = WorkerClient(address, self.timeout_s)
+        return self._rebalance(ring, clients)
+
+    def remove_node(self, name: str) -> int:
+        """
+        вывести узел: его сессии переезжают на соседей по кольцу; возвращает число перенесенных.
+        Если часть сессий перенести не удалось, узел остается их владельцем (новых сессий не получает)
+        и поднимается WorkerError — повторить remove_node позже.
+        """
+        with self._lock:
+            ring = self._ring.copy()
+            clients = dict(self._clients)
+        ring.remove(name)
+        moved = self._rebalance(ring, clients)
+        with self._lock:
+            stuck = sum(1 for node in self._owners.values() if node == name)
+            client = self._clients.pop(name, None) if not stuck else None
+        if stuck:
+            raise WorkerError(f"{stuck} sessions could not leave {name}: {self.last_error}")
+        if client is not None:
+            client.close()
+        return moved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = dict(self._clients)
+        return {
+            "nodes": {name: c.call("stats") for name, c in clients.items()},
+            "moved": self.moved,
+            "failed_moves": self.failed_moves,
+            "last_error": self.last_error,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for c in clients.values():
+            c.close()
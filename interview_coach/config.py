@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .agents.hiring_manager import DEFAULT_PENALTIES, Penalties
+from .agents.router import DEFAULT_RULES, RouterRules
+from .question_bank import (
+    DEFAULT_SOURCE,
+    GRADE_BANDS,
+    MANIFEST,
+    POSITION_KEYWORDS,
+    BankPartition,
+    BankSource,
+    bank_revision,
+    drop_partitions,
+    load_partition,
+)
+
+
+class ConfigError(ValueError):
+    """новая версия конфигурации не прошла проверку — остаётся прежняя"""
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """
+    Версия настраиваемых правил: пороги рубрик и банк (bank), ключевые слова Router'а (router),
+    штрафы отчёта (penalties). Неизменяемая: сессия берет ссылку на старте и доигрывает с ней.
+    """
+
+    version: str = "builtin"
+    bank: BankSource = DEFAULT_SOURCE
+    router: RouterRules = DEFAULT_RULES
+    penalties: Penalties = DEFAULT_PENALTIES
+
+    def partition(self, position: str, grade: str) -> BankPartition:
+        return load_partition(position, grade, self.bank)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON версии — сессия переносится на другой узел вместе со своей версией правил"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RuntimeConfig":
+        return cls(
+            version=d["version"],
+            bank=BankSource(**d["bank"]),
+            router=RouterRules(**{k: tuple(v) for k, v in d["router"].items()}),
+            penalties=Penalties(**d["penalties"]),
+        )
+
+
+DEFAULT_CONFIG = RuntimeConfig()
+
+
+def _keywords(raw: Any, name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    if raw is None:
+        return default
+    if not isinstance(raw, list) or not raw or not all(isinstance(k, str) and k.strip() for k in raw):
+        raise ConfigError(f"router.{name} must be a non-empty list of non-empty strings")
+    return tuple(k.strip().lower() for k in raw)
+
+
+def _number(section: Dict[str, Any], key: str, default: float, where: str) -> float:
+    value = section.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ConfigError(f"{where}.{key} must be a number")
+    return float(value)
+
+
+def parse_config(data: Dict[str, Any], base_dir: str = ".", default_version: str = "") -> RuntimeConfig:
+    """
+    JSON конфигурации -> RuntimeConfig; отсутствующие ключи берутся по умолчанию:
+    {"version": "...", "scoring": {"correct_at", "partial_at"}, "router": {"offtopic", "hallucination",
+     "role_reversal"}, "penalties": {"offtopic", "hallucination"}, "bank_dir": "..."}
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("config must be a JSON object")
+
+    scoring = data.get("scoring") or {}
+    correct_at = _number(scoring, "correct_at", DEFAULT_SOURCE.correct_at, "scoring")
+    partial_at = _number(scoring, "partial_at", DEFAULT_SOURCE.partial_at, "scoring")
+    if not 0.0 <= partial_at <= correct_at <= 1.0:
+        raise ConfigError("scoring: expected 0 <= partial_at <= correct_at <= 1")
+
+    bank_dir: Optional[str] = None
+    revision = ""
+    if data.get("bank_dir"):
+        bank_dir = os.path.abspath(os.path.join(base_dir, str(data["bank_dir"])))
+        if not os.path.isdir(bank_dir):
+            raise ConfigError(f"bank_dir not found: {bank_dir}")
+        try:
+            revision = bank_revision(bank_dir)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"bank_dir {bank_dir}: {e}") from e
+
+    router = data.get("router") or {}
+    rules = RouterRules(
+        offtopic=_keywords(router.get("offtopic"), "offtopic", DEFAULT_RULES.offtopic),
+        hallucination=_keywords(router.get("hallucination"), "hallucination", DEFAULT_RULES.hallucination),
+        role_reversal=_keywords(router.get("role_reversal"), "role_reversal", DEFAULT_RULES.role_reversal),
+    )
+
+    penalties = data.get("penalties") or {}
+    pen = Penalties(
+        offtopic=_number(penalties, "offtopic", DEFAULT_PENALTIES.offtopic, "penalties"),
+        hallucination=_number(penalties, "hallucination", DEFAULT_PENALTIES.hallucination, "penalties"),
+    )
+    if pen.offtopic < 0 or pen.hallucination < 0:
+        raise ConfigError("penalties must be >= 0")
+
+    return RuntimeConfig(
+        version=str(data.get("version") or default_version or "unversioned"),
+        bank=BankSource(bank_dir=bank_dir, correct_at=correct_at, partial_at=partial_at, revision=revision),
+        router=rules,
+        penalties=pen,
+    )
+
+
+def prepare(config: RuntimeConfig) -> RuntimeConfig:
+    """
+    Собрать и скомпилировать все партиции банка версии заранее: ошибки банка видны до переключения,
+    а первая сессия новой версии не платит за загрузку и компиляцию рубрик.
+    """
+    for position in POSITION_KEYWORDS:
+        for grade in GRADE_BANDS:
+            part = config.partition(position, grade)
+            if not part.questions:
+                raise ConfigError(f"empty bank partition: {position}/{grade}")
+    return config
+
+
+def load_config(path: str) -> RuntimeConfig:
+    """прочитать, проверить и подготовить версию из файла; version по умолчанию — хэш содержимого"""
+    raw = Path(path).read_bytes()
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ConfigError(f"{path}: {e}") from e
+    config = parse_config(data, base_dir=os.path.dirname(os.path.abspath(path)), default_version=hashlib.sha1(raw).hexdigest()[:12])
+    try:
+        return prepare(config)
+    except ConfigError:
+        raise
+    except Exception as e:
+        # битый JSON банка, неверная рубрика и т.п.
+        raise ConfigError(f"bank of config {config.version}: {e!r}") from e
+
+
+@dataclass
+class ConfigWatcher:
+    """
+    Горячая перезагрузка конфигурации без рестарта.
+    Фоновый поток раз в poll_s сверяет stat файла конфигурации и manifest.json её bank_dir; изменилось —
+    новая версия читается, проверяется и компилируется в этом же потоке, а затем одной записью
+    подменяет current. Ход сессии ничего не ждёт: читает current только на старте сессии (Orchestrator.start).
+    Невалидная версия не применяется: current остается прежним, причина — в last_error.
+    """
+
+    path: str
+    poll_s: float = 2.0
+    # сколько последних версий держать в кэше партиций (сессии старых версий доигрывают со своими ссылками)
+    keep_versions: int = 2
+
+    current: RuntimeConfig = field(init=False)
+    last_error: Optional[str] = field(default=None, init=False)
+    history: List[str] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._recent: List[RuntimeConfig] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # первая версия обязана быть валидной — иначе процессу нечего отдавать сессиям
+        self.current = DEFAULT_CONFIG
+        if not self.check():
+            raise ConfigError(self.last_error or f"cannot load {self.path}")
+
+    def _stat_signature(self) -> Tuple[Any, ...]:
+        # банк обновляется записью файлов и последним — манифеста (dump_partitions): следим только за ним
+        paths = [self.path]
+        if self.current.bank.bank_dir is not None:
+            paths.append(os.path.join(self.current.bank.bank_dir, MANIFEST))
+        sig: List[Any] = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                sig.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def check(self) -> bool:
+        """перечитать, если файлы изменились; True — current обновлен"""
+        with self._lock:
+            sig = self._stat_signature()
+            if sig == self._signature:
+                return False
+            self._signature = sig
+            try:
+                config = load_config(self.path)
+            except (OSError, ConfigError) as e:
+                self.last_error = str(e)
+                return False
+            self.last_error = None
+            if config == self.current:
+                return False
+            self.current = config
+            self.history.append(config.version)
+            self._recent = (self._recent + [config])[-self.keep_versions:]
+            drop_partitions(c.bank for c in self._recent)
+            # bank_dir мог смениться — подпись считаем заново уже по новой версии
+            self._signature = self._stat_signature()
+            return True
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def start(self) -> "ConfigWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Tuple
+
+from .llm.base import Message
+
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    быстрая локальная оценка числа токенов (без токенизатора модели):
+    слово/знак ≈ 1 токен, длинные слова — +1 токен на каждые 5 символов
+    """
+    return sum(1 + len(t) // 5 for t in _TOKEN.findall(text))
+
+
+def _short(text: str, limit: int) -> str:
+    t = " ".join(text.split())
+    return t if len(t) <= limit else t[: limit - 1] + "…"
+
+
+@dataclass
+class ContextWindow:
+    """
+    Контекст интервью для промптов:
+    - recent: последние реплики целиком (кольцевой буфер, без копирования списка)
+    - summary: сжатая сводка более ранних ходов, обновляется инкрементально
+
+    Старые реплики сворачиваются в сводку пачками по fold_block: между свертками промпт
+    растет только в конец, и префикс-кэш сервера (KV cache) продолжает попадать.
+    """
+
+    max_recent: int = 12
+    fold_block: int = 4
+    summary_max_tokens: int = 400
+
+    recent: Deque[Tuple[Dict[str, str], int]] = field(default_factory=deque)
+    summary_lines: Deque[Tuple[str, int]] = field(default_factory=deque)
+    summary_tokens: int = 0
+    dropped_from_summary: int = 0
+
+    def add(self, interviewer_msg: str, user_msg: str) -> None:
+        exchange = {"interviewer": interviewer_msg, "user": user_msg}
+        # токены считаем один раз при добавлении
+        self.recent.append((exchange, count_tokens(interviewer_msg) + count_tokens(user_msg)))
+        if len(self.recent) > self.max_recent:
+            for _ in range(min(self.fold_block, len(self.recent))):
+                self._fold(self.recent.popleft()[0])
+
+    def _fold(self, exchange: Dict[str, str]) -> None:
+        """переносим реплику в сводку; если сводка переросла бюджет — выбрасываем самые старые строки"""
+        line = f"- Q: {_short(exchange['interviewer'], 100)} | A: {_short(exchange['user'], 140)}"
+        tokens = count_tokens(line)
+        self.summary_lines.append((line, tokens))
+        self.summary_tokens += tokens
+        while self.summary_tokens > self.summary_max_tokens and len(self.summary_lines) > 1:
+            _, t = self.summary_lines.popleft()
+            self.summary_tokens -= t
+            self.dropped_from_summary += 1
+
+    @property
+    def exchanges(self) -> List[Dict[str, str]]:
+        return [e for e, _ in self.recent]
+
+    def summary_text(self) -> str:
+        if not self.summary_lines:
+            return ""
+        head = "Сводка более ранних ходов интервью:"
+        if self.dropped_from_summary:
+            head += f" (ещё {self.dropped_from_summary} самых ранних опущено)"
+        return head + "\n" + "\n".join(line for line, _ in self.summary_lines)
+
+    def build_messages(self, prefix: List[Message], suffix: str, token_budget: int) -> List[Message]:
+        """
+        Порядок: prefix (system и т.п., стабилен) -> реплики от старых к новым -> suffix (переменная часть хода).
+        Роли чередуются как в обычном диалоге:
+        - сводка дописывается в конец последнего system-сообщения префикса (меняется только при свертке,
+          общий префикс остается байт-в-байт тем же)
+        - suffix дописывается в последний ход user, а не отдельным сообщением
+        Если не влезаем в token_budget — сначала отбрасываем самые старые реплики, потом сводку.
+        """
+        fixed = sum(count_tokens(m.content) for m in prefix) + count_tokens(suffix)
+        summary = self.summary_text()
+        summary_tokens = count_tokens(summary) if summary else 0
+
+        recent = list(self.recent)
+        recent_tokens = sum(t for _, t in recent)
+        while recent and fixed + summary_tokens + recent_tokens > token_budget:
+            recent_tokens -= recent.pop(0)[1]
+        if summary and fixed + summary_tokens + recent_tokens > token_budget:
+            summary, summary_tokens = "", 0
+
+        messages = list(prefix)
+        if summary:
+            last_system = max((i for i, m in enumerate(messages) if m.role == "system"), default=None)
+            if last_system is None:
+                messages.insert(0, Message("system", summary))
+            else:
+                messages[last_system] = Message("system", messages[last_system].content + "\n\n" + summary)
+        for exchange, _ in recent:
+            messages.append(Message("assistant", exchange["interviewer"]))
+            messages.append(Message("user", exchange["user"]))
+        if messages and messages[-1].role == "user":
+            messages[-1] = Message("user", messages[-1].content + "\n\n" + suffix)
+        else:
+            messages.append(Message("user", suffix))
+        return messages
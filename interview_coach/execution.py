@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def _timed(fn: Callable[..., T], *args: Any) -> Tuple[T, float]:
+    """стадия + CPU-время, потраченное на неё там, где она выполнялась (в т.ч. в процессе пула)"""
+    cpu0 = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - cpu0
+
+
+class StageExecutor:
+    """
+    Слой исполнения стадий хода.
+    CPU-стадии (скоринг, итоговый отчёт) уходят в пул процессов и не держат GIL,
+    I/O-стадии (LLM, логирование) остаются в потоках/asyncio вызывающей стороны.
+
+    Аргументы и результат стадии должны быть picklable: поэтому сюда передаются
+    функции уровня модуля, dict/dataclass/pydantic-модели, а не замыкания.
+    max_workers=0 — выполнять стадии в текущем потоке (как раньше).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "StageExecutor":
+        return cls(max_workers=int(os.getenv("CPU_WORKERS", "0")))
+
+    @property
+    def inline(self) -> bool:
+        return self.max_workers <= 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """синхронный вызов: текущий поток ждёт результат, остальные сессии в это время работают"""
+        if self.inline:
+            return fn(*args)
+        return self._get_pool().submit(fn, *args).result()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """то же для asyncio: event loop не блокируется на время CPU-стадии"""
+        if self.inline:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), functools.partial(fn, *args))
+
+    def call_timed(self, fn: Callable[..., T], *args: Any) -> Tuple[T, float]:
+        """call + CPU-секунды стадии (для учета расходов сессии)"""
+        return self.call(_timed, fn, *args)
+
+    async def run_timed(self, fn: Callable[..., T], *args: Any) -> Tuple[T, float]:
+        return await self.run(_timed, fn, *args)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+# по умолчанию — без пула, поведение как раньше
+INLINE = StageExecutor(max_workers=0)
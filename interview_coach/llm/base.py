@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import inspect
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import List, Protocol
+from typing import Any, Dict, Iterator, List, Optional, Protocol
 
 
 @dataclass
@@ -10,7 +14,73 @@ class Message:
     content: str
 
 
+class Completion(str):
+    """
+    Ответ LLM (обычная строка) + usage от провайдера: {"prompt_tokens", "completion_tokens"}.
+    Провайдер без usage возвращает просто str — токены тогда оцениваются локально.
+    """
+
+    usage: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def with_usage(cls, text: str, usage: Optional[Dict[str, int]]) -> "Completion":
+        c = cls(text)
+        c.usage = usage
+        return c
+
+
 class LLM(Protocol):
 
-    def generate(self, messages: List[Message], temperature: float = 0.2) -> str:
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """deadline — абсолютный момент по time.monotonic(), после которого ответ уже не нужен."""
         ...
+
+
+# класс клиента -> принимает ли generate() параметр deadline (проверяем сигнатуру один раз)
+_ACCEPTS_DEADLINE: Dict[type, bool] = {}
+
+
+def accepts_deadline(llm: Any) -> bool:
+    cls = type(llm)
+    ok = _ACCEPTS_DEADLINE.get(cls)
+    if ok is None:
+        try:
+            params = inspect.signature(llm.generate).parameters.values()
+            ok = any(p.name == "deadline" or p.kind is inspect.Parameter.VAR_KEYWORD for p in params)
+        except (TypeError, ValueError):
+            ok = True
+        _ACCEPTS_DEADLINE[cls] = ok
+    return ok
+
+
+def call_generate(llm: Any, messages: List[Message], temperature: float = 0.2, deadline: Optional[float] = None) -> str:
+    """generate с дедлайном; клиент без параметра deadline (старый протокол) вызывается без него"""
+    if accepts_deadline(llm):
+        return llm.generate(messages, temperature=temperature, deadline=deadline)
+    return llm.generate(messages, temperature=temperature)
+
+
+# кто вызывает LLM — для воспроизводимого replay при параллельных сессиях (cassette.py):
+# llm_session ставит Orchestrator на время хода, llm_call — generate_within_budget на один вызов
+# (хедж и повтор того же вызова делят номер). В потоки executor контекст передается через copy_context().
+llm_session: ContextVar[Optional[str]] = ContextVar("llm_session", default=None)
+llm_call: ContextVar[Optional[int]] = ContextVar("llm_call", default=None)
+_CALL_IDS = itertools.count(1)
+
+
+def next_call_id() -> int:
+    return next(_CALL_IDS)
+
+
+@contextmanager
+def session_scope(session_id: Optional[str]) -> Iterator[None]:
+    token = llm_session.set(session_id)
+    try:
+        yield
+    finally:
+        llm_session.reset(token)
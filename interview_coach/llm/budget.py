@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+from .base import LLM, Message, call_generate, llm_call, next_call_id
+from ..context import count_tokens
+
+if TYPE_CHECKING:
+    from ..usage import SessionUsage
+
+
+@dataclass
+class LatencyBudget:
+    """
+    Бюджет латентности LLM на один ход:
+    - turn_budget_s: сколько максимум ждём LLM, дальше — банковский вопрос
+    - hedge_percentile: если ответа нет дольше этого перцентиля наблюдаемой латентности,
+      отправляем дублирующий запрос и берем тот, что придет первым
+    - запрос, упавший раньше дедлайна, сразу повторяется (без ожидания перцентиля)
+    - max_requests: сколько запросов всего на один ход (исходный + хедж/повтор)
+
+    Латентность пишется по каждому вызову: таймаут или отказ — как turn_budget_s (цензурированный замер),
+    иначе перцентиль считался бы только по успешным быстрым ответам и хедж срабатывал бы слишком рано.
+    Один бюджет общий для потоков Observer: счетчики и окно замеров — под замком.
+    """
+
+    turn_budget_s: float = 8.0
+    hedge_percentile: float = 0.9
+    # пока замеров мало, перцентиль ненадежен — не хеджируем
+    min_samples: int = 10
+    window: int = 200
+    max_requests: int = 2
+
+    latencies: Deque[float] = field(default_factory=deque)
+    violations: Deque[Dict[str, Any]] = field(default_factory=deque)
+    calls: int = 0
+    hedged: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    def __post_init__(self) -> None:
+        self.latencies = deque(self.latencies, maxlen=self.window)
+        self.violations = deque(self.violations, maxlen=self.window)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LatencyBudget":
+        return cls(
+            turn_budget_s=float(os.getenv("LLM_TURN_BUDGET_S", "8")),
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9")),
+        )
+
+    def count(self, name: str) -> None:
+        """calls / hedged / retried / failed"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def observe_censored(self) -> None:
+        """вызов не дал ответа (таймаут/отказ): латентность не меньше бюджета"""
+        self.observe(self.turn_budget_s)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            s = sorted(self.latencies)
+        if not s:
+            return None
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    def hedge_after_s(self) -> Optional[float]:
+        """через сколько секунд дублировать запрос (None — не дублируем)"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        delay = self.percentile(self.hedge_percentile)
+        if delay is None or delay >= self.turn_budget_s:
+            return None
+        return delay
+
+    def record_violation(self, stage: str, elapsed_s: float) -> None:
+        with self._lock:
+            self.violations.append(
+                {
+                    "stage": stage,
+                    "elapsed_s": round(elapsed_s, 3),
+                    "budget_s": self.turn_budget_s,
+                    "at": time.time(),
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """сводка для тюнинга бюджетов"""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "retried": self.retried,
+            "failed": self.failed,
+            "violations": len(self.violations),
+            "p50_s": self.percentile(0.5),
+            "p90_s": self.percentile(0.9),
+            "p99_s": self.percentile(0.99),
+            "turn_budget_s": self.turn_budget_s,
+        }
+
+
+def _account(usage: Optional["SessionUsage"], messages: List[Message], requests: int, text: Optional[str], start: float) -> None:
+    """
+    Учет вызова в расходах сессии: промпт оплачивается за каждый отправленный запрос (хеджи тоже),
+    ответ — только полученный. usage провайдера (Completion.usage) точнее локальной оценки — берем его.
+    """
+    if usage is None:
+        return
+    prompt = count_tokens("".join(m.content for m in messages))
+    provider = getattr(text, "usage", None) or {}
+    completion = 0
+    if text is not None:
+        completion = int(provider.get("completion_tokens", count_tokens(text)))
+    prompt_total = prompt * (requests - 1) + int(provider.get("prompt_tokens", prompt))
+    usage.add_llm(requests, prompt_total, completion, time.monotonic() - start, ok=text is not None)
+
+
+def _next_request(budget: LatencyBudget, requests: int, hedge_at: Optional[float], failed: bool, idle: bool) -> Optional[str]:
+    """нужен ли ещё запрос: "retried" — предыдущий упал и ждать нечего, "hedged" — вышло время хеджа"""
+    if requests >= budget.max_requests:
+        return None
+    if failed and idle:
+        return "retried"
+    if hedge_at is not None and time.monotonic() >= hedge_at:
+        return "hedged"
+    return None
+
+
+def _wait_s(deadline: float, hedge_at: Optional[float], requests: int, budget: LatencyBudget) -> float:
+    remaining = deadline - time.monotonic()
+    if hedge_at is not None and requests < budget.max_requests:
+        remaining = min(remaining, max(0.0, hedge_at - time.monotonic()))
+    return remaining
+
+
+def _in_context(call_id: int) -> contextvars.Context:
+    """контекст вызывающего (сессия) + номер вызова — для потока executor; копия своя у каждого запроса"""
+    ctx = contextvars.copy_context()
+    ctx.run(llm_call.set, call_id)
+    return ctx
+
+
+def _finish(budget: LatencyBudget, stage: str, start: float, timed_out: bool) -> None:
+    """вызов без ответа: цензурированный замер на дедлайне, нарушение — если вышло время"""
+    budget.count("failed")
+    budget.observe_censored()
+    if timed_out:
+        budget.record_violation(stage, time.monotonic() - start)
+
+
+def generate_within_budget(
+    llm: LLM,
+    messages: List[Message],
+    executor: Executor,
+    budget: LatencyBudget,
+    temperature: float = 0.2,
+    stage: str = "llm",
+    usage: Optional["SessionUsage"] = None,
+) -> Optional[str]:
+    """
+    Вызывает LLM с дедлайном и хеджированием.
+    Возвращает текст или None, если бюджет исчерпан/все запросы упали — тогда вызывающий
+    использует запасной вариант (банковский текст).
+    usage — расходы сессии: запросы, токены, время ожидания.
+    """
+    start = time.monotonic()
+    deadline = start + budget.turn_budget_s
+    budget.count("calls")
+    requests = 0
+    call_id = next_call_id()
+
+    def submit():
+        nonlocal requests
+        requests += 1
+        return executor.submit(_in_context(call_id).run, call_generate, llm, messages, temperature, deadline)
+
+    pending = {submit()}
+    hedge_after = budget.hedge_after_s()
+    hedge_at = start + hedge_after if hedge_after is not None else None
+
+    # первый успешный ответ в пределах дедлайна; хедж — после перцентиля, повтор — сразу после отказа
+    while pending:
+        timeout = _wait_s(deadline, hedge_at, requests, budget)
+        if deadline - time.monotonic() <= 0:
+            break
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                for p in pending:
+                    p.cancel()
+                budget.observe(time.monotonic() - start)
+                _account(usage, messages, requests, f.result(), start)
+                return f.result()
+        extra = _next_request(budget, requests, hedge_at, failed=bool(done), idle=not pending)
+        if extra is not None:
+            budget.count(extra)
+            pending.add(submit())
+            if extra == "hedged":
+                hedge_at = None
+
+    if pending:
+        # бюджет исчерпан: незавершенные запросы отменяем (уже запущенные сами упрутся в deadline)
+        for p in pending:
+            p.cancel()
+    _finish(budget, stage, start, timed_out=bool(pending))
+    _account(usage, messages, requests, None, start)
+    return None
+
+
+async def agenerate_within_budget(
+    llm: LLM,
+    messages: List[Message],
+    executor: Executor,
+    budget: LatencyBudget,
+    temperature: float = 0.2,
+    stage: str = "llm",
+    usage: Optional["SessionUsage"] = None,
+) -> Optional[str]:
+    """
+    generate_within_budget для asyncio: те же дедлайн, хеджирование, повтор и учет латентности/расходов,
+    но ожидание не держит event loop — блокирующий клиент LLM работает в потоках executor.
+    """
+    start = time.monotonic()
+    deadline = start + budget.turn_budget_s
+    budget.count("calls")
+    requests = 0
+    call_id = next_call_id()
+
+    def submit() -> "asyncio.Future[str]":
+        nonlocal requests
+        requests += 1
+        return asyncio.wrap_future(
+            executor.submit(_in_context(call_id).run, call_generate, llm, messages, temperature, deadline)
+        )
+
+    pending = {submit()}
+    hedge_after = budget.hedge_after_s()
+    hedge_at = start + hedge_after if hedge_after is not None else None
+
+    while pending:
+        timeout = _wait_s(deadline, hedge_at, requests, budget)
+        if deadline - time.monotonic() <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                for p in pending:
+                    p.cancel()
+                budget.observe(time.monotonic() - start)
+                _account(usage, messages, requests, f.result(), start)
+                return f.result()
+        extra = _next_request(budget, requests, hedge_at, failed=bool(done), idle=not pending)
+        if extra is not None:
+            budget.count(extra)
+            pending.add(submit())
+            if extra == "hedged":
+                hedge_at = None
+
+    if pending:
+        for p in pending:
+            p.cancel()
+    _finish(budget, stage, start, timed_out=bool(pending))
+    _account(usage, messages, requests, None, start)
+    return None
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .base import LLM, Message, call_generate, llm_call, llm_session
+
+
+_WS = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+class CassetteMiss(KeyError):
+    """в кассете нет ответа на этот промпт (strict) или нет достаточно похожего (fuzzy)"""
+
+
+def normalize_messages(messages: List[Message]) -> List[Tuple[str, str]]:
+    """ключ не должен зависеть от пробелов/переносов в шаблонах промптов"""
+    return [(m.role, _WS.sub(" ", m.content).strip()) for m in messages]
+
+
+def prompt_key(messages: List[Message], temperature: float) -> str:
+    payload = json.dumps(
+        {"t": round(temperature, 3), "m": normalize_messages(messages)}, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _shingles(messages: List[Tuple[str, str]]) -> FrozenSet[str]:
+    """пары соседних слов всего промпта (с ролью) — для нечеткого сравнения"""
+    words = [w for role, content in messages for w in [f"<{role}>", *_WORD.findall(content.lower())]]
+    return frozenset(f"{a} {b}" for a, b in zip(words, words[1:])) or frozenset(words)
+
+
+class RecordingLLM:
+    """
+    Запись: пропускает запросы в настоящую LLM и дописывает пары запрос/ответ в кассету (JSONL).
+    Ошибки и таймауты не записываются — в кассете только то, что реально вернул сервер.
+    С каждой записью сохраняется сессия (llm_session): replay раздает ответы по сессиям, а не общим кругом.
+    Из дублей одного вызова (хедж) записывается только первый ответ.
+    """
+
+    def __init__(self, inner: LLM, path: str):
+        self.inner = inner
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[Optional[str], str], Optional[int]] = {}
+        self.recorded = 0
+
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> str:
+        reply = call_generate(self.inner, messages, temperature=temperature, deadline=deadline)
+        key = prompt_key(messages, temperature)
+        session, call = llm_session.get(), llm_call.get()
+        line = json.dumps(
+            {
+                "key": key,
+                "session": session,
+                "temperature": temperature,
+                "messages": [{"role": r, "content": c} for r, c in normalize_messages(messages)],
+                "response": reply,
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            if call is not None and self._calls.get((session, key)) == call:
+                return reply
+            self._calls[(session, key)] = call
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+        return reply
+
+
+class ReplayLLM:
+    """
+    Воспроизведение кассеты без сети и без задержек.
+    - strict: ответ только на точно такой же (после нормализации пробелов) промпт, иначе CassetteMiss
+    - fuzzy: если точного нет — самый похожий промпт по пересечению пар слов (Jaccard >= min_similarity)
+    Если один промпт записан несколько раз, ответы отдаются по кругу в порядке записи — отдельно для каждой
+    сессии (llm_session): при параллельных сессиях каждая получает ту же последовательность, что и при записи.
+    Дубли одного вызова (хедж, повтор) получают тот же ответ и курсор не сдвигают.
+    """
+
+    def __init__(self, path: str, match: str = "strict", min_similarity: float = 0.8):
+        if match not in ("strict", "fuzzy"):
+            raise ValueError(f"unknown match mode: {match}")
+        self.path = str(path)
+        self.match = match
+        self.min_similarity = min_similarity
+
+        self._responses: Dict[str, List[str]] = {}
+        self._by_session: Dict[Tuple[Optional[str], str], List[str]] = {}
+        self._shingles: List[Tuple[str, float, FrozenSet[str]]] = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec["key"] not in self._responses:
+                    self._responses[rec["key"]] = []
+                    msgs = [(m["role"], m["content"]) for m in rec["messages"]]
+                    self._shingles.append((rec["key"], float(rec["temperature"]), _shingles(msgs)))
+                self._responses[rec["key"]].append(rec["response"])
+                session = rec.get("session")
+                if session is not None:
+                    self._by_session.setdefault((session, rec["key"]), []).append(rec["response"])
+
+        self._lock = threading.Lock()
+        # курсор и последний вызов — по (сессия, запись)
+        self._served: Dict[Tuple[Optional[str], str], int] = {}
+        self._last_call: Dict[Tuple[Optional[str], str], Tuple[int, str]] = {}
+        self._fuzzy: Dict[str, Optional[str]] = {}  # ключ промпта -> ключ найденной записи
+        self._counters = {"exact": 0, "fuzzy": 0, "miss": 0}
+
+    def _closest(self, messages: List[Message], temperature: float) -> Optional[str]:
+        target = _shingles(normalize_messages(messages))
+        best, best_sim = None, self.min_similarity
+        for key, t, sh in self._shingles:
+            if abs(t - temperature) > 1e-6:
+                continue
+            union = len(target | sh)
+            sim = len(target & sh) / union if union else 1.0
+            if sim >= best_sim:
+                best, best_sim = key, sim
+        return best
+
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> str:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError("LLM deadline already passed")
+
+        key = prompt_key(messages, temperature)
+        kind = "exact"
+        found: Optional[str] = key if key in self._responses else None
+        if found is None and self.match == "fuzzy":
+            kind = "fuzzy"
+            if key in self._fuzzy:
+                found = self._fuzzy[key]
+            else:
+                found = self._closest(messages, temperature)
+                with self._lock:
+                    self._fuzzy[key] = found
+
+        with self._lock:
+            if found is None:
+                self._counters["miss"] += 1
+                raise CassetteMiss(f"no recorded response for prompt {key[:12]} ({self.match})")
+            self._counters[kind] += 1
+            session, call = llm_session.get(), llm_call.get()
+            cursor = (session, found)
+            last = self._last_call.get(cursor)
+            if call is not None and last is not None and last[0] == call:
+                return last[1]
+            responses = self._by_session.get(cursor) or self._responses[found]
+            i = self._served.get(cursor, 0)
+            self._served[cursor] = i + 1
+            reply = responses[i % len(responses)]
+            if call is not None:
+                self._last_call[cursor] = (call, reply)
+        return reply
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"prompts": len(self._responses), **self._counters}
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import os
+import time
 import requests
 from typing import List, Optional
 
-from .base import Message
+from .base import Completion, Message
 
 
 class OpenAICompatibleLLM:
@@ -24,7 +25,20 @@ class OpenAICompatibleLLM:
         self.api_key = api_key or os.getenv("LLM_API_KEY", "")
         self.timeout_s = timeout_s
 
-    def generate(self, messages: List[Message], temperature: float = 0.2) -> str:
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> str:
+        # таймаут запроса не больше, чем осталось до дедлайна хода
+        timeout_s: float = self.timeout_s
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("LLM deadline already passed")
+            timeout_s = min(timeout_s, remaining)
+
         url = f"{self.base_url}/chat/completions"
 
         payload = {
@@ -37,14 +51,15 @@ class OpenAICompatibleLLM:
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        resp = requests.post(url, json=payload, headers=headers, timeout=self.timeout_s)
+        resp = requests.post(url, json=payload, headers=headers, timeout=timeout_s)
         resp.raise_for_status()
         data = resp.json()
 
         # Стандартный формат OpenAI:
         # { "choices": [ { "message": { "content": "..." } } ] }
         try:
-            return data["choices"][0]["message"]["content"]
+            # usage — для учета токенов сессии (SessionUsage)
+            return Completion.with_usage(data["choices"][0]["message"]["content"], data.get("usage"))
         except Exception:
             # Если сервер вернул не совсем стандартно — лучше отдать как строку
             return str(data)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from .base import Message
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    Шаблон промпта, разложенный под префикс-кэш сервера:
+    - system + shared: общий префикс для всех сессий одного профиля (position/grade) — одно system-сообщение,
+      кэшируется сервером
+    - session: стабилен в пределах сессии (опыт кандидата и т.п.)
+    - suffix: маленькая переменная часть конкретного хода — всегда в самом конце
+    """
+
+    name: str
+    system: str
+    shared: str
+    session: str
+    suffix: str
+
+    def render_shared(self, **profile_keys: str) -> Tuple[Message, ...]:
+        return (Message("system", f"{self.system.rstrip()}\n\n{self.shared.format(**profile_keys)}"),)
+
+    def render_session(self, **session_keys: str) -> Message:
+        return Message("user", self.session.format(**session_keys))
+
+    def render_suffix(self, **turn_keys: object) -> str:
+        return self.suffix.format(**turn_keys)
+
+
+class TemplateRegistry:
+    """
+    реестр шаблонов; отрендеренные общие префиксы кэшируются по (шаблон, профиль) — LRU на max_prefixes записей.
+    Значения профиля передаются уже нормализованными (position_key, грейд), а не свободным текстом:
+    иначе каждая формулировка позиции дала бы свою запись и свой префикс на сервере.
+    """
+
+    def __init__(self, max_prefixes: int = 256):
+        self.max_prefixes = max_prefixes
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._prefixes: "OrderedDict[Tuple, Tuple[Message, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        with self._lock:
+            self._templates[template.name] = template
+            # при перерегистрации старые префиксы шаблона больше не валидны
+            for key in [k for k in self._prefixes if k[0] == template.name]:
+                del self._prefixes[key]
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def prefix(self, name: str, **profile_keys: str) -> List[Message]:
+        """общий префикс профиля; одни и те же строки для всех сессий — байт-в-байт"""
+        key = (name, tuple(sorted(profile_keys.items())))
+        with self._lock:
+            cached = self._prefixes.get(key)
+            if cached is not None:
+                self._prefixes.move_to_end(key)
+        if cached is None:
+            cached = self._templates[name].render_shared(**profile_keys)
+            with self._lock:
+                self._prefixes[key] = cached
+                while len(self._prefixes) > self.max_prefixes:
+                    self._prefixes.popitem(last=False)
+        return list(cached)
+
+    def cached_prefixes(self) -> int:
+        return len(self._prefixes)
+
+
+REGISTRY = TemplateRegistry()
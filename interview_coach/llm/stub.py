@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .base import Message
+
+
+_TOKEN = re.compile(r"\w+|[^\w\s]|\s+")
+
+
+class PrefixCacheStubLLM:
+    """
+    Локальная заглушка LLM-сервера с префикс-кэшем в стиле llama.cpp/vLLM:
+    - промпт сериализуется как chat template и режется на токены
+    - кэш хранит блоки по block_size токенов, ключ блока — хэш всего префикса до его конца
+    - латентность = prefill некэшированных токенов + decode ответа
+
+    По умолчанию не спит, а только считает "виртуальную" латентность (sleep=True — реально ждёт).
+    """
+
+    def __init__(
+        self,
+        block_size: int = 16,
+        max_blocks: int = 50_000,
+        prefill_s_per_token: float = 0.0004,
+        decode_s_per_token: float = 0.02,
+        reply: str = "Расскажи, как бы ты подошел к этой задаче на практике?",
+        sleep: bool = False,
+    ):
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.prefill_s_per_token = prefill_s_per_token
+        self.decode_s_per_token = decode_s_per_token
+        self.reply = reply
+        self.sleep = sleep
+
+        self._blocks: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.simulated_latency_s = 0.0
+
+    @staticmethod
+    def serialize(messages: List[Message]) -> str:
+        return "".join(f"<|{m.role}|>{m.content}<|end|>" for m in messages) + "<|assistant|>"
+
+    def _prefill(self, tokens: List[str]) -> int:
+        """сколько ведущих токенов уже есть в кэше; заодно кладем в кэш весь промпт"""
+        cached = 0
+        h = hashlib.sha1()
+        hit = True
+        with self._lock:
+            for start in range(0, len(tokens) - self.block_size + 1, self.block_size):
+                for t in tokens[start: start + self.block_size]:
+                    h.update(t.encode("utf-8"))
+                key = h.hexdigest()
+                if hit and key in self._blocks:
+                    cached += self.block_size
+                    self._blocks.move_to_end(key)
+                else:
+                    hit = False
+                    self._blocks[key] = None
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return cached
+
+    def generate(
+        self,
+        messages: List[Message],
+        temperature: float = 0.2,
+        deadline: Optional[float] = None,
+    ) -> str:
+        tokens = _TOKEN.findall(self.serialize(messages))
+        cached = self._prefill(tokens)
+        reply_tokens = len(_TOKEN.findall(self.reply))
+        latency = (len(tokens) - cached) * self.prefill_s_per_token + reply_tokens * self.decode_s_per_token
+
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += len(tokens)
+            self.cached_tokens += cached
+            self.simulated_latency_s += latency
+
+        if self.sleep:
+            if deadline is not None and time.monotonic() + latency > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                raise TimeoutError("stub LLM deadline exceeded")
+            time.sleep(latency)
+        return self.reply
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "hit_rate": (self.cached_tokens / self.prompt_tokens) if self.prompt_tokens else 0.0,
+            "mean_latency_s": (self.simulated_latency_s / self.requests) if self.requests else 0.0,
+        }
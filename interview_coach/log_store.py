@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from .schemas import InterviewLog
+
+if TYPE_CHECKING:
+    from .archive import LogArchive
+
+
+# session_id становится именем файла (ShardedFileStore, LogArchive, export_log) — только безопасные символы
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def check_session_id(session_id: str) -> str:
+    if not isinstance(session_id, str) or not _SESSION_ID_RE.fullmatch(session_id):
+        raise ValueError(f"Invalid session_id {session_id!r}: expected [A-Za-z0-9_-]{{1,128}}")
+    return session_id
+
+
+def dump_log(log: InterviewLog, pretty: bool = False) -> str:
+    """сериализация лога; pretty — формат как у одиночного interview_log.json"""
+    if pretty:
+        return json.dumps(log.model_dump(), ensure_ascii=False, indent=2)
+    return json.dumps(log.model_dump(), ensure_ascii=False, separators=(",", ":"))
+
+
+def atomic_write_text(path: Path, text: str) -> int:
+    """пишем во временный файл рядом и подменяем через os.replace — читатель никогда не видит половину файла"""
+    data = text.encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return len(data)
+
+
+class LogStore(Protocol):
+
+    def put(self, session_id: str, log: InterviewLog) -> int:
+        """сохраняет сессию целиком, возвращает число записанных байт"""
+        ...
+
+    def put_many(self, items: Iterable[Tuple[str, InterviewLog]]) -> int:
+        ...
+
+    def get(self, session_id: str) -> Optional[InterviewLog]:
+        ...
+
+    def session_ids(self) -> Iterator[str]:
+        ...
+
+    def delete(self, session_id: str) -> None:
+        """убрать сессию (например, после переноса в архив); отсутствующая — не ошибка"""
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class ShardedFileStore:
+    """
+    Файлы сессий раскладываются по корзинам: root/ab/cd/<session_id>.json,
+    где ab/cd — первые байты sha1(session_id). Так в одной директории не скапливаются тысячи файлов.
+    """
+
+    def __init__(self, root: str, levels: int = 2):
+        self.root = Path(root)
+        self.levels = levels
+
+    def path_for(self, session_id: str) -> Path:
+        check_session_id(session_id)
+        h = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        parts = [h[2 * i: 2 * i + 2] for i in range(self.levels)]
+        return self.root.joinpath(*parts, f"{session_id}.json")
+
+    def put(self, session_id: str, log: InterviewLog) -> int:
+        return atomic_write_text(self.path_for(session_id), dump_log(log))
+
+    def put_many(self, items: Iterable[Tuple[str, InterviewLog]]) -> int:
+        return sum(self.put(sid, log) for sid, log in items)
+
+    def get(self, session_id: str) -> Optional[InterviewLog]:
+        p = self.path_for(session_id)
+        if not p.exists():
+            return None
+        return InterviewLog.model_validate_json(p.read_bytes())
+
+    def session_ids(self) -> Iterator[str]:
+        pattern = "/".join(["*"] * self.levels + ["*.json"])
+        for p in sorted(self.root.glob(pattern)):
+            yield p.stem
+
+    def delete(self, session_id: str) -> None:
+        try:
+            self.path_for(session_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteLogStore:
+    """
+    Все сессии в одном SQLite-файле в режиме WAL:
+    читатели не блокируют писателя, параллельные писатели ждут busy_timeout, а не падают.
+    Соединение своё у каждого потока; close() закрывает соединения всех потоков.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " participant_name TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False — только чтобы close() мог закрыть соединение из другого потока;
+            # пользуется им по-прежнему один поток
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def put(self, session_id: str, log: InterviewLog) -> int:
+        return self.put_many([(session_id, log)])
+
+    def put_many(self, items: Iterable[Tuple[str, InterviewLog]]) -> int:
+        now = time.time()
+        rows = [(sid, log.participant_name, now, dump_log(log)) for sid, log in items]
+        # одна транзакция на пачку — один fsync вместо N
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT INTO sessions (session_id, participant_name, updated_at, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "participant_name=excluded.participant_name, updated_at=excluded.updated_at, data=excluded.data",
+                rows,
+            )
+        return sum(len(r[3].encode("utf-8")) for r in rows)
+
+    def get(self, session_id: str) -> Optional[InterviewLog]:
+        row = self._conn().execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return InterviewLog.model_validate_json(row[0])
+
+    def session_ids(self) -> Iterator[str]:
+        for (sid,) in self._conn().execute("SELECT session_id FROM sessions ORDER BY updated_at").fetchall():
+            yield sid
+
+    def delete(self, session_id: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        """закрыть соединения всех потоков; следующий вызов из потока откроет новое"""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+def open_store(spec: str) -> LogStore:
+    """
+    spec:
+    - sqlite:<path>   — SQLiteLogStore
+    - sharded:<dir>   — ShardedFileStore
+    """
+    kind, _, target = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind == "sqlite" and target:
+        return SQLiteLogStore(target)
+    if kind == "sharded" and target:
+        return ShardedFileStore(target)
+    raise ValueError(f"Unknown log store spec: {spec!r} (expected sqlite:<path> or sharded:<dir>)")
+
+
+def export_session(store: Optional[LogStore], session_id: str, out_path: str, archive: Optional["LogArchive"] = None) -> bool:
+    """
+    восстанавливаем привычный interview_log.json для одной сессии;
+    archive — завершенные сессии в архивном режиме (из store они при finalize удаляются)
+    """
+    log = store.get(session_id) if store is not None else None
+    if log is None and archive is not None:
+        log = archive.get(session_id)
+    if log is None:
+        return False
+    atomic_write_text(Path(out_path), dump_log(log, pretty=True))
+    return True
@@ -1,17 +1,43 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import uuid
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
 from .schemas import InterviewLog, TurnLog, FinalFeedback
+from .log_store import LogStore, atomic_write_text, dump_log
+
+if TYPE_CHECKING:
+    from .archive import LogArchive
+    from .usage import SessionUsage
 
 
 class InterviewLogger:
 
-    def __init__(self, path: str = "interview_log.json"):
+    def __init__(
+        self,
+        path: str = "interview_log.json",
+        store: Optional[LogStore] = None,
+        session_id: Optional[str] = None,
+        flush_every: int = 1,
+        archive: Optional["LogArchive"] = None,
+    ):
         self.path = Path(path)
+        # если задан store — пишем туда по session_id, иначе в один файл path
+        self.store = store
+        self.session_id = session_id or uuid.uuid4().hex
+        # сбрасываем на диск раз в flush_every ходов (start/finalize — всегда)
+        self.flush_every = max(1, flush_every)
+        # archive mode: завершенная сессия переезжает в сжатый архив (из store удаляется)
+        self.archive = archive
         self.log: Optional[InterviewLog] = None
+        self._unflushed = 0
+        # сколько байт лога записано за сессию (для учета расходов)
+        self.bytes_written = 0
+        self.writes = 0
+        # последняя ошибка записи в архив (лог при этом остался в store/файле)
+        self.last_error: Optional[str] = None
 
     def start(self, participant_name: str, meta: Dict[str, Any]) -> None:
         """Создаем новую сессию."""
@@ -36,19 +62,136 @@ class InterviewLogger:
                 internal_thoughts=internal_thoughts,
             )
         )
-        self.flush()
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
 
-    def finalize(self, final_feedback: FinalFeedback) -> None:
-        """Фиксируем финальный отчёт и сохраняем"""
+    def finalize(
+        self,
+        final_feedback: FinalFeedback,
+        state: Optional[Dict[str, Any]] = None,
+        usage: Optional["SessionUsage"] = None,
+    ) -> None:
+        """
+        Фиксируем финальный отчёт и сохраняем; state — снимок памяти для пересчёта отчёта позже,
+        usage — расходы сессии (meta["usage"], включая байты лога вместе с этой последней записью)
+        """
         assert self.log is not None, "Logger not started: call start() first"
         self.log.final_feedback = final_feedback
+        if state is not None:
+            self.log.meta["session_state"] = state
+        if usage is not None:
+            report = usage.to_dict()
+            report["io"] = {"bytes_written": 0, "writes": self.writes + 1}
+            self.log.meta["usage"] = report
+            # размер финальной записи зависит от самого числа — считаем по документу с ним же (± пара байт)
+            report["io"]["bytes_written"] = self.bytes_written + len(self._serialize().encode("utf-8"))
+        # финальная версия сначала в store/файл: если архив не примет её, отчёт всё равно сохранен
         self.flush()
+        if self.archive is not None:
+            try:
+                n = self.archive.add(self.session_id, self.log)
+            except Exception as e:
+                # лог остается в store целиком (с отчётом); в архив его можно добавить позже
+                self.last_error = f"archive {self.session_id}: {type(e).__name__}: {e}"
+                return
+            self.bytes_written += n
+            self.writes += 1
+            if self.store is not None:
+                # сессия уже в архиве: из store убираем, а не храним дважды
+                self.store.delete(self.session_id)
 
     def flush(self) -> None:
         """Физически пишем json на диск"""
         assert self.log is not None, "Logger not started: call start() first"
 
-        self.path.write_text(
-            json.dumps(self.log.model_dump(), ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        if self.store is not None:
+            n = self.store.put(self.session_id, self.log)
+        else:
+            n = atomic_write_text(self.path, self._serialize())
+        self.bytes_written += n
+        self.writes += 1
+        self._unflushed = 0
+
+    def _serialize(self) -> str:
+        assert self.log is not None
+        # в store — компактно (как dump_log в хранилищах), в одиночный файл — читаемо
+        return dump_log(self.log, pretty=self.store is None)
+
+    def export_state(self) -> Dict[str, Any]:
+        """лог сессии целиком + счетчики записи — для переноса сессии на другой узел"""
+        return {
+            "session_id": self.session_id,
+            "log": self.log.model_dump() if self.log is not None else None,
+            "bytes_written": self.bytes_written,
+            "writes": self.writes,
+        }
+
+    def import_state(self, state: Dict[str, Any]) -> None:
+        """продолжить чужую сессию: дальше пишем в свой store/path под тем же session_id"""
+        self.session_id = state["session_id"]
+        self.log = InterviewLog.model_validate(state["log"]) if state.get("log") is not None else None
+        self.bytes_written = state.get("bytes_written", 0)
+        self.writes = state.get("writes", 0)
+        self._unflushed = 0
+
+    def describe_target(self) -> str:
+        """куда пишется лог — для сообщений пользователю"""
+        if self.store is not None:
+            return f"{type(self.store).__name__} (session_id={self.session_id})"
+        return str(self.path)
+
+
+class AsyncLogWriter:
+    """
+    Фоновая запись лога для asyncio-пайплайна: операции логгера (add_turn, finalize, ...)
+    выполняются строго в порядке submit, по одной, в отдельном потоке — event loop и ответ кандидату
+    не ждут диска. drain() дожидается всех поставленных операций.
+    Ошибка записи не теряется: она поднимается из следующего submit()/drain().
+    """
+
+    def __init__(self):
+        self._queue: Optional["asyncio.Queue[Optional[Callable[[], Any]]]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._error: Optional[BaseException] = None
+
+    def _raise_pending_error(self) -> None:
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._raise_pending_error()
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run(self._queue))
+        assert self._queue is not None
+        self._queue.put_nowait(lambda: fn(*args, **kwargs))
+
+    async def _run(self, queue: "asyncio.Queue[Optional[Callable[[], Any]]]") -> None:
+        while True:
+            op = await queue.get()
+            try:
+                if op is None:
+                    return
+                if self._error is None:
+                    await asyncio.to_thread(op)
+            except BaseException as e:
+                # после ошибки следующие операции пропускаем: лог на диске не должен уйти вперед пропущенной записи
+                self._error = e
+            finally:
+                queue.task_done()
+
+    async def drain(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+        self._raise_pending_error()
+
+    async def aclose(self) -> None:
+        """дописать всё и остановить фоновую задачу"""
+        if self._task is not None and not self._task.done():
+            assert self._queue is not None
+            self._queue.put_nowait(None)
+            await self._task
+        self._task = None
+        self._raise_pending_error()
@@ -1,21 +1,39 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Any
+import copy
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+from .context import ContextWindow
+
+if TYPE_CHECKING:
+    from .question_bank import BankPartition
+    from .selection import QuestionSelector
 
 
 @dataclass
 class Memory:
     """Memory = "состояние" интервью"""
 
-    # последние n обменов, чтобы помнить контекст (включая "3 сообщения назад")
-    transcript: List[Dict[str, str]] = field(default_factory=list)
+    # последние n обменов целиком + сжатая сводка более ранних (включая "3 сообщения назад")
+    context: ContextWindow = field(default_factory=ContextWindow)
 
     # id заданных вопросов (чтобы не повторяться)
     asked_question_ids: List[str] = field(default_factory=list)
     # темы заданных вопросов (помогает чередовать темы)
     asked_topics: List[str] = field(default_factory=list)
 
+    # партиция банка под позицию/грейд сессии (None — весь встроенный банк)
+    bank: Optional["BankPartition"] = None
+    # пулы незаданных вопросов сессии (создаются Observer'ом при первом выборе)
+    selector: Optional["QuestionSelector"] = None
+    # seed RNG выбора вопросов: None — глобальный random
+    selection_seed: Optional[int] = None
+
+    # слабые темы из прошлых сессий кандидата (SkillStore): их спрашиваем в первую очередь
+    focus_topics: List[str] = field(default_factory=list)
+
     # адаптивность: общий уровень сложности
     difficulty: int = 1  # 1..5
     correct_streak: int = 0
@@ -36,12 +54,28 @@ class Memory:
     # история оценок по хард-скиллам (по каждому вопросу)
     evaluations: List[Dict[str, Any]] = field(default_factory=list)
 
-    def add_exchange(self, interviewer_msg: str, user_msg: str) -> None:
-        self.transcript.append({"interviewer": interviewer_msg, "user": user_msg})
+    @classmethod
+    def from_transcript(cls, transcript: List[Dict[str, str]], **kwargs: Any) -> "Memory":
+        """совместимость со старым полем: реплики [{"interviewer": ..., "user": ...}, ...] уходят в context"""
+        memory = cls(**kwargs)
+        memory.transcript = transcript
+        return memory
+
+    @property
+    def transcript(self) -> List[Dict[str, str]]:
+        """последние реплики целиком (старые уже свернуты в context.summary)"""
+        return self.context.exchanges
+
+    @transcript.setter
+    def transcript(self, exchanges: List[Dict[str, str]]) -> None:
+        """заменить историю: контекст собирается заново, старые реплики сворачиваются как при обычном ходе"""
+        c = self.context
+        self.context = ContextWindow(max_recent=c.max_recent, fold_block=c.fold_block, summary_max_tokens=c.summary_max_tokens)
+        for e in exchanges:
+            self.context.add(e["interviewer"], e["user"])
 
-        # держим только последние 12, чтобы не раздувать состояние
-        if len(self.transcript) > 12:
-            self.transcript = self.transcript[-12:]
+    def add_exchange(self, interviewer_msg: str, user_msg: str) -> None:
+        self.context.add(interviewer_msg, user_msg)
 
     def note_eval(self, item: Dict[str, Any]) -> None:
         """Сохраняем результат оценки ответа для финального отчёта"""
@@ -50,3 +84,90 @@ class Memory:
     def bump_difficulty(self, delta: int) -> None:
         """Уровень сложности всегда в пределах от 1 до 5"""
         self.difficulty = max(1, min(5, self.difficulty + delta))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-совместимое состояние для отчёта: всё, от чего зависит HiringManager.summarize"""
+        return copy.deepcopy(
+            {
+                "difficulty": self.difficulty,
+                "correct_streak": self.correct_streak,
+                "incorrect_streak": self.incorrect_streak,
+                "asked_question_ids": self.asked_question_ids,
+                "asked_topics": self.asked_topics,
+                "signals": self.signals,
+                "evaluations": self.evaluations,
+            }
+        )
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "Memory":
+        state = copy.deepcopy(state)
+        memory = cls(
+            asked_question_ids=state.get("asked_question_ids", []),
+            asked_topics=state.get("asked_topics", []),
+            difficulty=state.get("difficulty", 1),
+            correct_streak=state.get("correct_streak", 0),
+            incorrect_streak=state.get("incorrect_streak", 0),
+            evaluations=state.get("evaluations", []),
+        )
+        memory.signals.update(state.get("signals", {}))
+        return memory
+
+    def session_state(self) -> Dict[str, Any]:
+        """
+        Полное JSON-состояние живой сессии — для переноса на другой процесс/узел (cluster.py):
+        snapshot + контекст, партиция банка (ключ и источник, сами вопросы не копируются), RNG выбора.
+        Пулы селектора восстанавливаются из банка и asked_question_ids в том же порядке —
+        при том же seed следующие вопросы те же, что без переноса. Если на узле-получателе банк уже
+        другой ревизии, from_session_state поднимает BankRevisionError — сессия остается на прежнем узле.
+        """
+        c = self.context
+        state = self.snapshot()
+        state["context"] = {
+            "max_recent": c.max_recent,
+            "fold_block": c.fold_block,
+            "summary_max_tokens": c.summary_max_tokens,
+            "recent": [[e, t] for e, t in c.recent],
+            "summary_lines": [[line, t] for line, t in c.summary_lines],
+            "summary_tokens": c.summary_tokens,
+            "dropped_from_summary": c.dropped_from_summary,
+        }
+        state["bank"] = (
+            None
+            if self.bank is None
+            else {"position": self.bank.position, "grade": self.bank.grade, "source": asdict(self.bank.source)}
+        )
+        state["selection_seed"] = self.selection_seed
+        rng = self.selector.getstate() if self.selector is not None else None
+        state["selection_rng"] = None if rng is None else [rng[0], list(rng[1]), rng[2]]
+        state["focus_topics"] = list(self.focus_topics)
+        return copy.deepcopy(state)
+
+    @classmethod
+    def from_session_state(cls, state: Dict[str, Any]) -> "Memory":
+        from .question_bank import QUESTIONS, BankSource, load_partition
+        from .selection import QuestionSelector
+
+        memory = cls.from_snapshot(state)
+        c = state["context"]
+        memory.context = ContextWindow(
+            max_recent=c["max_recent"],
+            fold_block=c["fold_block"],
+            summary_max_tokens=c["summary_max_tokens"],
+            recent=deque((e, t) for e, t in c["recent"]),
+            summary_lines=deque((line, t) for line, t in c["summary_lines"]),
+            summary_tokens=c["summary_tokens"],
+            dropped_from_summary=c["dropped_from_summary"],
+        )
+        if state.get("bank") is not None:
+            b = state["bank"]
+            memory.bank = load_partition(b["position"], b["grade"], BankSource(**b["source"]))
+        memory.selection_seed = state.get("selection_seed")
+        memory.focus_topics = list(state.get("focus_topics", []))
+        rng = state.get("selection_rng")
+        if rng is not None:
+            # селектор уже делал выборы: тот же RNG и те же пулы (без seed селектор пересоздастся сам)
+            questions = memory.bank.questions if memory.bank is not None else QUESTIONS
+            memory.selector = QuestionSelector(questions, seed=memory.selection_seed, asked_ids=memory.asked_question_ids)
+            memory.selector.setstate((rng[0], tuple(rng[1]), rng[2]))
+        return memory
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
+from .config import DEFAULT_CONFIG, RuntimeConfig
 from .schemas import CandidateProfile
-from .logger import InterviewLogger
+from .logger import AsyncLogWriter, InterviewLogger
 from .memory import Memory
-from .question_bank import Question
+from .question_bank import Question, QUESTIONS_BY_ID, match_position
+from .execution import StageExecutor, INLINE
+from .skills import SkillStore, candidate_key, warm_start_difficulty
+from .llm.base import session_scope
+from .usage import SessionUsage
 
 from .agents.router import RouterAgent
-from .agents.observer import ObserverAgent
+from .agents.observer import LiveAnswer, ObserverAgent
 from .agents.interviewer import InterviewerAgent
 from .agents.hiring_manager import HiringManagerAgent
 
+if TYPE_CHECKING:
+    from .config import ConfigWatcher
+
 
 @dataclass
 class Orchestrator:
@@ -28,13 +38,61 @@ class Orchestrator:
     last_question: Optional[Question] = None
     turn_id: int = 0
 
+    # CPU-стадии (итоговый отчёт) можно вынести в пул процессов
+    executor: StageExecutor = INLINE
+
+    # навыки кандидата между сессиями: старт с прошлой сложности и слабых тем
+    skills: Optional[SkillStore] = None
+
+    # ответ, который ещё поступает кусками (feed_answer); сбрасывается каждым ходом
+    live_answer: Optional[LiveAnswer] = None
+
+    # фоновая упорядоченная запись лога для handle_user_message_async
+    log_writer: AsyncLogWriter = field(default_factory=AsyncLogWriter)
+
+    # версия правил (пороги, ключевые слова, штрафы, банк), к которой привязана сессия;
+    # с config_source берется его текущая версия на старте и не меняется до конца сессии
+    config: RuntimeConfig = DEFAULT_CONFIG
+    config_source: Optional["ConfigWatcher"] = None
+
+    # расходы сессии (LLM, CPU по стадиям, байты лога) — в meta["usage"] при finalize
+    usage: SessionUsage = field(default_factory=SessionUsage)
+
     def start(self, profile: CandidateProfile) -> str:
         """Стартовая реплика и инициализация сессии/памяти."""
+        self.usage = SessionUsage()
+        if self.config_source is not None:
+            self.config = self.config_source.current
+
         # стартовая сложность можно привязать к грейду
         self.memory.difficulty = {"Junior": 1, "Middle": 2, "Senior": 3}.get(profile.target_grade, 1)
+        # вопросы только своей позиции и диапазона грейда; партиция общая для всех сессий профиля
+        self.memory.bank = self.config.partition(profile.position, profile.target_grade)
 
-        # логгер по ТЗ: сохраняем вводные как meta
-        self.logger.start(profile.participant_name, meta=profile.model_dump())
+        # повторный кандидат: продолжаем с его уровня, а не гоняем заново по простым вопросам
+        if self.skills is not None:
+            prior = self.skills.get(candidate_key(profile.participant_name, profile.position))
+            if prior is not None:
+                self.memory.difficulty = warm_start_difficulty(prior, profile.target_grade)
+                in_bank = {q.topic for q in self.memory.bank.questions}
+                self.memory.focus_topics = [t for t in prior.weak_topics() if t in in_bank]
+
+        # логгер по ТЗ: сохраняем вводные как meta (+ версия конфигурации, если она управляемая)
+        meta = profile.model_dump()
+        if self.config_source is not None:
+            meta["config_version"] = self.config.version
+        # штрафы версии, с которой шла сессия: пересчёт отчёта (resummarize) берет их, а не текущие
+        meta["penalties"] = asdict(self.config.penalties)
+        # позиция не распознана (партиция по умолчанию) или у позиции нет вопросов в диапазоне грейда
+        # (весь диапазон без фильтра по позиции) — фиксируем это в логе, а не молча
+        key, matched = match_position(profile.position)
+        if not matched or self.memory.bank.position_fallback:
+            meta["position_fallback"] = {
+                "position": profile.position,
+                "used": key,
+                "whole_band": self.memory.bank.position_fallback,
+            }
+        self.logger.start(profile.participant_name, meta=meta)
 
         greeting = (
             f"Привет, {profile.participant_name}! Ты претендуешь на позицию {profile.target_grade} {profile.position}. "
@@ -46,47 +104,175 @@ class Orchestrator:
         self.turn_id = 1
         return greeting
 
-    def handle_user_message(self, profile: CandidateProfile, interviewer_msg: str, user_msg: str) -> Optional[str]:
-        # 0) контекст: помним "что спросили" и "что ответили"
-        self.memory.add_exchange(interviewer_msg, user_msg)
+    def feed_answer(self, chunk: str) -> Dict[str, Any]:
+        """
+        Кусок ответа кандидата до его отправки (голос/длинный набор).
+        Возвращает текущую оценку (clarity, score) и заранее выбранный следующий вопрос (next_qid).
+        handle_user_message с тем же полным текстом переиспользует и оценку, и выбор.
+        """
+        if self.live_answer is None:
+            self.live_answer = self.observer.begin_answer(self.last_question)
+        return self.observer.feed_answer(self.memory, self.live_answer, chunk)
 
-        # 1) Router решает, что за ситуация
-        decision = self.router.decide(user_msg)
+    def export_session(self) -> Dict[str, Any]:
+        """
+        JSON-состояние сессии между ходами (перенос на другой узел, cluster.py): память, позиция в интервью,
+        версия правил, лог и расходы. Набираемый ответ (feed_answer) не переносится — он переоценится целиком.
+        """
+        return {
+            "memory": self.memory.session_state(),
+            "last_qid": self.last_question.qid if self.last_question is not None else None,
+            "turn_id": self.turn_id,
+            "config": self.config.to_dict(),
+            "logger": self.logger.export_state(),
+            "usage": self.usage.state(),
+        }
 
-        # 2) Если stop — формируем финальный отчет и заканчиваем
-        if decision.route == "stop":
-            feedback = self.hiring_manager.summarize(profile.model_dump(), self.memory)
-            self.logger.finalize(feedback)
-            return None
+    def import_session(self, state: Dict[str, Any]) -> None:
+        """продолжить сессию из export_session; агенты, логгер и executor — свои, узла-получателя"""
+        self.memory = Memory.from_session_state(state["memory"])
+        by_id = self.memory.bank.by_id if self.memory.bank is not None else QUESTIONS_BY_ID
+        self.last_question = by_id.get(state["last_qid"]) if state["last_qid"] is not None else None
+        self.turn_id = state["turn_id"]
+        # сессия остается на своей версии правил, даже если у узла-получателя уже другая
+        self.config = RuntimeConfig.from_dict(state["config"])
+        self.logger.import_state(state["logger"])
+        self.usage = SessionUsage(**state["usage"])
+        self.live_answer = None
 
-        # 3) Hidden Reflection: Observer оценивает и строит план (включая след. вопрос)
-        plan_obj = self.observer.analyze_turn(
-            profile=profile.model_dump(),
-            memory=self.memory,
-            last_question=self.last_question,
-            user_answer=user_msg,
-            forced_route=decision.route,
-            router_flags=decision.flags,
+    def _record_skills(self, profile: CandidateProfile) -> None:
+        if self.skills is not None:
+            self.skills.record_session(
+                candidate_key(profile.participant_name, profile.position),
+                self.memory.difficulty,
+                self.memory.evaluations,
+            )
+
+    def _summarize(self, profile: CandidateProfile) -> Any:
+        wall0 = time.perf_counter()
+        feedback, cpu_s = self.executor.call_timed(
+            self.hiring_manager.summarize, profile.model_dump(), self.memory, self.config.penalties
         )
+        self.usage.add_stage("report", time.perf_counter() - wall0, cpu_s)
+        return feedback
 
+    def _compose(self, decision: Any, plan_obj: Any) -> Tuple[str, str]:
         # 4) Interviewer превращает план в человеческий ответ кандидату
         resp = self.interviewer.respond(plan_obj.plan)
 
-        # 5) Логируем turn в формате ТЗ
+        # 5) внутренние мысли хода в формате ТЗ
         internal = (
             f"[Router]: route={decision.route} flags={decision.flags} note={decision.note}\n"
             f"[Observer]: {plan_obj.internal_note}\n"
             f"[Interviewer]: {resp.internal_note}"
         )
-        self.logger.add_turn(self.turn_id, interviewer_msg, user_msg, internal)
+        return resp.visible_message, internal
 
+    def _timed_log(self, fn: Any, *args: Any, **kwargs: Any) -> None:
+        # фоновая запись лога (AsyncLogWriter): стадия "log" считается в потоке записи
+        with self.usage.stage("log"):
+            fn(*args, **kwargs)
+
+    def _advance(self) -> None:
         # 6) Готовим следующий ход
         self.turn_id += 1
 
-        from .question_bank import QUESTIONS
-
         if self.memory.asked_question_ids:
             last_qid = self.memory.asked_question_ids[-1]
-            self.last_question = next((q for q in QUESTIONS if q.qid == last_qid), None)
+            by_id = self.memory.bank.by_id if self.memory.bank is not None else QUESTIONS_BY_ID
+            self.last_question = by_id.get(last_qid)
+
+    def handle_user_message(
+        self,
+        profile: CandidateProfile,
+        interviewer_msg: str,
+        user_msg: str,
+        allow_llm: bool = True,
+    ) -> Optional[str]:
+        # allow_llm=False — ход под перегрузкой: без LLM, только вопросы из банка
+        live, self.live_answer = self.live_answer, None
+
+        # 0) контекст: помним "что спросили" и "что ответили"
+        self.memory.add_exchange(interviewer_msg, user_msg)
+
+        # 1) Router решает, что за ситуация
+        with self.usage.stage("route"):
+            decision = self.router.decide(user_msg, self.config.router)
+
+        # 2) Если stop — формируем финальный отчет и заканчиваем
+        if decision.route == "stop":
+            feedback = self._summarize(profile)
+            with self.usage.stage("log"):
+                self.logger.finalize(feedback, state=self.memory.snapshot(), usage=self.usage)
+            self._record_skills(profile)
+            return None
+
+        # 3) Hidden Reflection: Observer оценивает и строит план (включая след. вопрос)
+        # session_scope: вызовы LLM помечены сессией (воспроизводимый replay кассет при параллельных сессиях)
+        with session_scope(self.logger.session_id):
+            plan_obj = self.observer.analyze_turn(
+                profile=profile.model_dump(),
+                memory=self.memory,
+                last_question=self.last_question,
+                user_answer=user_msg,
+                forced_route=decision.route,
+                router_flags=decision.flags,
+                allow_llm=allow_llm,
+                live=live,
+                usage=self.usage,
+            )
+
+        with self.usage.stage("compose"):
+            visible, internal = self._compose(decision, plan_obj)
+        with self.usage.stage("log"):
+            self.logger.add_turn(self.turn_id, interviewer_msg, user_msg, internal)
+        self._advance()
+        return visible
+
+    async def handle_user_message_async(
+        self,
+        profile: CandidateProfile,
+        interviewer_msg: str,
+        user_msg: str,
+        allow_llm: bool = True,
+    ) -> Optional[str]:
+        """
+        Тот же ход для asyncio-сервера; лог и поведение — как у handle_user_message.
+        - скоринг и итоговый отчёт ждём через StageExecutor.run, LLM — без блокировки event loop
+        - запись хода в лог уходит в фон (AsyncLogWriter, строго по порядку ходов), ответ кандидату её не ждёт
+        - на stop дожидаемся всех записей: когда вернулся None, финальный отчёт уже сохранён
+        """
+        live, self.live_answer = self.live_answer, None
+        self.memory.add_exchange(interviewer_msg, user_msg)
+        with self.usage.stage("route"):
+            decision = self.router.decide(user_msg, self.config.router)
+
+        if decision.route == "stop":
+            wall0 = time.perf_counter()
+            feedback, cpu_s = await self.executor.run_timed(
+                self.hiring_manager.summarize, profile.model_dump(), self.memory, self.config.penalties
+            )
+            self.usage.add_stage("report", time.perf_counter() - wall0, cpu_s)
+            self.log_writer.submit(self._timed_log, self.logger.finalize, feedback, state=self.memory.snapshot(), usage=self.usage)
+            # навыки и лог — разные хранилища: пишем параллельно
+            await asyncio.gather(self.log_writer.drain(), asyncio.to_thread(self._record_skills, profile))
+            return None
+
+        with session_scope(self.logger.session_id):
+            plan_obj = await self.observer.analyze_turn_async(
+                profile=profile.model_dump(),
+                memory=self.memory,
+                last_question=self.last_question,
+                user_answer=user_msg,
+                forced_route=decision.route,
+                router_flags=decision.flags,
+                allow_llm=allow_llm,
+                live=live,
+                usage=self.usage,
+            )
 
-        return resp.visible_message
+        with self.usage.stage("compose"):
+            visible, internal = self._compose(decision, plan_obj)
+        self.log_writer.submit(self._timed_log, self.logger.add_turn, self.turn_id, interviewer_msg, user_msg, internal)
+        self._advance()
+        return visible
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
-import random
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import gc
+import hashlib
+import json
+import os
+import threading
+
+from .rubric import Rubric, RubricPoint, compile_bank, warm_rubrics
+from .strings import StringTable, bank_strings, open_string_table, table_by_digest, write_string_table
 
 
 @dataclass(frozen=True)
@@ -12,7 +20,34 @@ class Question:
     difficulty: int  # 1..5
     text: str
     expected_points: List[str]
-    reference_answer: str
+    reference_answer: str = ""
+    # явная рубрика (синонимы/основы/веса); если нет — собирается из expected_points
+    rubric: Optional[Rubric] = None
+    # для каких позиций вопрос (ключи POSITION_KEYWORDS)
+    positions: Tuple[str, ...] = ("backend",)
+    # внешний банк: эталонный ответ лежит в BANK_DIR/strings.bin, здесь только смещение
+    reference_ref: Optional[int] = None
+    # каталог банка, если он задан конфигурацией, а не BANK_DIR (там же и strings.bin)
+    bank_dir: Optional[str] = None
+    # digest таблицы строк, в которой лежит reference_ref (файл мог быть переписан новой ревизией банка)
+    strings_id: Optional[str] = None
+
+    def reference_text(self) -> str:
+        if self.reference_ref is None:
+            return self.reference_answer
+        return _resolve_ref(self.reference_ref, self.qid, self.bank_dir, self.strings_id)
+
+    def reference_fields(self) -> Dict[str, Any]:
+        """что положить в оценку: смещение, если оно есть, иначе сам текст"""
+        if self.reference_ref is not None:
+            fields: Dict[str, Any] = {"reference_ref": self.reference_ref}
+            if self.bank_dir is not None:
+                fields["bank_dir"] = self.bank_dir
+            # смещение имеет смысл только в своей таблице: без digest его нельзя проверить после смены банка
+            if self.strings_id is not None:
+                fields["strings_id"] = self.strings_id
+            return fields
+        return {"reference_answer": self.reference_answer}
 
 
 # небольшой банк вопросов
@@ -125,36 +160,331 @@ QUESTIONS: List[Question] = [
     ),
 ]
 
+QUESTIONS_BY_ID = {q.qid: q for q in QUESTIONS}
+
+
+def _strings_for(bank_dir: Optional[str], strings_id: Optional[str]) -> Optional[StringTable]:
+    """таблица, к которой относятся смещения: по digest среди открытых в процессе, иначе текущая, если digest совпал"""
+    if strings_id is None:
+        return bank_strings(bank_dir)
+    table = table_by_digest(strings_id)
+    if table is None:
+        current = bank_strings(bank_dir)
+        table = current if current is not None and current.digest == strings_id else None
+    return table
+
+
+def _resolve_ref(
+    ref: int, qid: Optional[str] = None, bank_dir: Optional[str] = None, strings_id: Optional[str] = None
+) -> str:
+    table = _strings_for(bank_dir, strings_id)
+    if table is not None:
+        try:
+            return table.get(ref)
+        except ValueError:
+            # таблицу только что вытеснила новая версия файла (mmap закрыт) — как если бы ее не было
+            pass
+    # таблицы с этим digest нет (банк переписан, пересчёт на другой машине): смещение чужое —
+    # ищем вопрос по qid в загруженных партициях того же банка, затем во встроенном банке
+    for part in list(_PARTITIONS.values()):
+        q = part.by_id.get(qid or "") if part.source.bank_dir == bank_dir else None
+        if q is not None and q.strings_id != strings_id:
+            return q.reference_text()
+    q = QUESTIONS_BY_ID.get(qid or "")
+    return q.reference_answer if q is not None else ""
+
+
+def reference_for(evaluation: Dict[str, Any]) -> str:
+    """эталонный ответ из записи оценки: текстом (старые логи, встроенный банк) или смещением в таблице строк"""
+    if "reference_answer" in evaluation:
+        return evaluation["reference_answer"]
+    if evaluation.get("reference_ref") is not None:
+        return _resolve_ref(
+            evaluation["reference_ref"], evaluation.get("qid"), evaluation.get("bank_dir"), evaluation.get("strings_id")
+        )
+    return ""
+
+
+# --- партиции банка по позиции и грейду ---
+
+# диапазон сложности, который вообще имеет смысл показывать кандидату этого грейда
+GRADE_BANDS: Dict[str, Tuple[int, int]] = {
+    "Junior": (1, 3),
+    "Middle": (1, 4),
+    "Senior": (2, 5),
+}
+
+POSITION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "backend": ("backend", "бэкенд", "бекенд", "python", "django", "server"),
+    "frontend": ("frontend", "фронтенд", "react", "javascript", "vue"),
+    "data": ("data", "дата", "аналитик", "analyst", "ml", "etl"),
+}
+DEFAULT_POSITION = "backend"
+
+
+def match_position(position: str) -> Tuple[str, bool]:
+    """свободный текст позиции -> (ключ партиции, распознан ли); не распознан — DEFAULT_POSITION"""
+    p = position.strip().lower()
+    for key, words in POSITION_KEYWORDS.items():
+        if any(w in p for w in words):
+            return key, True
+    return DEFAULT_POSITION, False
+
+
+def position_key(position: str) -> str:
+    """свободный текст позиции -> ключ партиции"""
+    return match_position(position)[0]
+
+
+class BankRevisionError(ValueError):
+    """файлы банка на диске уже другой ревизии, чем та, к которой привязана партиция (сессия, версия правил)"""
+
+
+# манифест внешнего банка: пишется последним (dump_partitions), его смена = новая ревизия всего каталога
+MANIFEST = "manifest.json"
+
+
+def bank_revision(bank_dir: str) -> str:
+    """
+    ревизия банка: из manifest.json, если он есть (дешево — один файл);
+    без манифеста — отпечаток всех файлов банка (путь, размер, mtime)
+    """
+    manifest = Path(bank_dir) / MANIFEST
+    if manifest.exists():
+        revision = json.loads(manifest.read_text(encoding="utf-8")).get("revision")
+        if not isinstance(revision, str) or not revision:
+            raise ValueError(f"{manifest}: no revision")
+        return revision
+    h = hashlib.sha1()
+    for path in sorted(Path(bank_dir).rglob("*")):
+        if path.is_file() and (path.suffix == ".json" or path.name == "strings.bin"):
+            st = path.stat()
+            h.update(f"{path.relative_to(bank_dir)}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class BankSource:
+    """
+    Откуда и как собирать партиции (задается версией конфигурации, см. config.py):
+    - bank_dir: каталог внешнего банка (None — BANK_DIR или встроенный банк)
+    - correct_at/partial_at: пороги для вопросов без собственной рубрики
+    - revision: отпечаток файлов банка — новый банк в том же каталоге дает новые партиции
+    """
+
+    bank_dir: Optional[str] = None
+    correct_at: float = 0.65
+    partial_at: float = 0.30
+    revision: str = ""
+
+
+DEFAULT_SOURCE = BankSource()
+
+
+@dataclass(frozen=True, eq=False)
+class BankPartition:
+    """
+    Часть банка под одну позицию и грейд. Общая на все сессии процесса и только для чтения.
+    При передаче в другой процесс (pickle) не копируется, а заново берется из кэша партиций там.
+    """
+
+    position: str
+    grade: str
+    questions: Tuple[Question, ...]
+    by_id: Dict[str, Question] = field(repr=False)
+    source: BankSource = DEFAULT_SOURCE
+    # во встроенном банке нет вопросов этой позиции в диапазоне грейда — взят весь диапазон без фильтра по позиции
+    position_fallback: bool = False
+
+    def __reduce__(self):
+        return (load_partition, (self.position, self.grade, self.source))
+
+
+_PARTITIONS: Dict[Tuple[str, str, BankSource], BankPartition] = {}
+_PARTITIONS_LOCK = threading.Lock()
+
+
+def question_from_dict(d: Dict[str, Any], bank_dir: Optional[str] = None, strings_id: Optional[str] = None) -> Question:
+    rubric = None
+    if d.get("rubric"):
+        r = d["rubric"]
+        rubric = Rubric(
+            points=tuple(
+                RubricPoint(
+                    name=p["name"],
+                    synonyms=tuple(p.get("synonyms", ())),
+                    stems=tuple(p.get("stems", ())),
+                    weight=float(p.get("weight", 1.0)),
+                    required=bool(p.get("required", False)),
+                )
+                for p in r["points"]
+            ),
+            negations=tuple(r.get("negations", ())),
+            **{k: r[k] for k in ("correct_at", "partial_at") if k in r},
+            **({"unknown": tuple(r["unknown"])} if "unknown" in r else {}),
+        )
+    return Question(
+        qid=d["qid"],
+        topic=d["topic"],
+        difficulty=int(d["difficulty"]),
+        text=d["text"],
+        expected_points=list(d.get("expected_points", [])),
+        reference_answer=d.get("reference_answer", ""),
+        rubric=rubric,
+        positions=tuple(d.get("positions", (DEFAULT_POSITION,))),
+        reference_ref=d.get("reference_ref"),
+        bank_dir=bank_dir,
+        strings_id=strings_id if d.get("reference_ref") is not None else None,
+    )
+
+
+def _partition_source(position: str, grade: str, source: BankSource = DEFAULT_SOURCE) -> Tuple[List[Question], bool]:
+    questions, fallback = _partition_questions(position, grade, source.bank_dir)
+    if (source.correct_at, source.partial_at) == (DEFAULT_SOURCE.correct_at, DEFAULT_SOURCE.partial_at):
+        return questions, fallback
+    # пороги конфигурации — только для вопросов без своей рубрики (у явной рубрики пороги свои)
+    return [
+        q if q.rubric is not None else replace(
+            q,
+            rubric=Rubric.from_expected_points(q.expected_points, correct_at=source.correct_at, partial_at=source.partial_at),
+        )
+        for q in questions
+    ], fallback
+
+
+def _partition_questions(position: str, grade: str, bank_dir: Optional[str] = None) -> Tuple[List[Question], bool]:
+    """вопросы партиции и признак fallback: позиции нет в диапазоне грейда, взят весь диапазон"""
+    # 1) внешний банк: <bank_dir>/<position>/<grade>.json (список вопросов); без bank_dir — BANK_DIR
+    if bank_dir is None:
+        root, owner = os.getenv("BANK_DIR", "").strip(), None
+    else:
+        root, owner = bank_dir, bank_dir
+    if root:
+        path = Path(root) / position / f"{grade}.json"
+        if path.exists():
+            # таблицу строк открываем вместе с JSON: смещения партиции привязаны к этой версии файла
+            table = bank_strings(root)
+            strings_id = table.digest if table is not None else None
+            return [question_from_dict(d, owner, strings_id) for d in json.loads(path.read_text(encoding="utf-8"))], False
+
+    # 2) встроенный банк, отфильтрованный по позиции и диапазону сложности грейда
+    lo, hi = GRADE_BANDS.get(grade, (1, 5))
+    in_band = [q for q in QUESTIONS if lo <= q.difficulty <= hi]
+    own = [q for q in in_band if position in q.positions]
+    return (own, False) if own else (in_band, True)
+
+
+def load_partition(position: str, grade: str, source: Optional[BankSource] = None) -> BankPartition:
+    """партиция под профиль сессии; грузится при первом обращении и дальше переиспользуется"""
+    source = source or DEFAULT_SOURCE
+    key = (position_key(position), grade, source)
+    part = _PARTITIONS.get(key)
+    if part is None:
+        with _PARTITIONS_LOCK:
+            part = _PARTITIONS.get(key)
+            if part is None:
+                # партиция старой ревизии, которой в этом процессе нет (перенос сессии, пул процессов):
+                # собрать её из новых файлов под старым ключом нельзя — сессия молча получила бы другой банк
+                if source.revision and source.bank_dir is not None:
+                    current = bank_revision(source.bank_dir)
+                    if current != source.revision:
+                        raise BankRevisionError(f"{source.bank_dir}: bank revision {current} != {source.revision}")
+                questions, fallback = _partition_source(key[0], key[1], source)
+                questions = tuple(questions)
+                warm_rubrics(questions)
+                part = BankPartition(
+                    position=key[0],
+                    grade=key[1],
+                    questions=questions,
+                    by_id={q.qid: q for q in questions},
+                    source=source,
+                    position_fallback=fallback,
+                )
+                _PARTITIONS[key] = part
+    return part
+
+
+def bank_digest(questions: Iterable[Question]) -> str:
+    """
+    отпечаток того, что банк вкладывает в отчёт: скомпилированные рубрики (с порогами) и эталоны;
+    сменилась рубрика или эталон — отчёты по этим вопросам устарели (resummarize)
+    """
+    questions = list(questions)
+    compiled = compile_bank(questions)
+    h = hashlib.sha1()
+    for q in sorted(questions, key=lambda q: q.qid):
+        h.update(f"{q.qid}\x00{compiled[q.qid].rubric!r}\x00{q.reference_text()}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def drop_partitions(keep: Iterable[BankSource] = ()) -> int:
+    """
+    убрать из кэша партиции источников, которых нет в keep (старые версии конфигурации);
+    сессии, которые уже держат такую партицию, доигрывают с ней — она живет, пока на нее есть ссылки
+    """
+    keep = set(keep) | {DEFAULT_SOURCE}
+    with _PARTITIONS_LOCK:
+        stale = [k for k in _PARTITIONS if k[2] not in keep]
+        for k in stale:
+            del _PARTITIONS[k]
+    return len(stale)
+
+
+def preload_partitions(
+    positions: Optional[Iterable[str]] = None,
+    grades: Optional[Iterable[str]] = None,
+    freeze: bool = False,
+) -> None:
+    """
+    Загрузить партиции заранее — в мастер-процессе перед fork воркеров.
+    freeze=True — еще и gc.freeze(): все объекты процесса (не только банк) уходят из обхода сборщика,
+    воркеры не трогают эти страницы памяти и они остаются общими (copy-on-write).
+    Это действие на весь процесс, поэтому только по явной просьбе — в коде, который сам запускает воркеры.
+    """
+    for position in positions or POSITION_KEYWORDS:
+        for grade in grades or GRADE_BANDS:
+            load_partition(position, grade)
+    if freeze:
+        gc.freeze()
+
 
-def pick_question(
-    difficulty: int,
-    asked_ids: List[str],
-    asked_topics: List[str],
-    preferred_topic: Optional[str] = None,
-) -> Question:
+def dump_partitions(root: str, strings: bool = True) -> List[str]:
     """
-    выбор следующего вопроса:
-    - берем вопросы близкого уровня сложности (±1), чтобы изменения были плавные
-    - не повторяем уже заданные qid
-    - стараемся не долбить одну тему подряд
+    разложить встроенный банк в BANK_DIR-формат: <root>/<position>/<grade>.json
+    strings=True — эталонные ответы уходят в <root>/strings.bin, в JSON остаются смещения reference_ref
     """
-    # плавная адаптация: берем рядом по сложности
-    candidates = [q for q in QUESTIONS if q.qid not in asked_ids and abs(q.difficulty - difficulty) <= 1]
-
-    # если нужно "дожать" конкретную тему - пробуем ту же тему
-    if preferred_topic:
-        same_topic = [q for q in candidates if q.topic == preferred_topic]
-        if same_topic:
-            return random.choice(same_topic)
-
-    # иначе — избегаем повторов темы последних 2 вопросов
-    not_recent_topics = [q for q in candidates if q.topic not in asked_topics[-2:]]
-    if not_recent_topics:
-        return random.choice(not_recent_topics)
-
-    if candidates:
-        return random.choice(candidates)
-
-    # если вдруг все близкие вопросы кончились, берем любой оставшийся
-    remaining = [q for q in QUESTIONS if q.qid not in asked_ids]
-    return random.choice(remaining) if remaining else random.choice(QUESTIONS)
+    written = []
+    refs: Dict[str, int] = {}
+    digest = hashlib.sha1()
+    strings_id = None
+    if strings:
+        path = Path(root) / "strings.bin"
+        refs = write_string_table(str(path), (q.reference_answer for q in QUESTIONS))
+        strings_id = open_string_table(str(path)).digest
+        digest.update(strings_id.encode("ascii"))
+        written.append(str(path))
+    for position in POSITION_KEYWORDS:
+        for grade, (lo, hi) in GRADE_BANDS.items():
+            qs = [q for q in QUESTIONS if position in q.positions and lo <= q.difficulty <= hi]
+            if not qs:
+                continue
+            path = Path(root) / position / f"{grade}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            items = [asdict(q) for q in qs]
+            for d in items:
+                d.pop("reference_ref")
+                d.pop("bank_dir")
+                d.pop("strings_id")
+                if strings:
+                    d["reference_ref"] = refs[d.pop("reference_answer")]
+            data = json.dumps(items, ensure_ascii=False, indent=2)
+            path.write_text(data, encoding="utf-8")
+            digest.update(f"{position}/{grade}\x00{data}".encode("utf-8"))
+            written.append(str(path))
+    # манифест — последним: наблюдатель конфигурации видит новую ревизию, когда все файлы уже на месте
+    manifest = Path(root) / MANIFEST
+    tmp = manifest.with_name(f".{MANIFEST}.tmp")
+    tmp.write_text(json.dumps({"revision": digest.hexdigest()[:12], "strings": strings_id}), encoding="utf-8")
+    os.replace(tmp, manifest)
+    written.append(str(manifest))
+    return written
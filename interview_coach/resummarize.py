@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .agents.hiring_manager import HiringManagerAgent, Penalties, REPORT_VERSION
+from .config import DEFAULT_CONFIG, RuntimeConfig
+from .log_store import LogStore, atomic_write_text
+from .memory import Memory
+from .question_bank import BankPartition, bank_digest
+from .schemas import CandidateProfile, InterviewLog
+from .scoring import score_turn
+
+
+# (session_id, profile, state, penalties) — всё, что нужно для пересчёта FinalFeedback;
+# penalties — штрафы версии правил, с которой шла сессия (meta.penalties), None — по умолчанию
+SummaryInput = Tuple[str, Dict[str, Any], Dict[str, Any], Optional[Dict[str, float]]]
+
+_REFERENCE_KEYS = ("reference_answer", "reference_ref", "bank_dir", "strings_id")
+
+
+def inputs_from_logs(logs: Iterable[Tuple[str, InterviewLog]], stats: Optional[Dict[str, int]] = None) -> Iterator[SummaryInput]:
+    """достаем профиль и снимок памяти из логов; сессии без снимка (не завершены/старый формат) пропускаем"""
+    profile_keys = CandidateProfile.model_fields.keys()
+    for session_id, log in logs:
+        state = log.meta.get("session_state")
+        if state is None:
+            if stats is not None:
+                stats["missing_state"] += 1
+            continue
+        profile = {k: log.meta[k] for k in profile_keys if k in log.meta}
+        yield session_id, profile, state, log.meta.get("penalties")
+
+
+def logs_from_store(store: LogStore) -> Iterator[Tuple[str, InterviewLog]]:
+    for session_id in store.session_ids():
+        log = store.get(session_id)
+        if log is not None:
+            yield session_id, log
+
+
+def logs_from_archive(archive: Any) -> Iterator[Tuple[str, InterviewLog]]:
+    for entry in archive.find():
+        yield entry.session_id, archive.read(entry)
+
+
+def logs_from_files(paths: Iterable[str]) -> Iterator[Tuple[str, InterviewLog]]:
+    for p in paths:
+        path = Path(p)
+        yield path.stem, InterviewLog.model_validate_json(path.read_bytes())
+
+
+def fingerprint(
+    profile: Dict[str, Any],
+    state: Dict[str, Any],
+    penalties: Optional[Dict[str, float]] = None,
+    bank: str = "",
+    version: str = REPORT_VERSION,
+) -> str:
+    """хэш входов отчёта + ревизии банка (рубрики, эталоны) + версии логики: не изменилось — пересчитывать нечего"""
+    payload = json.dumps(
+        {"v": version, "bank": bank, "penalties": penalties, "profile": profile, "state": state},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def rescore(evaluations: List[Dict[str, Any]], bank: BankPartition) -> List[Dict[str, Any]]:
+    """
+    переоценить сохраненные ответы по текущим рубрикам банка; эталон — тоже из текущего банка.
+    Вопросы, которых в банке больше нет, остаются с оценкой, полученной в сессии.
+    """
+    out = []
+    for e in evaluations:
+        q = bank.by_id.get(e.get("qid") or "")
+        if q is None or "answer" not in e:
+            out.append(e)
+            continue
+        sc = score_turn(e["answer"], q)["score"]
+        item = {k: v for k, v in e.items() if k not in _REFERENCE_KEYS}
+        item.update(eval=sc["label"], coverage=sc["coverage"], missing=sc["missing"], **q.reference_fields())
+        out.append(item)
+    return out
+
+
+def summarize_one(item: SummaryInput, bank: BankPartition) -> Tuple[str, Dict[str, Any]]:
+    """CPU-стадия для пула процессов: аргументы и результат — простые dict (партиция передается по ключу)"""
+    session_id, profile, state, penalties = item
+    memory = Memory.from_snapshot(state)
+    memory.evaluations = rescore(memory.evaluations, bank)
+    feedback = HiringManagerAgent().summarize(profile, memory, Penalties(**penalties) if penalties else None)
+    return session_id, feedback.model_dump()
+
+
+class ReportWriter:
+    """
+    Версионированные отчёты: out_dir/<version>/<session_id>.json
+    manifest.sqlite хранит fingerprint входов каждого записанного отчёта.
+    """
+
+    def __init__(self, out_dir: str, version: str = REPORT_VERSION):
+        self.version = version
+        self.dir = Path(out_dir) / version
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(Path(out_dir) / "manifest.sqlite"))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " session_id TEXT NOT NULL, version TEXT NOT NULL, fingerprint TEXT NOT NULL, written_at REAL NOT NULL,"
+            " PRIMARY KEY (session_id, version))"
+        )
+
+    def is_current(self, session_id: str, fp: str) -> bool:
+        row = self._conn.execute(
+            "SELECT fingerprint FROM reports WHERE session_id = ? AND version = ?", (session_id, self.version)
+        ).fetchone()
+        return row is not None and row[0] == fp and (self.dir / f"{session_id}.json").exists()
+
+    def write(self, session_id: str, fp: str, feedback: Dict[str, Any]) -> None:
+        atomic_write_text(
+            self.dir / f"{session_id}.json",
+            json.dumps(
+                {"session_id": session_id, "report_version": self.version, "inputs_fingerprint": fp, "final_feedback": feedback},
+                ensure_ascii=False,
+                indent=2,
+            ),
+        )
+        # манифест — после файла: при падении между ними отчёт просто пересчитается
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports (session_id, version, fingerprint, written_at) VALUES (?, ?, ?, ?)",
+                (session_id, self.version, fp, time.time()),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def resummarize(
+    logs: Iterable[Tuple[str, InterviewLog]],
+    out_dir: str,
+    workers: int = 0,
+    max_in_flight: Optional[int] = None,
+    force: bool = False,
+    config: RuntimeConfig = DEFAULT_CONFIG,
+) -> Dict[str, int]:
+    """
+    Пакетный пересчёт FinalFeedback.
+    Ответы переоцениваются по рубрикам банка config (текущая версия правил), штрафы — те, с которыми шла сессия.
+    Логи читаются потоком, в пуле процессов одновременно не больше max_in_flight задач,
+    каждый готовый отчёт сразу пишется на диск. workers=0 — без пула, в текущем процессе.
+    """
+    stats = {"seen": 0, "skipped": 0, "written": 0, "missing_state": 0, "failed": 0}
+    writer = ReportWriter(out_dir)
+    digests: Dict[Tuple[str, str], str] = {}
+
+    def pending_items() -> Iterator[Tuple[SummaryInput, BankPartition, str]]:
+        for item in inputs_from_logs(logs, stats):
+            stats["seen"] += 1
+            profile = item[1]
+            bank = config.partition(profile.get("position", ""), profile.get("target_grade", ""))
+            key = (bank.position, bank.grade)
+            if key not in digests:
+                digests[key] = bank_digest(bank.questions)
+            fp = fingerprint(profile, item[2], item[3], digests[key])
+            if not force and writer.is_current(item[0], fp):
+                stats["skipped"] += 1
+                continue
+            yield item, bank, fp
+
+    try:
+        if workers <= 0:
+            for item, bank, fp in pending_items():
+                try:
+                    session_id, feedback = summarize_one(item, bank)
+                except Exception:
+                    # как в пуле: битая сессия учитывается в failed, остальные пересчитываются
+                    stats["failed"] += 1
+                    continue
+                writer.write(session_id, fp, feedback)
+                stats["written"] += 1
+            return stats
+
+        limit = max_in_flight or workers * 4
+        in_flight: Dict[Future, str] = {}
+        fps: Dict[str, str] = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+
+            def drain(block_until: int) -> None:
+                while len(in_flight) > block_until:
+                    done, _ = wait(set(in_flight), return_when=FIRST_COMPLETED)
+                    for f in done:
+                        sid = in_flight.pop(f)
+                        fp = fps.pop(sid)
+                        try:
+                            session_id, feedback = f.result()
+                        except Exception:
+                            stats["failed"] += 1
+                            continue
+                        writer.write(session_id, fp, feedback)
+                        stats["written"] += 1
+
+            for item, bank, fp in pending_items():
+                fps[item[0]] = fp
+                in_flight[pool.submit(summarize_one, item, bank)] = item[0]
+                drain(limit - 1)
+            drain(0)
+        return stats
+    finally:
+        writer.close()
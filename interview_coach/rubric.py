@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+_WS = re.compile(r"\s+")
+_CYR_WORD = re.compile(r"[а-яё]+")
+
+# фразы "не знаю" — ответ сразу оценивается как unknown
+UNKNOWN_PHRASES: Tuple[str, ...] = (
+    "не знаю",
+    "не уверен",
+    "затрудняюсь",
+    "без понятия",
+)
+
+# таблица окончаний для русских слов: основа = слово без самого длинного подходящего окончания,
+# чтобы в рубрике не перечислять все словоформы ("ленивый" -> "ленив" ловит "ленивая/ленивое/ленивых")
+RU_ENDINGS: Tuple[str, ...] = tuple(
+    sorted(
+        {
+            "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ешь", "ишь",
+            "ется", "ются", "ится", "ятся", "ться", "ых", "их", "ой", "ей", "ий", "ый", "ая", "яя",
+            "ое", "ее", "ые", "ие", "ую", "юю", "ов", "ев", "ом", "ем", "ам", "ям", "ах", "ях",
+            "ть", "ет", "ют", "ит", "ат", "ят", "ия", "ью",
+            "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+        },
+        key=len,
+        reverse=True,
+    )
+)
+MIN_STEM_LEN = 4
+
+
+def norm_text(s: str) -> str:
+    """нормализация текста: нижний регистр + схлопнутые пробелы"""
+    return _WS.sub(" ", s.strip().lower())
+
+
+def stem_ru(word: str) -> str:
+    """основа русского слова по таблице окончаний; латиницу и короткие слова не трогаем"""
+    w = word.lower()
+    if not _CYR_WORD.fullmatch(w):
+        return w
+    for ending in RU_ENDINGS:
+        if w.endswith(ending) and len(w) - len(ending) >= MIN_STEM_LEN:
+            return w[: -len(ending)]
+    return w
+
+
+def stem_phrase(phrase: str) -> str:
+    """в фразе стеммим только последнее слово — иначе фраза перестанет быть подстрокой текста"""
+    words = norm_text(phrase).split(" ")
+    words[-1] = stem_ru(words[-1])
+    return " ".join(words)
+
+
+@dataclass(frozen=True)
+class RubricPoint:
+    """
+    Пункт рубрики:
+    - name: как пункт показывается в matched/missing
+    - synonyms: слова/фразы, последнее слово приводится к основе по RU_ENDINGS
+    - stems: основы "как есть" (совпадение по подстроке)
+    - weight: вес в coverage
+    - required: без этого пункта ответ не может быть correct
+    """
+
+    name: str
+    synonyms: Tuple[str, ...] = ()
+    stems: Tuple[str, ...] = ()
+    weight: float = 1.0
+    required: bool = False
+
+    def terms(self) -> Tuple[str, ...]:
+        ts = [norm_text(s) for s in self.stems] + [stem_phrase(s) for s in self.synonyms]
+        if not ts:
+            ts = [norm_text(self.name)]
+        return tuple(dict.fromkeys(t for t in ts if t))
+
+
+@dataclass(frozen=True)
+class Rubric:
+    """
+    Декларативная рубрика вопроса.
+    negations — маркеры отрицания ("не", "нет"): термин сразу после маркера не засчитывается.
+    """
+
+    points: Tuple[RubricPoint, ...]
+    negations: Tuple[str, ...] = ()
+    unknown: Tuple[str, ...] = UNKNOWN_PHRASES
+    correct_at: float = 0.65
+    partial_at: float = 0.30
+
+    @classmethod
+    def from_expected_points(cls, expected_points: Sequence[str], **kwargs: Any) -> "Rubric":
+        """старый формат банка: каждый expected_point — подстрока с весом 1"""
+        return cls(points=tuple(RubricPoint(name=p, stems=(p,)) for p in expected_points), **kwargs)
+
+
+class CompiledRubric:
+    """
+    Рубрика, собранная в один regex.
+
+    Все термины (пункты, unknown-фразы, отрицания) идут в одну альтернативу от длинных к коротким:
+    finditer за один проход находит на каждой позиции самый длинный термин.
+    Короткие термины, входящие в найденный (iter внутри iterator), досчитываются по таблице
+    вложенности, посчитанной при компиляции, — так ловятся и перекрывающиеся совпадения.
+    """
+
+    def __init__(self, rubric: Rubric):
+        self.rubric = rubric
+
+        # термин -> роли: ("p", idx пункта) / ("u", 0) / ("n", 0)
+        roles: Dict[str, List[Tuple[str, int]]] = {}
+        for i, point in enumerate(rubric.points):
+            for t in point.terms():
+                roles.setdefault(t, []).append(("p", i))
+        for t in rubric.unknown:
+            roles.setdefault(norm_text(t), []).append(("u", 0))
+        for t in rubric.negations:
+            roles.setdefault(norm_text(t), []).append(("n", 0))
+        roles.pop("", None)
+
+        self.terms: List[str] = sorted(roles, key=len, reverse=True)
+        self.roles: List[List[Tuple[str, int]]] = [roles[t] for t in self.terms]
+        self.max_term_len = max((len(t) for t in self.terms), default=0)
+
+        # вложенность: для термина i — все (j, смещение), где terms[j] входит в terms[i]
+        self.implied: List[List[Tuple[int, int]]] = []
+        for outer in self.terms:
+            occ = []
+            for j, inner in enumerate(self.terms):
+                start = outer.find(inner)
+                while start != -1:
+                    occ.append((j, start))
+                    start = outer.find(inner, start + 1)
+            self.implied.append(occ)
+
+        # без отрицаний позиции не нужны: группа regex -> какие пункты она засчитывает и есть ли unknown
+        self.positional = bool(rubric.negations)
+        self.group_points: List[frozenset] = []
+        self.group_unknown: List[bool] = []
+        for occ in self.implied:
+            roles_here = [r for j, _ in occ for r in self.roles[j]]
+            self.group_points.append(frozenset(idx for kind, idx in roles_here if kind == "p"))
+            self.group_unknown.append(any(kind == "u" for kind, _ in roles_here))
+
+        self.pattern: Optional[re.Pattern[str]] = None
+        if self.terms:
+            # ветка = первый символ термина + lookahead на остаток: regex ищет кандидатов по первому символу
+            # (быстрый поиск внутри sre), а поглощается только один символ — перекрытия не теряются
+            self.pattern = re.compile(
+                "|".join(f"{re.escape(t[0])}(?=({re.escape(t[1:])}))" for t in self.terms)
+            )
+
+    def occurrences(self, text: str, offset: int = 0) -> List[Tuple[int, int]]:
+        """все вхождения терминов в нормализованный text: (индекс термина, абсолютная позиция) по возрастанию позиции"""
+        if self.pattern is None:
+            return []
+        found = []
+        for m in self.pattern.finditer(text):
+            pos = m.start() + offset
+            for j, off in self.implied[m.lastindex - 1]:
+                found.append((j, pos + off))
+        found.sort(key=lambda x: x[1])
+        return found
+
+    def collect(
+        self,
+        occurrences: Iterable[Tuple[int, int]],
+        text_at: Any,
+        matched: Set[int],
+        negation_ends: Set[int],
+    ) -> bool:
+        """
+        Раскладываем вхождения по ролям. Возвращает True, если встретилась unknown-фраза.
+        text_at(pos) -> символ нормализованного текста на позиции (или "" вне текста).
+        Вхождения должны идти по возрастанию позиции, чтобы отрицание успело встретиться раньше термина.
+        """
+        unknown = False
+        for j, pos in occurrences:
+            for kind, idx in self.roles[j]:
+                if kind == "u":
+                    unknown = True
+                elif kind == "n":
+                    # маркер отрицания считаем только с начала слова
+                    if pos == 0 or text_at(pos - 1) == " ":
+                        negation_ends.add(pos + len(self.terms[j]))
+                elif idx not in matched:
+                    if pos in negation_ends or (pos - 1 in negation_ends and text_at(pos - 1) == " "):
+                        continue
+                    matched.add(idx)
+        return unknown
+
+    def result(self, matched: Set[int], unknown: bool) -> Dict[str, Any]:
+        points = self.rubric.points
+        if unknown:
+            return {
+                "label": "unknown",
+                "coverage": 0.0,
+                "matched": [],
+                "missing": [p.name for p in points],
+            }
+
+        total = sum(p.weight for p in points)
+        got = sum(p.weight for i, p in enumerate(points) if i in matched)
+        coverage = 0.0 if not total else got / total
+
+        if coverage >= self.rubric.correct_at:
+            label = "correct"
+        elif coverage >= self.rubric.partial_at:
+            label = "partial"
+        else:
+            label = "wrong"
+
+        # без обязательного пункта — максимум partial
+        if label == "correct" and any(p.required and i not in matched for i, p in enumerate(points)):
+            label = "partial"
+
+        return {
+            "label": label,
+            "coverage": coverage,
+            "matched": [p.name for i, p in enumerate(points) if i in matched],
+            "missing": [p.name for i, p in enumerate(points) if i not in matched],
+        }
+
+    def stream(self) -> "RubricStream":
+        return RubricStream(self)
+
+    def score(self, answer: str) -> Dict[str, Any]:
+        t = norm_text(answer)
+        matched: Set[int] = set()
+
+        if not self.positional:
+            if self.pattern is None:
+                return self.result(matched, False)
+            groups = {m.lastindex for m in self.pattern.finditer(t)}
+            unknown = False
+            for g in groups:
+                matched |= self.group_points[g - 1]
+                unknown = unknown or self.group_unknown[g - 1]
+            return self.result(matched, unknown)
+
+        unknown = self.collect(
+            self.occurrences(t),
+            lambda i: t[i] if 0 <= i < len(t) else "",
+            matched,
+            set(),
+        )
+        return self.result(matched, unknown)
+
+
+class RubricStream:
+    """
+    Оценка ответа по мере поступления текста (голос, длинный набор).
+
+    Кусок нормализуется так же, как norm_text нормализует весь ответ, и сканируется вместе
+    с хвостом уже полученного текста длиной max_term_len: термин на стыке кусков находится,
+    а вхождения, целиком лежащие в старом тексте, повторно не учитываются.
+    После последнего куска result() совпадает с CompiledRubric.score(весь ответ).
+    """
+
+    def __init__(self, compiled: CompiledRubric):
+        self.compiled = compiled
+        self.matched: Set[int] = set()
+        self.unknown = False
+        self._negation_ends: Set[int] = set()
+        self._tail = ""  # конец нормализованного текста
+        self._length = 0  # длина нормализованного текста
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        c = _WS.sub(" ", chunk.lower())
+        # пробелы в начале ответа и на стыке с пробелом предыдущего куска схлопываются
+        if c.startswith(" ") and (not self._length or self._tail.endswith(" ")):
+            c = c[1:]
+        if not c:
+            return self.result()
+
+        compiled = self.compiled
+        window = self._tail + c
+        start = self._length - len(self._tail)
+        self._length += len(c)
+        if compiled.pattern is not None:
+            old_length = self._length - len(c)
+            fresh = [
+                (j, pos)
+                for j, pos in compiled.occurrences(window, start)
+                if pos + len(compiled.terms[j]) > old_length
+            ]
+            if fresh:
+                found_unknown = compiled.collect(
+                    fresh,
+                    lambda i: window[i - start] if start <= i < start + len(window) else "",
+                    self.matched,
+                    self._negation_ends,
+                )
+                self.unknown = self.unknown or found_unknown
+            # отрицание влияет только на термин сразу за ним — старые концы больше не понадобятся
+            horizon = self._length - compiled.max_term_len
+            self._negation_ends = {e for e in self._negation_ends if e >= horizon}
+
+        # хвоста длиной max_term_len хватает и на термин через стык, и на символ перед ним
+        self._tail = window[-compiled.max_term_len:] if compiled.max_term_len else ""
+        return self.result()
+
+    def result(self) -> Dict[str, Any]:
+        return self.compiled.result(self.matched, self.unknown)
+
+
+@lru_cache(maxsize=None)
+def compile_rubric(rubric: Rubric) -> CompiledRubric:
+    return CompiledRubric(rubric)
+
+
+@lru_cache(maxsize=4096)
+def compile_expected_points(expected_points: Tuple[str, ...]) -> CompiledRubric:
+    return CompiledRubric(Rubric.from_expected_points(expected_points))
+
+
+def compiled_for(question: Any) -> CompiledRubric:
+    """рубрика вопроса: явная (question.rubric) или собранная из expected_points"""
+    rubric = getattr(question, "rubric", None)
+    if rubric is not None:
+        return compile_rubric(rubric)
+    return compile_expected_points(tuple(question.expected_points))
+
+
+def compile_bank(questions: Iterable[Any]) -> Dict[str, CompiledRubric]:
+    """скомпилированные рубрики банка по qid"""
+    return {q.qid: compiled_for(q) for q in questions}
+
+
+def warm_rubrics(questions: Iterable[Any]) -> None:
+    """компилируем рубрики заранее, при загрузке банка: их держит кэш compiled_for, первый ход по вопросу не ждёт компиляции"""
+    for q in questions:
+        compiled_for(q)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .schemas import CandidateProfile
+
+# классы приоритета: живые кандидаты всегда раньше пакетных прогонов (replay, пересчёт отчётов)
+INTERACTIVE = 0
+BATCH = 1
+
+
+class Overloaded(RuntimeError):
+    """очередь заполнена — ход не принят (admission control)"""
+
+
+@dataclass
+class _Job:
+    session_id: str
+    fn: Callable[[bool], Any]  # fn(degraded) -> результат хода
+    priority: int
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class TurnScheduler:
+    """
+    Планировщик ходов интервью:
+    - ограниченная очередь: при max_queue ожидающих ходов новые отклоняются (Overloaded)
+    - справедливость: внутри класса приоритета сессии обслуживаются по кругу (round-robin),
+      одна сессия не может занять все воркеры пачкой своих ходов
+    - ходы одной сессии выполняются строго последовательно (Orchestrator не потокобезопасен)
+    - деградация: если ход прождал дольше shed_wait_s или очередь глубже shed_depth,
+      он выполняется с degraded=True — без LLM, на банковских вопросах
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        max_queue: int = 256,
+        shed_wait_s: float = 2.0,
+        shed_depth: Optional[int] = None,
+        metrics_window: int = 1000,
+    ):
+        self.max_queue = max_queue
+        self.shed_wait_s = shed_wait_s
+        self.shed_depth = shed_depth if shed_depth is not None else max_queue // 2
+
+        self._cond = threading.Condition()
+        # priority -> (session_id -> очередь ходов); порядок ключей = порядок обхода по кругу
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Job]]"] = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self._running: set = set()
+        self._depth = 0
+        self._closed = False
+
+        self._waits: Deque[float] = deque(maxlen=metrics_window)
+        self._counters = {"admitted": 0, "rejected": 0, "shed": 0, "completed": 0, "failed": 0}
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"turn-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # --- приём ---
+
+    def submit(self, session_id: str, fn: Callable[[bool], Any], priority: int = INTERACTIVE) -> Future:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is shut down")
+            if self._depth >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise Overloaded(f"turn queue is full ({self._depth}/{self.max_queue})")
+            job = _Job(session_id=session_id, fn=fn, priority=priority)
+            self._queues[priority].setdefault(session_id, deque()).append(job)
+            self._depth += 1
+            self._counters["admitted"] += 1
+            self._cond.notify()
+        return job.future
+
+    # --- выдача ---
+
+    def _next_job(self) -> Optional[_Job]:
+        """следующий ход: сначала INTERACTIVE, внутри класса — первая по кругу свободная сессия"""
+        for priority in (INTERACTIVE, BATCH):
+            sessions = self._queues[priority]
+            for sid in list(sessions):
+                if sid in self._running:
+                    continue
+                jobs = sessions.pop(sid)
+                job = jobs.popleft()
+                if jobs:
+                    # у сессии ещё есть ходы — в конец круга
+                    sessions[sid] = jobs
+                return job
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+                self._depth -= 1
+                self._running.add(job.session_id)
+                waited = time.monotonic() - job.enqueued_at
+                self._waits.append(waited)
+                degraded = waited > self.shed_wait_s or self._depth >= self.shed_depth
+                if degraded:
+                    self._counters["shed"] += 1
+
+            outcome = None
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.fn(degraded))
+                        outcome = "completed"
+                    except BaseException as e:
+                        job.future.set_exception(e)
+                        outcome = "failed"
+            finally:
+                with self._cond:
+                    if outcome is not None:
+                        self._counters[outcome] += 1
+                    self._running.discard(job.session_id)
+                    # сессия освободилась — её следующий ход может взять другой воркер
+                    self._cond.notify_all()
+
+    # --- метрики ---
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            waits: List[float] = sorted(self._waits)
+            depth_by_class = {
+                "interactive": sum(len(q) for q in self._queues[INTERACTIVE].values()),
+                "batch": sum(len(q) for q in self._queues[BATCH].values()),
+            }
+            counters = dict(self._counters)
+            running = len(self._running)
+
+        def pct(q: float) -> Optional[float]:
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else None
+
+        return {
+            "queue_depth": sum(depth_by_class.values()),
+            "queue_depth_by_class": depth_by_class,
+            "running": running,
+            "wait_p50_s": pct(0.5),
+            "wait_p95_s": pct(0.95),
+            "wait_max_s": waits[-1] if waits else None,
+            **counters,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+def schedule_turn(
+    scheduler: TurnScheduler,
+    session_id: str,
+    orchestrator: Any,
+    profile: CandidateProfile,
+    interviewer_msg: str,
+    user_msg: str,
+    priority: int = INTERACTIVE,
+) -> Future:
+    """ход Orchestrator через планировщик; под перегрузкой — без LLM"""
+    return scheduler.submit(
+        session_id,
+        lambda degraded: orchestrator.handle_user_message(
+            profile, interviewer_msg, user_msg, allow_llm=not degraded
+        ),
+        priority=priority,
+    )
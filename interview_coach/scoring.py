@@ -1,61 +1,41 @@
 from __future__ import annotations
 
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 
+from .rubric import Rubric, UNKNOWN_PHRASES, compile_expected_points, compile_rubric, compiled_for, norm_text
 
-I_DONT_KNOW_PATTERNS = [
-    r"не знаю",
-    r"не уверен",
-    r"затрудняюсь",
-    r"без понятия",
-]
+if TYPE_CHECKING:
+    from .question_bank import Question
+
+
+# оставлено для совместимости: теперь это часть рубрики (Rubric.unknown)
+I_DONT_KNOW_PATTERNS = list(UNKNOWN_PHRASES)
 
 
 def _norm(s: str) -> str:
     """нормализация текста под простую проверку ключевых слов"""
-    return re.sub(r"\s+", " ", s.strip().lower())
+    return norm_text(s)
 
 
-def score_answer(answer: str, expected_points: List[str]) -> Dict[str, Any]:
+def score_answer(answer: str, expected_points: List[str], rubric: Optional[Rubric] = None) -> Dict[str, Any]:
     """
-    Идея: у каждого вопроса есть expected_points (ключевые признаки хорошего ответа).
-    Смотрим, сколько пунктов встретилось в тексте.
+    Идея: у каждого вопроса есть expected_points (ключевые признаки хорошего ответа)
+    или явная рубрика (синонимы, основы, отрицания, веса, обязательные пункты).
+    Рубрика компилируется один раз и проверяет ответ за один проход.
 
     Возвращаем:
     - label: correct/partial/wrong/unknown
-    - coverage: доля покрытых пунктов
+    - coverage: доля покрытых пунктов (с учетом весов)
     - matched/missing: какие пункты нашли/не нашли
     """
-    t = _norm(answer)
-
-    if any(re.search(p, t) for p in I_DONT_KNOW_PATTERNS):
-        return {
-            "label": "unknown",
-            "coverage": 0.0,
-            "matched": [],
-            "missing": expected_points,
-        }
-
-    matched = [p for p in expected_points if p.lower() in t]
-    coverage = 0.0 if not expected_points else len(matched) / len(expected_points)
-
-    # Простая шкала: можно потом настроить
-    if coverage >= 0.65:
-        label = "correct"
-    elif coverage >= 0.30:
-        label = "partial"
-    else:
-        label = "wrong"
+    if rubric is not None:
+        return compile_rubric(rubric).score(answer)
+    return compile_expected_points(tuple(expected_points)).score(answer)
 
-    missing = [p for p in expected_points if p not in matched]
 
-    return {
-        "label": label,
-        "coverage": coverage,
-        "matched": matched,
-        "missing": missing,
-    }
+def score_question(answer: str, question: "Question") -> Dict[str, Any]:
+    """оценка ответа по рубрике вопроса из банка"""
+    return compiled_for(question).score(answer)
 
 
 def estimate_clarity(answer: str) -> int:
@@ -65,9 +45,62 @@ def estimate_clarity(answer: str) -> int:
     - 1: нормально
     - 2: достаточно развернуто
     """
-    t = answer.strip()
-    if len(t) < 25:
+    return _clarity_for_length(len(answer.strip()))
+
+
+def _clarity_for_length(n: int) -> int:
+    if n < 25:
         return 0
-    if len(t) < 120:
+    if n < 120:
         return 1
     return 2
+
+
+def score_turn(answer: str, question: Optional["Question"]) -> Dict[str, Any]:
+    """
+    CPU-стадия хода одним вызовом (удобно отправлять в пул процессов):
+    - clarity: estimate_clarity
+    - score: оценка по рубрике вопроса или None, если оценивать нечего
+    """
+    return {
+        "clarity": estimate_clarity(answer),
+        "score": score_question(answer, question) if question is not None else None,
+    }
+
+
+class StreamingTurnScorer:
+    """
+    score_turn по частям: ответ приходит кусками (голос, длинный набор), оценка доступна в любой момент.
+    После последнего куска snapshot() == score_turn(text, question).
+    """
+
+    def __init__(self, question: Optional["Question"]):
+        self.question = question
+        self._rubric = compiled_for(question).stream() if question is not None else None
+        self._parts: List[str] = []
+        # длина ответа без пробелов по краям = _body + ещё не закрытые пробелы в конце (_trail)
+        self._body = 0
+        self._trail = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        self._parts.append(chunk)
+        s = chunk if self._body else chunk.lstrip()
+        stripped = s.rstrip()
+        if stripped:
+            self._body += self._trail + len(stripped)
+            self._trail = len(s) - len(stripped)
+        else:
+            self._trail += len(s)
+        if self._rubric is not None:
+            self._rubric.feed(chunk)
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "clarity": _clarity_for_length(self._body),
+            "score": self._rubric.result() if self._rubric is not None else None,
+        }
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+from interview_coach.archive import LogArchive
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Архив завершенных интервью (zstd-бандлы)")
+    parser.add_argument("--archive", default=os.getenv("LOG_ARCHIVE", ""), help="директория архива")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    roll = sub.add_parser("roll", help="свернуть ожидающие сессии в бандл")
+    roll.add_argument("--min", type=int, default=1, help="сворачивать, только если ожидающих не меньше")
+
+    watch = sub.add_parser("watch", help="сворачивать в фоне по мере накопления bundle_size сессий")
+    watch.add_argument("--bundle-size", type=int, default=256)
+    watch.add_argument("--poll", type=float, default=60.0, help="период проверки, сек")
+
+    find = sub.add_parser("find", help="найти сессии по участнику/дате")
+    find.add_argument("--participant")
+    find.add_argument("--date-from")
+    find.add_argument("--date-to")
+
+    show = sub.add_parser("show", help="вывести InterviewLog сессии")
+    show.add_argument("session_id")
+
+    args = parser.parse_args()
+    if not args.archive:
+        parser.error("--archive is required (or set LOG_ARCHIVE)")
+    if args.cmd == "watch":
+        archive = LogArchive(args.archive, bundle_size=args.bundle_size, poll_s=args.poll).start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            archive.stop()
+        return
+    archive = LogArchive(args.archive)
+
+    if args.cmd == "roll":
+        print("Bundle:", archive.roll(min_sessions=args.min) or "nothing to roll")
+    elif args.cmd == "find":
+        for e in archive.find(participant=args.participant, date_from=args.date_from, date_to=args.date_to):
+            print(f"{e.date}  {e.session_id}  {e.participant_name}  {e.bundle}")
+    elif args.cmd == "show":
+        log = archive.get(args.session_id)
+        if log is None:
+            print("Not found:", args.session_id)
+        else:
+            print(json.dumps(log.model_dump(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    run()
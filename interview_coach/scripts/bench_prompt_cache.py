@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+from typing import List
+
+from interview_coach.schemas import CandidateProfile
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.log_store import ShardedFileStore
+from interview_coach.llm.base import Message
+from interview_coach.llm.stub import PrefixCacheStubLLM
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import OBSERVER_SYSTEM, ObserverAgent
+from interview_coach.context import count_tokens
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+from interview_coach.orchestrator import Orchestrator
+
+
+PROFILES = [
+    ("Backend Developer", "Junior"),
+    ("Backend Developer", "Middle"),
+    ("Backend Developer", "Senior"),
+]
+
+ANSWERS = [
+    "INNER JOIN возвращает совпавшие строки, LEFT JOIN — все строки слева и NULL справа.",
+    "list изменяемый, tuple неизменяемый, dict по ключу, set уникальные элементы.",
+    "Не знаю, честно.",
+    "Индекс ускоряет поиск, но замедляет запись и занимает место.",
+    "QuerySet ленивый, SQL выполняется при итерации; select_related помогает от N+1.",
+]
+
+
+def legacy_messages(profile, memory: Memory, next_q, token_budget: int) -> List[Message]:
+    """
+    Промпт Observer в том виде, в каком он собирался до раскладки prefix + suffix: короткий system,
+    сводка отдельным user-сообщением, реплики, затем prompt_user хода (вводные профиля + задание) в конце.
+    """
+    c = memory.context
+    prompt_user = (
+        f"Вводные: position={profile['position']} grade={profile['target_grade']} exp={profile['experience']}\n"
+        f"Текущая сложность={memory.difficulty}\n"
+        f"Сформулируй ОДИН вопрос для интервью.\n"
+        f"Тема: {next_q.topic}; сложность ~{next_q.difficulty}.\n"
+        f"Не повторяй недавно заданные темы: {memory.asked_topics[-6:]}.\n"
+    )
+    fixed = count_tokens(OBSERVER_SYSTEM) + count_tokens(prompt_user)
+    summary = c.summary_text()
+    summary_tokens = count_tokens(summary) if summary else 0
+    recent = list(c.recent)
+    recent_tokens = sum(t for _, t in recent)
+    while recent and fixed + summary_tokens + recent_tokens > token_budget:
+        recent_tokens -= recent.pop(0)[1]
+    if summary and fixed + summary_tokens + recent_tokens > token_budget:
+        summary = ""
+
+    messages = [Message("system", OBSERVER_SYSTEM)]
+    if summary:
+        messages.append(Message("user", summary))
+    for exchange, _ in recent:
+        messages.append(Message("assistant", exchange["interviewer"]))
+        messages.append(Message("user", exchange["user"]))
+    messages.append(Message("user", prompt_user))
+    return messages
+
+
+class LegacyObserverAgent(ObserverAgent):
+    """Observer со старой сборкой промпта — база сравнения; всё остальное (выбор вопроса, оценка) то же"""
+
+    def _rephrase_messages(self, profile, memory, next_q):
+        return legacy_messages(profile, memory, next_q, self.prompt_token_budget)
+
+
+def simulate(llm, sessions: int, turns: int, seed: int, log_dir: str, observer_cls=ObserverAgent) -> None:
+    rnd = random.Random(seed)
+    random.seed(seed)
+    for i in range(sessions):
+        position, grade = PROFILES[i % len(PROFILES)]
+        profile = CandidateProfile(
+            participant_name=f"Кандидат {i}",
+            position=position,
+            target_grade=grade,  # type: ignore
+            experience=f"{rnd.randint(0, 8)} лет, проекты на Django/FastAPI",
+        )
+        orch = Orchestrator(
+            router=RouterAgent(),
+            observer=observer_cls(llm=llm),
+            interviewer=InterviewerAgent(),
+            hiring_manager=HiringManagerAgent(),
+            logger=InterviewLogger(store=ShardedFileStore(log_dir)),
+            memory=Memory(),
+        )
+        msg = orch.start(profile)
+        for _ in range(turns):
+            msg = orch.handle_user_message(profile, msg, rnd.choice(ANSWERS)) or msg
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Префикс-кэш: прежняя сборка промпта Observer vs stable prefix + suffix")
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--log-dir", default=None, help="куда писать логи сессий (по умолчанию — временная директория)")
+    args = parser.parse_args()
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix="bench_prompt_cache_")
+
+    legacy = PrefixCacheStubLLM()
+    simulate(legacy, args.sessions, args.turns, args.seed, log_dir, observer_cls=LegacyObserverAgent)
+
+    layered = PrefixCacheStubLLM()
+    simulate(layered, args.sessions, args.turns, args.seed, log_dir)
+
+    for name, llm in (("legacy", legacy), ("prefix+suffix", layered)):
+        st = llm.stats()
+        print(
+            f"{name:14s} requests={st['requests']} prompt_tokens={st['prompt_tokens']} "
+            f"hit_rate={st['hit_rate']:.1%} mean_latency={st['mean_latency_s'] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    run()
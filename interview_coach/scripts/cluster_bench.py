@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from interview_coach.cluster import Coordinator, WorkerClient
+from interview_coach.log_store import open_store
+from interview_coach.question_bank import QUESTIONS_BY_ID
+from interview_coach.schemas import CandidateProfile
+from interview_coach.scripts.load_test import ANSWER_KINDS, PERSONAS, pct
+
+
+def spawn_worker(name: str, address: str, log_store: str, llm_scale: float) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "interview_coach.scripts.cluster_worker",
+        "--listen", address, "--name", name, "--log-store", log_store, "--stub-llm-scale", str(llm_scale),
+    ]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+
+
+def wait_ready(address: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            client = WorkerClient(address, timeout_s=5.0)
+            client.call("ping")
+            client.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run_session(idx: int, coord: Coordinator, turns: int, seed: int, latencies: List[float], errors: List[str], lock: threading.Lock) -> int:
+    rnd = random.Random(seed * 100_003 + idx)
+    persona_name = list(PERSONAS)[idx % len(PERSONAS)]
+    persona = PERSONAS[persona_name]
+    kinds, weights = list(persona), list(persona.values())
+    sid = f"cluster-{seed}-{idx}"
+    profile = CandidateProfile(
+        participant_name=f"cluster-{idx}",
+        position="Backend Developer",
+        target_grade=rnd.choice(["Junior", "Middle", "Senior"]),  # type: ignore
+        experience=f"persona={persona_name}",
+    )
+    try:
+        coord.start(sid, profile)
+        qid: Optional[str] = None
+        done = 0
+        for turn in range(turns + 1):
+            last = turn == turns
+            answer = "Стоп интервью" if last else ANSWER_KINDS[rnd.choices(kinds, weights)[0]](QUESTIONS_BY_ID.get(qid or ""), rnd)
+            t0 = time.perf_counter()
+            result = coord.turn(sid, answer)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+            done += 1
+            if result.get("reply") is None:
+                if result.get("final_feedback") is None:
+                    raise RuntimeError("session stopped without final feedback")
+                return done
+            qid = result.get("question_id")
+        raise RuntimeError("session did not stop")
+    except Exception as e:
+        with lock:
+            errors.append(f"{sid}: {type(e).__name__}: {e}")
+        return 0
+
+
+def bench(workers: int, args: argparse.Namespace, tmp: str, rebalance: bool = False) -> Dict[str, Any]:
+    log_store = f"sqlite:{os.path.join(tmp, f'logs-{workers}-{int(rebalance)}.db')}"
+    procs: Dict[str, subprocess.Popen] = {}
+    nodes: Dict[str, str] = {}
+
+    def add(name: str) -> str:
+        address = f"unix:{os.path.join(tmp, name + '.sock')}"
+        procs[name] = spawn_worker(name, address, log_store, args.llm_latency_scale)
+        wait_ready(address)
+        return address
+
+    for i in range(workers):
+        nodes[f"w{i}"] = add(f"w{i}")
+    # запасной узел поднимаем заранее: в кольцо он входит уже под нагрузкой
+    extra = add("extra") if rebalance else ""
+    coord = Coordinator(nodes)
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    moves: List[Dict[str, Any]] = []
+
+    def churn() -> None:
+        # посреди прогона: новый узел, затем вывод одного из исходных — сессии переезжают между ходами
+        try:
+            time.sleep(args.rebalance_after)
+            t0 = time.perf_counter()
+            moved = coord.add_node("extra", extra)
+            moves.append({"op": "add extra", "moved": moved, "s": round(time.perf_counter() - t0, 3)})
+            time.sleep(args.rebalance_after)
+            t0 = time.perf_counter()
+            moved = coord.remove_node("w0")
+            moves.append({"op": "remove w0", "moved": moved, "s": round(time.perf_counter() - t0, 3)})
+        except Exception as e:
+            with lock:
+                errors.append(f"rebalance: {type(e).__name__}: {e}")
+
+    churner = threading.Thread(target=churn, daemon=True) if rebalance else None
+    wall0 = time.perf_counter()
+    if churner is not None:
+        churner.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        turns_done = sum(
+            pool.map(lambda i: run_session(i, coord, args.turns, args.seed, latencies, errors, lock), range(args.sessions))
+        )
+    wall = time.perf_counter() - wall0
+    if churner is not None:
+        churner.join()
+
+    stats = coord.stats()
+    coord.close()
+    for name, proc in procs.items():
+        try:
+            WorkerClient(nodes.get(name) or extra, timeout_s=5.0).call("shutdown")
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    # каждая сессия должна дойти до финального отчёта ровно в одном логе, где бы её ни обслуживали
+    store = open_store(log_store)
+    finalized = sum(
+        1
+        for i in range(args.sessions)
+        for log in [store.get(f"cluster-{args.seed}-{i}")]
+        if log is not None and log.final_feedback is not None
+    )
+
+    lat = sorted(latencies)
+    return {
+        "workers": workers,
+        "rebalance": moves if rebalance else None,
+        "sessions": args.sessions,
+        "finalized": finalized,
+        "turns": turns_done,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_s": round(wall, 3),
+        "throughput_turns_per_s": round(turns_done / wall, 1) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(pct(lat, 0.5) * 1000, 2),
+            "p95": round(pct(lat, 0.95) * 1000, 2),
+            "p99": round(pct(lat, 0.99) * 1000, 2),
+        },
+        "sessions_left": {name: s["sessions"] for name, s in stats["nodes"].items()},
+        "turns_by_node": {name: s["turns"] for name, s in stats["nodes"].items()},
+    }
+
+
+def run(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Масштабирование по процессам: сессии, шардированные по воркерам через Coordinator")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="размеры кластера для сравнения")
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency-scale", type=float, default=0.0,
+                        help="задержки заглушки LLM (0 — только CPU: видно масштабирование по ядрам)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rebalance", action="store_true", help="ещё прогон с добавлением и выводом узла посреди нагрузки")
+    parser.add_argument("--rebalance-after", type=float, default=0.3, help="пауза перед каждой сменой состава, сек")
+    parser.add_argument("--report-out", default=None)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="cluster_bench_")
+    try:
+        runs = [bench(n, args, tmp) for n in args.workers]
+        base = runs[0]["throughput_turns_per_s"] / runs[0]["workers"] if runs and runs[0]["throughput_turns_per_s"] else 0.0
+        for r in runs:
+            r["speedup_per_worker"] = round(r["throughput_turns_per_s"] / base / r["workers"], 2) if base else None
+        report: Dict[str, Any] = {"cpu_count": os.cpu_count(), "runs": runs}
+        if args.rebalance:
+            report["rebalance_run"] = bench(max(args.workers), args, tmp, rebalance=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.report_out:
+        with open(args.report_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Any, Callable, Tuple
+
+from dotenv import load_dotenv
+
+from interview_coach.cli import build_llm
+from interview_coach.cluster import SessionWorker
+from interview_coach.config import ConfigWatcher
+from interview_coach.execution import StageExecutor
+from interview_coach.log_store import open_store
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.skills import SkillStore
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+
+def make_factory(
+    log_store: str, llm: Any, config_path: str = "", skill_store: str = ""
+) -> Tuple[Callable[[str], Orchestrator], Callable[[], None]]:
+    """
+    Orchestrator на сессию; общие для процесса объекты (LLM, executor, хранилища, конфигурация) — одни на всех.
+    log_store должен быть общим для всех воркеров: после переезда сессия дописывает свой лог уже с другого узла.
+    Возвращает (factory, close): close() освобождает общие объекты, когда воркер остановлен.
+    """
+    store = open_store(log_store)
+    executor = StageExecutor.from_env()
+    skills = SkillStore(skill_store) if skill_store else None
+    config_source = ConfigWatcher(config_path).start() if config_path else None
+
+    def factory(session_id: str) -> Orchestrator:
+        return Orchestrator(
+            router=RouterAgent(),
+            observer=ObserverAgent(llm=llm, executor=executor),
+            interviewer=InterviewerAgent(),
+            hiring_manager=HiringManagerAgent(),
+            logger=InterviewLogger(store=store, session_id=session_id),
+            memory=Memory(),
+            executor=executor,
+            skills=skills,
+            config_source=config_source,
+        )
+
+    def close() -> None:
+        executor.shutdown()
+        if config_source is not None:
+            config_source.stop()
+        store.close()
+
+    return factory, close
+
+
+def run():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Воркер кластера: обслуживает сессии, которые ему направляет Coordinator")
+    parser.add_argument("--listen", required=True, help="unix:<path> | tcp:<host>:<port>")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--log-store", default=os.getenv("LOG_STORE", ""), help="sqlite:<path> | sharded:<dir> (общее для всех воркеров)")
+    parser.add_argument("--config", default=os.getenv("CONFIG_PATH", ""), help="конфигурация с горячей перезагрузкой")
+    parser.add_argument("--skill-store", default=os.getenv("SKILL_STORE", ""))
+    parser.add_argument("--stub-llm-scale", type=float, default=None,
+                        help="вместо LLM_PROVIDER — заглушка LLM с задержками, умноженными на это число (для бенчмарков)")
+    args = parser.parse_args()
+    if not args.log_store.strip():
+        parser.error("--log-store (или LOG_STORE) обязателен: логи сессий должны быть доступны всем воркерам")
+
+    if args.stub_llm_scale is not None:
+        from interview_coach.llm.stub import PrefixCacheStubLLM
+
+        s = args.stub_llm_scale
+        llm: Any = PrefixCacheStubLLM(prefill_s_per_token=0.0004 * s, decode_s_per_token=0.02 * s, sleep=s > 0)
+    else:
+        llm = build_llm()
+
+    factory, close = make_factory(args.log_store.strip(), llm, args.config.strip(), args.skill_store.strip())
+    try:
+        SessionWorker(args.listen, factory, name=args.name).serve_forever()
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+from interview_coach.resummarize import logs_from_archive, logs_from_files, logs_from_store
+from interview_coach.usage import Prices, cost_report
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Сводка расходов по сессиям (meta.usage): итоги, стадии, самые дорогие сессии")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--store", help="sqlite:<path> | sharded:<dir>")
+    src.add_argument("--archive", help="директория LogArchive")
+    src.add_argument("--logs", nargs="+", help="JSON-файлы InterviewLog")
+    parser.add_argument("--price-prompt-1k", type=float, default=0.0, help="цена 1000 токенов промпта")
+    parser.add_argument("--price-completion-1k", type=float, default=0.0, help="цена 1000 токенов ответа")
+    parser.add_argument("--price-cpu-s", type=float, default=0.0, help="цена CPU-секунды")
+    parser.add_argument("--price-gb", type=float, default=0.0, help="цена гигабайта записанного лога")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых дорогих сессий показать")
+    parser.add_argument("--runaway-factor", type=float, default=3.0, help="runaway: дороже стольких медиан")
+    parser.add_argument("--out", default=None, help="сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    if args.store:
+        from interview_coach.log_store import open_store
+
+        logs = logs_from_store(open_store(args.store))
+    elif args.archive:
+        from interview_coach.archive import LogArchive
+
+        logs = logs_from_archive(LogArchive(args.archive))
+    else:
+        logs = logs_from_files(args.logs)
+
+    prices = Prices(
+        prompt_per_1k=args.price_prompt_1k,
+        completion_per_1k=args.price_completion_1k,
+        cpu_per_s=args.price_cpu_s,
+        per_gb_written=args.price_gb,
+    )
+    report = cost_report(logs, prices, top=args.top, runaway_factor=args.runaway_factor)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    run()
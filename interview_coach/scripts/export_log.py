@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+from interview_coach.log_store import check_session_id, open_store, export_session
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Выгрузка InterviewLog JSON из хранилища логов (и архива завершенных)")
+    parser.add_argument("--store", default=os.getenv("LOG_STORE", ""), help="sqlite:<path> или sharded:<dir>")
+    parser.add_argument("--archive", default=os.getenv("LOG_ARCHIVE", ""),
+                        help="директория LogArchive: завершенные сессии в архивном режиме лежат там, а не в store")
+    parser.add_argument("--session", action="append", default=[], help="session_id (можно несколько раз)")
+    parser.add_argument("--all", action="store_true", help="выгрузить все сессии")
+    parser.add_argument("--out", default=".", help="директория для <session_id>.json")
+    args = parser.parse_args()
+
+    if not args.store and not args.archive:
+        parser.error("--store or --archive is required (or set LOG_STORE / LOG_ARCHIVE)")
+
+    store = open_store(args.store) if args.store else None
+    archive = None
+    if args.archive:
+        from interview_coach.archive import LogArchive
+
+        archive = LogArchive(args.archive)
+
+    if args.all:
+        found = list(store.session_ids()) if store is not None else []
+        if archive is not None:
+            found += [e.session_id for e in archive.find()]
+        session_ids = list(dict.fromkeys(found))
+    else:
+        session_ids = args.session
+    if not session_ids:
+        parser.error("nothing to export: pass --session or --all")
+    for sid in session_ids:
+        try:
+            check_session_id(sid)
+        except ValueError as e:
+            parser.error(str(e))
+
+    out_dir = Path(args.out)
+    for sid in session_ids:
+        out_path = out_dir / f"{sid}.json"
+        if export_session(store, sid, str(out_path), archive=archive):
+            print("Saved:", out_path)
+        elif archive is None:
+            print("Not found:", sid, "(finished sessions in archive mode: pass --archive)")
+        else:
+            print("Not found:", sid)
+    if store is not None:
+        store.close()
+
+if __name__ == "__main__":
+    run()
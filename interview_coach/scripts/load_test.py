@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from interview_coach.schemas import CandidateProfile
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.log_store import LogStore, open_store
+from interview_coach.config import ConfigWatcher
+from interview_coach.execution import INLINE, StageExecutor
+from interview_coach.llm.cassette import RecordingLLM, ReplayLLM
+from interview_coach.llm.stub import PrefixCacheStubLLM
+from interview_coach.question_bank import Question
+from interview_coach.scheduler import TurnScheduler, Overloaded, schedule_turn
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+from interview_coach.orchestrator import Orchestrator
+
+
+# --- синтетические кандидаты ---
+# виды ответов соответствуют веткам RouterAgent / оценкам Observer
+
+def answer_correct(q: Optional[Question], rnd: random.Random) -> str:
+    if q is None:
+        return "Привет! Я бэкенд-разработчик, пишу на Python и Django, работаю с PostgreSQL."
+    return q.reference_text() + " Например: " + ", ".join(q.expected_points) + "."
+
+
+def answer_partial(q: Optional[Question], rnd: random.Random) -> str:
+    if q is None:
+        return "Привет. Немного писал на Python."
+    points = q.expected_points[: max(1, len(q.expected_points) // 2)]
+    return "Если честно, помню не всё: " + ", ".join(points) + "."
+
+
+def answer_unknown(q: Optional[Question], rnd: random.Random) -> str:
+    return rnd.choice(["Не знаю.", "Затрудняюсь ответить.", "Без понятия, не сталкивался."])
+
+
+def answer_offtopic(q: Optional[Question], rnd: random.Random) -> str:
+    return rnd.choice(["Кстати, какая у вас сегодня погода?", "Видели новый мем про котиков?"])
+
+
+def answer_hallucination(q: Optional[Question], rnd: random.Random) -> str:
+    return "Я читал, что в Python 4.0 циклы for уберут и заменят на нейронные связи."
+
+
+def answer_role_reversal(q: Optional[Question], rnd: random.Random) -> str:
+    return rnd.choice(["А какие задачи будут на испытательном сроке?", "Какой у вас стек и команда, есть микросервисы?"])
+
+
+ANSWER_KINDS = {
+    "correct": answer_correct,
+    "partial": answer_partial,
+    "unknown": answer_unknown,
+    "offtopic": answer_offtopic,
+    "hallucination": answer_hallucination,
+    "role_reversal": answer_role_reversal,
+}
+
+# персона = веса видов ответов
+PERSONAS: Dict[str, Dict[str, float]] = {
+    "strong": {"correct": 0.8, "partial": 0.15, "role_reversal": 0.05},
+    "average": {"correct": 0.4, "partial": 0.35, "unknown": 0.15, "role_reversal": 0.1},
+    "weak": {"partial": 0.3, "unknown": 0.5, "offtopic": 0.2},
+    "chaotic": {"correct": 0.2, "offtopic": 0.3, "hallucination": 0.3, "role_reversal": 0.2},
+}
+
+
+@dataclass
+class RunConfig:
+    sessions: int
+    concurrency: int
+    turns: int
+    think_min_s: float
+    think_max_s: float
+    llm_latency_scale: float
+    use_scheduler: bool
+    log_store: str
+    seed: int
+    flush_every: int = 1
+    cpu_workers: int = 0
+
+
+class _ThreadProfiler:
+    """cProfile на поток сессии; если профайлер недоступен (Python 3.12+: один на процесс) — молча выключаемся"""
+
+    def __init__(self, prof: cProfile.Profile):
+        self.prof: Optional[cProfile.Profile] = prof
+
+    def enable(self) -> None:
+        if self.prof is not None:
+            try:
+                self.prof.enable()
+            except ValueError:
+                self.prof = None
+
+    def disable(self) -> None:
+        if self.prof is not None:
+            self.prof.disable()
+
+
+def run_session(
+    idx: int,
+    cfg: RunConfig,
+    store: LogStore,
+    llm: Any,
+    scheduler: Optional[TurnScheduler],
+    latencies: List[float],
+    errors: List[str],
+    lock: threading.Lock,
+    profiles: Dict[int, cProfile.Profile],
+    config_source: Optional[ConfigWatcher] = None,
+    executor: StageExecutor = INLINE,
+) -> int:
+    """одна сессия: старт, turns ходов по персоне, стоп; возвращает число выполненных ходов"""
+    prof = _ThreadProfiler(profiles.setdefault(threading.get_ident(), cProfile.Profile()))
+    prof.enable()
+    try:
+        rnd = random.Random(cfg.seed * 100_003 + idx)
+        persona_name = list(PERSONAS)[idx % len(PERSONAS)]
+        persona = PERSONAS[persona_name]
+        profile = CandidateProfile(
+            participant_name=f"load-{idx}",
+            position="Backend Developer",
+            target_grade=rnd.choice(["Junior", "Middle", "Senior"]),  # type: ignore
+            experience=f"persona={persona_name}",
+        )
+        orch = Orchestrator(
+            router=RouterAgent(),
+            observer=ObserverAgent(llm=llm, executor=executor),
+            interviewer=InterviewerAgent(),
+            hiring_manager=HiringManagerAgent(),
+            logger=InterviewLogger(store=store, session_id=f"load-{cfg.seed}-{idx}", flush_every=cfg.flush_every),
+            # свой seed выбора вопросов у каждой сессии: прогон воспроизводим при любом порядке потоков
+            memory=Memory(selection_seed=cfg.seed * 100_003 + idx),
+            config_source=config_source,
+            executor=executor,
+        )
+        msg = orch.start(profile)
+
+        done = 0
+        kinds, weights = list(persona), list(persona.values())
+        for turn in range(cfg.turns + 1):
+            prof.disable()
+            time.sleep(rnd.uniform(cfg.think_min_s, cfg.think_max_s))
+            prof.enable()
+
+            last = turn == cfg.turns
+            answer = "Стоп интервью" if last else ANSWER_KINDS[rnd.choices(kinds, weights)[0]](orch.last_question, rnd)
+
+            t0 = time.perf_counter()
+            try:
+                if scheduler is not None:
+                    nxt = schedule_turn(scheduler, profile.participant_name, orch, profile, msg, answer).result()
+                else:
+                    nxt = orch.handle_user_message(profile, msg, answer)
+            except Overloaded as e:
+                with lock:
+                    errors.append(f"overloaded: {e}")
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+            done += 1
+            if nxt is None:
+                break
+            msg = nxt
+        return done
+    finally:
+        prof.disable()
+
+
+def pct(sorted_vals: List[float], q: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))] if sorted_vals else 0.0
+
+
+def run(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон: N параллельных интервью с синтетическими кандидатами")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=8, help="ходов на сессию до команды стоп")
+    parser.add_argument("--think-min", type=float, default=0.0, help="мин. пауза кандидата между ходами, сек")
+    parser.add_argument("--think-max", type=float, default=0.05)
+    parser.add_argument("--llm-latency-scale", type=float, default=0.05,
+                        help="множитель к виртуальной латентности заглушки LLM (0 — без задержки)")
+    parser.add_argument("--no-llm", action="store_true", help="без LLM (только банк вопросов)")
+    parser.add_argument("--record", default=None, help="записать ответы LLM в кассету (JSONL)")
+    parser.add_argument("--replay", default=None, help="LLM из кассеты вместо заглушки (без задержек)")
+    parser.add_argument("--replay-match", choices=["strict", "fuzzy"], default="strict")
+    parser.add_argument("--scheduler", action="store_true", help="пускать ходы через TurnScheduler")
+    parser.add_argument("--scheduler-workers", type=int, default=8)
+    parser.add_argument("--log-store", default=None, help="sqlite:<path> | sharded:<dir> (по умолчанию — временный SQLite)")
+    parser.add_argument("--log-flush-every", type=int, default=int(os.getenv("LOG_FLUSH_EVERY", "1")),
+                        help="писать лог раз в N ходов (старт и финальный отчёт — всегда)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--config", default=None, help="конфигурация с горячей перезагрузкой (можно править во время прогона)")
+    parser.add_argument("--profile-out", default=None, help="сохранить cProfile (pstats) в файл")
+    parser.add_argument("--report-out", default=None, help="сохранить отчёт в JSON")
+    parser.add_argument("--cpu-workers", type=int, nargs="+", default=[int(os.getenv("CPU_WORKERS", "0"))],
+                        help="размер пула процессов для CPU-стадий (0 — в потоке хода); несколько значений — прогон на каждое и сравнение")
+    args = parser.parse_args(argv)
+
+    reports = [run_once(args, n) for n in args.cpu_workers]
+    report = reports[0]
+    if len(reports) > 1:
+        report = {
+            "cpu_count": os.cpu_count(),
+            "runs": reports,
+            "compare": {
+                str(r["cpu_workers"]): {
+                    "throughput_turns_per_s": r["throughput_turns_per_s"],
+                    "p50_ms": r["latency_ms"]["p50"],
+                    "p95_ms": r["latency_ms"]["p95"],
+                    "cpu_s": r["cpu_s"],
+                    "cpu_children_s": r["cpu_children_s"],
+                }
+                for r in reports
+            },
+        }
+        print(json.dumps(report["compare"], ensure_ascii=False, indent=2))
+    if args.report_out:
+        with open(args.report_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def run_once(args: argparse.Namespace, cpu_workers: int) -> Dict[str, Any]:
+    """один прогон с пулом CPU-стадий на cpu_workers процессов"""
+    log_store = args.log_store or f"sqlite:{os.path.join(tempfile.mkdtemp(prefix='load_test_'), 'logs.db')}"
+    cfg = RunConfig(
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        turns=args.turns,
+        think_min_s=args.think_min,
+        think_max_s=args.think_max,
+        llm_latency_scale=args.llm_latency_scale,
+        use_scheduler=args.scheduler,
+        log_store=log_store,
+        seed=args.seed,
+        flush_every=args.log_flush_every,
+        cpu_workers=cpu_workers,
+    )
+
+    llm: Any = None
+    if args.replay:
+        llm = ReplayLLM(args.replay, match=args.replay_match)
+    elif not args.no_llm:
+        s = cfg.llm_latency_scale
+        llm = PrefixCacheStubLLM(prefill_s_per_token=0.0004 * s, decode_s_per_token=0.02 * s, sleep=s > 0)
+        if args.record:
+            llm = RecordingLLM(llm, args.record)
+    scheduler = TurnScheduler(workers=args.scheduler_workers) if cfg.use_scheduler else None
+    store = open_store(cfg.log_store)
+    config_source = ConfigWatcher(args.config, poll_s=0.2).start() if args.config else None
+    executor = StageExecutor(max_workers=cfg.cpu_workers)
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    profiles: Dict[int, cProfile.Profile] = {}
+
+    random.seed(cfg.seed)
+    tracemalloc.start()
+    children0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=cfg.concurrency) as pool:
+        turns_done = sum(
+            pool.map(
+                lambda i: run_session(i, cfg, store, llm, scheduler, latencies, errors, lock, profiles, config_source, executor),
+                range(cfg.sessions),
+            )
+        )
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    _, peak = tracemalloc.get_traced_memory()
+    top_alloc = tracemalloc.take_snapshot().statistics("lineno")[:5]
+    tracemalloc.stop()
+
+    sched_metrics = scheduler.metrics() if scheduler is not None else None
+    if scheduler is not None:
+        scheduler.shutdown()
+    if config_source is not None:
+        config_source.stop()
+    store.close()
+    # CPU процессов пула учитывается в RUSAGE_CHILDREN только после их завершения
+    executor.shutdown()
+    children1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_children = (children1.ru_utime + children1.ru_stime) - (children0.ru_utime + children0.ru_stime)
+
+    # общий профиль по всем потокам-сессиям
+    stats: Optional[pstats.Stats] = None
+    for p in profiles.values():
+        if stats is None:
+            stats = pstats.Stats(p)
+        else:
+            stats.add(p)
+    if stats is not None and args.profile_out:
+        stats.dump_stats(args.profile_out)
+
+    lat = sorted(latencies)
+    report: Dict[str, Any] = {
+        "sessions": cfg.sessions,
+        "concurrency": cfg.concurrency,
+        "turns": turns_done,
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "throughput_turns_per_s": round(turns_done / wall, 1) if wall else 0.0,
+        "throughput_sessions_per_s": round(cfg.sessions / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(pct(lat, 0.5) * 1000, 2),
+            "p95": round(pct(lat, 0.95) * 1000, 2),
+            "p99": round(pct(lat, 0.99) * 1000, 2),
+            "max": round((lat[-1] if lat else 0.0) * 1000, 2),
+        },
+        "cpu_workers": cfg.cpu_workers,
+        "cpu_s": round(cpu, 3),
+        "cpu_children_s": round(cpu_children, 3),
+        "cpu_utilization": round(cpu / wall, 2) if wall else 0.0,
+        "peak_traced_mem_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "top_allocations": [str(s) for s in top_alloc],
+        "llm": (llm.inner if isinstance(llm, RecordingLLM) else llm).stats() if llm is not None else None,
+        "scheduler": sched_metrics,
+        "config_versions": config_source.history if config_source is not None else None,
+        "log_store": log_store,
+        "log_flush_every": cfg.flush_every,
+    }
+
+    print(json.dumps({k: v for k, v in report.items() if k != "top_allocations"}, ensure_ascii=False, indent=2))
+    if stats is not None:
+        buf = io.StringIO()
+        stats.stream = buf
+        stats.sort_stats("cumulative").print_stats(15)
+        print(buf.getvalue())
+    return report
+
+
+if __name__ == "__main__":
+    run()
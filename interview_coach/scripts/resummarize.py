@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+from interview_coach.config import DEFAULT_CONFIG
+from interview_coach.resummarize import logs_from_archive, logs_from_files, logs_from_store, resummarize
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Пакетный пересчёт финальных отчётов по сохраненным сессиям")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--store", help="sqlite:<path> | sharded:<dir>")
+    src.add_argument("--archive", help="директория LogArchive")
+    src.add_argument("--logs", nargs="+", help="JSON-файлы InterviewLog")
+    parser.add_argument("--out", required=True, help="директория отчётов (out/<version>/<session_id>.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов в пуле (0 — без пула)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="задач в пуле одновременно (по умолчанию workers*4)")
+    parser.add_argument("--force", action="store_true", help="пересчитать даже неизменившиеся сессии")
+    parser.add_argument("--config", default=None, help="конфигурация правил (пороги, bank_dir), по которой переоценить ответы")
+    args = parser.parse_args()
+
+    if args.store:
+        from interview_coach.log_store import open_store
+
+        logs = logs_from_store(open_store(args.store))
+    elif args.archive:
+        from interview_coach.archive import LogArchive
+
+        logs = logs_from_archive(LogArchive(args.archive))
+    else:
+        logs = logs_from_files(args.logs)
+
+    config = DEFAULT_CONFIG
+    if args.config:
+        from interview_coach.config import load_config
+
+        config = load_config(args.config)
+
+    stats = resummarize(
+        logs, args.out, workers=args.workers, max_in_flight=args.max_in_flight, force=args.force, config=config
+    )
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    run()
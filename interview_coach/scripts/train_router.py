@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from interview_coach.agents.router_model import HashedLinearRouter, samples_from_labels, samples_from_logs
+from interview_coach.resummarize import logs_from_archive, logs_from_files, logs_from_store
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Обучить локальный классификатор маршрутов RouterAgent")
+    parser.add_argument("--store", help="логи из хранилища: sqlite:<path> | sharded:<dir>")
+    parser.add_argument("--archive", help="логи из LogArchive")
+    parser.add_argument("--logs", nargs="*", default=[], help="JSON-файлы InterviewLog")
+    parser.add_argument("--labels", nargs="*", default=[], help='ручная разметка JSONL {"text", "route"} (важнее логов)')
+    parser.add_argument("--out", required=True, help="куда сохранить модель (JSON)")
+    parser.add_argument("--epochs", type=int, default=12)
+    parser.add_argument("--dim-bits", type=int, default=18, help="размер хэш-пространства признаков: 2^bits")
+    parser.add_argument("--holdout", type=float, default=0.2, help="доля отложенной выборки для оценки")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # разметка из логов (route, который записал Router), поверх — ручная разметка для тех же текстов
+    by_text = {}
+    sources = []
+    if args.store:
+        from interview_coach.log_store import open_store
+
+        sources.append(logs_from_store(open_store(args.store)))
+    if args.archive:
+        from interview_coach.archive import LogArchive
+
+        sources.append(logs_from_archive(LogArchive(args.archive)))
+    if args.logs:
+        sources.append(logs_from_files(args.logs))
+    for src in sources:
+        for text, route in samples_from_logs(log for _, log in src):
+            by_text[text] = route
+    for path in args.labels:
+        for text, route in samples_from_labels(path):
+            by_text[text] = route
+    if not by_text:
+        parser.error("no training samples: pass --store/--archive/--logs and/or --labels")
+
+    samples = sorted(by_text.items())
+    random.Random(args.seed).shuffle(samples)
+    n_test = int(len(samples) * args.holdout)
+    test, train = samples[:n_test], samples[n_test:]
+
+    model = HashedLinearRouter(dim=1 << args.dim_bits).fit(train, epochs=args.epochs, seed=args.seed)
+    model.save(args.out)
+
+    report = {"train": len(train), "test": len(test), "labels": dict(Counter(r for _, r in samples)), "features": len(model.weights)}
+    if test:
+        t0 = time.perf_counter()
+        preds = model.predict_many([t for t, _ in test])
+        per_msg = (time.perf_counter() - t0) / len(test)
+        report["accuracy"] = round(sum(p is not None and p[0] == r for p, (_, r) in zip(preds, test)) / len(test), 3)
+        report["predict_us_per_message"] = round(per_msg * 1e6, 1)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .question_bank import Question
+
+
+class _Pool:
+    """массив + карта позиций: удаление swap-remove за O(1), случайный выбор за O(1)"""
+
+    __slots__ = ("items", "pos")
+
+    def __init__(self):
+        self.items: List[Question] = []
+        self.pos: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, q: Question) -> None:
+        if q.qid not in self.pos:
+            self.pos[q.qid] = len(self.items)
+            self.items.append(q)
+
+    def remove(self, qid: str) -> None:
+        i = self.pos.pop(qid, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            # на место удаленного ставим последний элемент
+            self.items[i] = last
+            self.pos[last.qid] = i
+
+
+class QuestionSelector:
+    """
+    Выбор следующего вопроса для одной сессии без пересборки списков на каждом ходу.
+
+    Незаданные вопросы лежат в пулах по (тема, сложность) и по сложности; заданный вопрос
+    вынимается из своих пулов за O(1). Правила выбора:
+    - сложность difficulty ± 1
+    - если есть preferred_topic — вопрос этой темы
+    - иначе избегаем тем последних двух вопросов
+    - иначе любой из окна сложности, иначе любой оставшийся, иначе любой из банка
+
+    seed задает собственный RNG сессии (воспроизводимость); без seed — глобальный random.
+    """
+
+    def __init__(self, questions: Sequence[Question], seed: Optional[int] = None, asked_ids: Iterable[str] = ()):
+        self.questions: Tuple[Question, ...] = tuple(questions)
+        self._rng: Optional[random.Random] = random.Random(seed) if seed is not None else None
+
+        self._by_bucket: Dict[Tuple[str, int], _Pool] = {}
+        self._by_difficulty: Dict[int, _Pool] = {}
+        self._remaining = _Pool()
+        for q in self.questions:
+            self._by_bucket.setdefault((q.topic, q.difficulty), _Pool()).add(q)
+            self._by_difficulty.setdefault(q.difficulty, _Pool()).add(q)
+            self._remaining.add(q)
+
+        self._synced = 0
+        for qid in asked_ids:
+            self.mark_asked(qid)
+
+    @property
+    def rng(self) -> Any:
+        return self._rng if self._rng is not None else random
+
+    def getstate(self) -> Any:
+        """состояние собственного RNG (для отката предварительного выбора); у глобального random — None"""
+        return self._rng.getstate() if self._rng is not None else None
+
+    def setstate(self, state: Any) -> None:
+        if self._rng is not None and state is not None:
+            self._rng.setstate(state)
+
+    def mark_asked(self, qid: str) -> None:
+        q = self._remaining.items[self._remaining.pos[qid]] if qid in self._remaining.pos else None
+        if q is None:
+            return
+        self._remaining.remove(qid)
+        self._by_difficulty[q.difficulty].remove(qid)
+        self._by_bucket[(q.topic, q.difficulty)].remove(qid)
+
+    def _sync(self, asked_ids: Sequence[str]) -> None:
+        """досинхронизируемся с историей сессии: asked_ids только растет, берем лишь новые id"""
+        for qid in asked_ids[self._synced:]:
+            self.mark_asked(qid)
+        self._synced = len(asked_ids)
+
+    def _pick_from(self, pools: List[_Pool]) -> Optional[Question]:
+        """равномерный выбор из объединения нескольких пулов"""
+        total = sum(len(p) for p in pools)
+        if not total:
+            return None
+        r = self.rng.randrange(total)
+        for p in pools:
+            if r < len(p):
+                return p.items[r]
+            r -= len(p)
+        return None  # pragma: no cover
+
+    def pick(
+        self,
+        difficulty: int,
+        asked_ids: Sequence[str],
+        asked_topics: Sequence[str],
+        preferred_topic: Optional[str] = None,
+    ) -> Question:
+        self._sync(asked_ids)
+        window = (difficulty - 1, difficulty, difficulty + 1)
+
+        # если нужно "дожать" конкретную тему - пробуем ту же тему
+        if preferred_topic:
+            q = self._pick_from([p for d in window if (p := self._by_bucket.get((preferred_topic, d)))])
+            if q is not None:
+                return q
+
+        window_pools = [p for d in window if (p := self._by_difficulty.get(d))]
+        total = sum(len(p) for p in window_pools)
+
+        # иначе — избегаем повторов темы последних 2 вопросов
+        recent = set(asked_topics[-2:])
+        excluded = sum(
+            len(p) for t in recent for d in window if (p := self._by_bucket.get((t, d)))
+        )
+        if total - excluded > 0:
+            # выборка с отклонением: ожидаемо O(total / (total - excluded)) попыток
+            for _ in range(32):
+                q = self._pick_from(window_pools)
+                if q is not None and q.topic not in recent:
+                    return q
+            # почти все кандидаты из недавних тем — добираем точно
+            allowed = [q for p in window_pools for q in p.items if q.topic not in recent]
+            return allowed[self.rng.randrange(len(allowed))]
+
+        if total:
+            return self._pick_from(window_pools)  # type: ignore[return-value]
+
+        # если вдруг все близкие вопросы кончились, берем любой оставшийся
+        q = self._pick_from([self._remaining])
+        if q is not None:
+            return q
+        return self.questions[self.rng.randrange(len(self.questions))]
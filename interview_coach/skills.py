@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .question_bank import GRADE_BANDS, position_key
+
+# вклад оценки ответа в освоенность темы
+EVAL_SCORE = {"correct": 1.0, "partial": 0.5, "wrong": 0.0, "unknown": 0.0}
+
+
+def candidate_key(participant_name: str, position: str) -> str:
+    """идентичность кандидата: нормализованное имя + ключ позиции (навыки backend и frontend не смешиваем)"""
+    return f"{' '.join(participant_name.lower().split())}|{position_key(position)}"
+
+
+@dataclass
+class CandidateSkills:
+    """
+    Что известно о кандидате по прошлым сессиям:
+    - difficulty: сложность, на которой закончилась последняя сессия
+    - topics: тема -> {"mastery": 0..1 (скользящее среднее оценок), "seen": сколько ответов всего}
+    """
+
+    key: str
+    difficulty: int = 1
+    topics: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    sessions: int = 0
+    updated_at: float = 0.0
+
+    def weak_topics(self, threshold: float = 0.5) -> List[str]:
+        """темы, которые стоит "дожать" в новой сессии: сначала самые слабые"""
+        weak = [(t["mastery"], name) for name, t in self.topics.items() if t["mastery"] < threshold]
+        return [name for _, name in sorted(weak)]
+
+    def absorb(self, difficulty: int, evaluations: List[Dict[str, Any]], alpha: float = 0.5) -> None:
+        """учитываем завершенную сессию: новые оценки весят alpha, прошлая освоенность — 1 - alpha"""
+        per_topic: Dict[str, List[float]] = {}
+        for e in evaluations:
+            per_topic.setdefault(e["topic"], []).append(EVAL_SCORE.get(e["eval"], 0.0))
+        for topic, scores in per_topic.items():
+            now = sum(scores) / len(scores)
+            t = self.topics.get(topic)
+            if t is None:
+                self.topics[topic] = {"mastery": now, "seen": float(len(scores))}
+            else:
+                t["mastery"] = (1 - alpha) * t["mastery"] + alpha * now
+                t["seen"] += len(scores)
+        self.difficulty = difficulty
+        self.sessions += 1
+        # строго растет: по updated_at SkillStore отличает новую версию профиля от закэшированной
+        self.updated_at = max(time.time(), self.updated_at + 1e-6)
+
+
+class SkillStore:
+    """
+    Навыки кандидатов между сессиями: SQLite (WAL, поиск по первичному ключу) + LRU-кэш разобранных профилей
+    в памяти процесса (актуальность сверяется с базой по updated_at на каждом get).
+    Профили, не обновлявшиеся дольше ttl_s, считаются устаревшими: при чтении не отдаются,
+    из базы удаляются evict_stale() (вызывается сам каждые evict_every записей).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_s: float = 180 * 24 * 3600,
+        cache_size: int = 1024,
+        evict_every: int = 256,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.cache_size = cache_size
+        self.evict_every = evict_every
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, CandidateSkills]" = OrderedDict()
+        self._writes = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS skills ("
+                " candidate_key TEXT PRIMARY KEY,"
+                " updated_at REAL NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS skills_updated_at ON skills (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def _stale(self, skills: CandidateSkills) -> bool:
+        return skills.updated_at < time.time() - self.ttl_s
+
+    def _remember(self, skills: CandidateSkills) -> None:
+        with self._lock:
+            self._cache[skills.key] = skills
+            self._cache.move_to_end(skills.key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, key: str, conn: Optional[sqlite3.Connection] = None) -> Optional[CandidateSkills]:
+        row = (conn or self._conn()).execute("SELECT data FROM skills WHERE candidate_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return CandidateSkills(**json.loads(row[0]))
+
+    def get(self, key: str) -> Optional[CandidateSkills]:
+        """
+        кэш сверяется с базой по updated_at (дешевый поиск по ключу без разбора JSON):
+        запись другого процесса или потока не останется незамеченной
+        """
+        row = self._conn().execute("SELECT updated_at FROM skills WHERE candidate_key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        with self._lock:
+            skills = self._cache.get(key)
+            if skills is not None and skills.updated_at == row[0]:
+                self._cache.move_to_end(key)
+            else:
+                skills = None
+        if skills is None:
+            skills = self._load(key)
+            if skills is None:
+                return None
+            self._remember(skills)
+        if self._stale(skills):
+            return None
+        return skills
+
+    def _write(self, conn: sqlite3.Connection, skills: CandidateSkills) -> None:
+        conn.execute(
+            "INSERT INTO skills (candidate_key, updated_at, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(candidate_key) DO UPDATE SET updated_at=excluded.updated_at, data=excluded.data",
+            (skills.key, skills.updated_at, json.dumps(asdict(skills), ensure_ascii=False)),
+        )
+
+    def _written(self, skills: CandidateSkills) -> None:
+        self._remember(skills)
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict_stale()
+
+    def put(self, skills: CandidateSkills) -> None:
+        with self._conn() as conn:
+            self._write(conn, skills)
+        self._written(skills)
+
+    def record_session(self, key: str, difficulty: int, evaluations: List[Dict[str, Any]]) -> CandidateSkills:
+        """итог сессии -> обновленный профиль (устаревший профиль начинается заново)"""
+        # чтение-слияние-запись в одной транзакции BEGIN IMMEDIATE: параллельный писатель
+        # (другой поток или процесс) ждёт её конца, а не затирает обновление своей старой копией
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            skills = self._load(key, conn)
+            if skills is None or self._stale(skills):
+                skills = CandidateSkills(key=key)
+            skills.absorb(difficulty, evaluations)
+            self._write(conn, skills)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self._written(skills)
+        return skills
+
+    def evict_stale(self) -> int:
+        cutoff = time.time() - self.ttl_s
+        with self._conn() as conn:
+            n = conn.execute("DELETE FROM skills WHERE updated_at < ?", (cutoff,)).rowcount
+        with self._lock:
+            for key in [k for k, s in self._cache.items() if s.updated_at < cutoff]:
+                del self._cache[key]
+        return n
+
+
+def warm_start_difficulty(skills: CandidateSkills, grade: str) -> int:
+    """прошлая сложность, но в пределах диапазона грейда текущей сессии"""
+    lo, hi = GRADE_BANDS.get(grade, (1, 5))
+    return max(lo, min(hi, skills.difficulty))
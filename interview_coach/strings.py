@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+# формат файла: MAGIC, затем записи [u32 длина][utf-8 байты]; ссылка на строку = смещение записи
+MAGIC = b"ICSTR1\n\0"
+_LEN = struct.Struct("<I")
+
+
+class StringTable:
+    """
+    Таблица длинных строк банка (эталонные ответы) в одном файле, открытом через mmap только на чтение.
+    Все процессы-воркеры мапят один и тот же файл — в памяти одна копия (page cache ОС),
+    а вопросы и оценки держат только смещения. Строка декодируется лишь по запросу get().
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"not a string table: {self.path}")
+        # идентичность содержимого: смещения имеют смысл только внутри таблицы с тем же digest
+        self.digest = hashlib.sha1(self._mm).hexdigest()[:16]
+
+    def get(self, ref: int) -> str:
+        if ref < len(MAGIC) or ref + _LEN.size > len(self._mm):
+            raise KeyError(ref)
+        (n,) = _LEN.unpack_from(self._mm, ref)
+        return self._mm[ref + _LEN.size: ref + _LEN.size + n].decode("utf-8")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __reduce__(self):
+        # в другой процесс передаем путь и digest — там мапится тот же файл, если он ещё не переписан
+        return (_reopen, (self.path, self.digest))
+
+
+def write_string_table(path: str, texts: Iterable[str]) -> Dict[str, int]:
+    """записать таблицу (одинаковые строки — одна запись); возвращает строка -> ссылка"""
+    refs: Dict[str, int] = {}
+    chunks = [MAGIC]
+    size = len(MAGIC)
+    for t in texts:
+        if t in refs:
+            continue
+        data = t.encode("utf-8")
+        refs[t] = size
+        chunks.append(_LEN.pack(len(data)))
+        chunks.append(data)
+        size += _LEN.size + len(data)
+
+    # подмена через os.replace: воркеры, уже смапившие старый файл, дочитывают его без порчи
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(out.parent), prefix=f".{out.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"".join(chunks))
+        os.replace(tmp, out)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return refs
+
+
+# (путь, inode, mtime) -> таблица: переписанный файл — другой ключ, старые смещения к нему не применяются
+_TABLES: Dict[Tuple[str, int, int], StringTable] = {}
+# digest -> таблица: по нему оценки и партиции находят таблицу своих смещений
+_BY_DIGEST: Dict[str, StringTable] = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def open_string_table(path: str) -> StringTable:
+    """
+    таблица текущего файла по пути; одна на версию файла в процессе.
+    Новая версия файла вытесняет прежние таблицы этого пути (mmap закрывается): иначе каждая перезапись банка
+    оставляла бы в процессе еще один mmap. Смещения старой версии после этого разрешаются по qid (_resolve_ref).
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_ino, st.st_mtime_ns)
+    table = _TABLES.get(key)
+    if table is None:
+        with _TABLES_LOCK:
+            table = _TABLES.get(key)
+            if table is None:
+                table = _TABLES[key] = StringTable(path)
+                for stale in [k for k in _TABLES if k[0] == path and k != key]:
+                    _evict(_TABLES.pop(stale))
+                _BY_DIGEST.setdefault(table.digest, table)
+    return table
+
+
+def _evict(table: StringTable) -> None:
+    # под _TABLES_LOCK; digest может указывать на таблицу того же содержимого по другому пути — ее и оставляем
+    if _BY_DIGEST.get(table.digest) is table:
+        same = [t for t in _TABLES.values() if t.digest == table.digest]
+        if same:
+            _BY_DIGEST[table.digest] = same[0]
+        else:
+            del _BY_DIGEST[table.digest]
+    table.close()
+
+
+def table_by_digest(digest: str) -> Optional[StringTable]:
+    """таблица, уже открытая в процессе, с этим содержимым (None — не открывалась)"""
+    return _BY_DIGEST.get(digest)
+
+
+def _reopen(path: str, digest: str) -> StringTable:
+    table = table_by_digest(digest) or open_string_table(path)
+    if table.digest != digest:
+        raise ValueError(f"string table {path} changed: {table.digest} != {digest}")
+    return table
+
+
+def bank_strings(bank_dir: Optional[str] = None) -> Optional[StringTable]:
+    """таблица строк внешнего банка: <bank_dir или BANK_DIR>/strings.bin (None — банк встроенный или без таблицы)"""
+    if bank_dir is None:
+        bank_dir = os.getenv("BANK_DIR", "").strip()
+    if not bank_dir:
+        return None
+    path = Path(bank_dir) / "strings.bin"
+    return open_string_table(str(path)) if path.exists() else None
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class SessionUsage:
+    """
+    Расход ресурсов одной сессии (уходит в InterviewLog.meta["usage"] при finalize):
+    - llm: вызовы (calls) и фактически отправленные запросы (requests: с хеджированием их больше),
+      токены промпта/ответа, время ожидания LLM
+    - stages: стадия -> calls, wall_s, cpu_s, max_wall_s (CPU — того потока/процесса, где стадия работала)
+    - io: байты, записанные логгером (заполняет InterviewLogger.finalize)
+    Токены — от провайдера, если он их вернул (Completion.usage), иначе локальная оценка count_tokens.
+    """
+
+    llm_calls: int = 0
+    llm_requests: int = 0
+    llm_failed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_wall_s: float = 0.0
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # LLM-запросы хеджирования завершаются в потоках executor'а
+        self._lock = threading.Lock()
+
+    def add_llm(self, requests: int, prompt_tokens: int, completion_tokens: int, wall_s: float, ok: bool) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_requests += requests
+            self.llm_failed += 0 if ok else 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.llm_wall_s += wall_s
+
+    def add_stage(self, name: str, wall_s: float, cpu_s: float = 0.0) -> None:
+        with self._lock:
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "max_wall_s": 0.0}
+            s["calls"] += 1
+            s["wall_s"] += wall_s
+            s["cpu_s"] += cpu_s
+            s["max_wall_s"] = max(s["max_wall_s"], wall_s)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """синхронная стадия в текущем потоке: wall + CPU этого потока"""
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - wall0, time.thread_time() - cpu0)
+
+    def state(self) -> Dict[str, Any]:
+        """сырые счетчики (для переноса сессии на другой узел); обратно — SessionUsage(**state)"""
+        with self._lock:
+            return copy.deepcopy(asdict(self))
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "llm": {
+                    "calls": self.llm_calls,
+                    "requests": self.llm_requests,
+                    "failed": self.llm_failed,
+                    "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens,
+                    "wall_s": round(self.llm_wall_s, 4),
+                },
+                "stages": {
+                    name: {k: (round(v, 6) if k != "calls" else int(v)) for k, v in s.items()}
+                    for name, s in self.stages.items()
+                },
+                "cpu_s": round(sum(s["cpu_s"] for s in self.stages.values()), 6),
+            }
+
+
+@dataclass(frozen=True)
+class Prices:
+    """тарифы для внутреннего биллинга; 0 — ресурс не тарифицируется"""
+
+    prompt_per_1k: float = 0.0
+    completion_per_1k: float = 0.0
+    cpu_per_s: float = 0.0
+    per_gb_written: float = 0.0
+
+
+def session_cost(usage: Dict[str, Any], prices: Prices) -> float:
+    llm = usage.get("llm", {})
+    io = usage.get("io", {})
+    return (
+        llm.get("prompt_tokens", 0) / 1000 * prices.prompt_per_1k
+        + llm.get("completion_tokens", 0) / 1000 * prices.completion_per_1k
+        + usage.get("cpu_s", 0.0) * prices.cpu_per_s
+        + io.get("bytes_written", 0) / 2**30 * prices.per_gb_written
+    )
+
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))] if sorted_vals else 0.0
+
+
+def cost_report(
+    items: Iterable[Tuple[str, Any]],
+    prices: Prices = Prices(),
+    top: int = 10,
+    runaway_factor: float = 3.0,
+) -> Dict[str, Any]:
+    """
+    Сводка по сессиям (session_id, InterviewLog): итоги, перцентили на сессию, разбивка по стадиям,
+    самые дорогие сессии и "runaway" — дороже runaway_factor медианы по токенам, CPU или стоимости.
+    Сессии без meta.usage (старые логи, незавершенные) только считаются.
+    """
+    rows: List[Dict[str, Any]] = []
+    skipped = 0
+    by_stage: Dict[str, Dict[str, float]] = {}
+    for sid, log in items:
+        usage = log.meta.get("usage")
+        if not usage:
+            skipped += 1
+            continue
+        llm = usage.get("llm", {})
+        rows.append(
+            {
+                "session_id": sid,
+                "participant_name": log.participant_name,
+                "turns": len(log.turns),
+                "llm_calls": llm.get("calls", 0),
+                "llm_requests": llm.get("requests", 0),
+                "tokens": llm.get("prompt_tokens", 0) + llm.get("completion_tokens", 0),
+                "prompt_tokens": llm.get("prompt_tokens", 0),
+                "completion_tokens": llm.get("completion_tokens", 0),
+                "llm_wall_s": llm.get("wall_s", 0.0),
+                "cpu_s": usage.get("cpu_s", 0.0),
+                "bytes_written": usage.get("io", {}).get("bytes_written", 0),
+                "cost": round(session_cost(usage, prices), 6),
+            }
+        )
+        for name, s in usage.get("stages", {}).items():
+            agg = by_stage.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "max_wall_s": 0.0})
+            agg["calls"] += s.get("calls", 0)
+            agg["wall_s"] += s.get("wall_s", 0.0)
+            agg["cpu_s"] += s.get("cpu_s", 0.0)
+            agg["max_wall_s"] = max(agg["max_wall_s"], s.get("max_wall_s", 0.0))
+
+    metrics = ("tokens", "cpu_s", "llm_wall_s", "bytes_written", "cost")
+    totals: Dict[str, Any] = {
+        k: sum(r[k] for r in rows)
+        for k in ("llm_calls", "llm_requests", "prompt_tokens", "completion_tokens", "llm_wall_s", "cpu_s", "bytes_written", "cost")
+    }
+    # доля лишних запросов из-за хеджирования — цена хвостовой латентности
+    totals["hedge_overhead"] = round(totals["llm_requests"] / totals["llm_calls"] - 1, 4) if totals["llm_calls"] else 0.0
+
+    per_session: Dict[str, Dict[str, float]] = {}
+    medians: Dict[str, float] = {}
+    for k in metrics:
+        vals = sorted(r[k] for r in rows)
+        medians[k] = _pct(vals, 0.5)
+        per_session[k] = {"p50": _pct(vals, 0.5), "p95": _pct(vals, 0.95), "max": vals[-1] if vals else 0}
+
+    def runaway(r: Dict[str, Any]) -> Optional[List[str]]:
+        over = [k for k in ("tokens", "cpu_s", "cost") if medians[k] > 0 and r[k] > runaway_factor * medians[k]]
+        return over or None
+
+    runaways = [dict(r, over=over) for r in rows for over in [runaway(r)] if over]
+    return {
+        "sessions": len(rows) + skipped,
+        "with_usage": len(rows),
+        "prices": prices.__dict__,
+        "totals": {k: (round(v, 6) if isinstance(v, float) else v) for k, v in totals.items()},
+        "per_session": per_session,
+        "stages": {name: {k: (round(v, 6) if k != "calls" else int(v)) for k, v in s.items()} for name, s in by_stage.items()},
+        "top": sorted(rows, key=lambda r: (r["cost"], r["tokens"], r["cpu_s"]), reverse=True)[:top],
+        "runaway": sorted(runaways, key=lambda r: r["cost"], reverse=True)[:top],
+    }
@@ -0,0 +1,223 @@
+"""
+Архив завершенных интервью (archive.py): add -> roll -> get, восстановление после прерванного сворачивания,
+одновременное сворачивание из нескольких экземпляров, finalize логгера в архивном режиме.
+"""
+from __future__ import annotations
+
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+from interview_coach.archive import LogArchive
+from interview_coach.log_store import open_store
+from interview_coach.logger import InterviewLogger
+from interview_coach.schemas import FinalFeedback, InterviewLog, SoftSkills, TurnLog
+
+
+def make_log(i: int) -> InterviewLog:
+    return InterviewLog(
+        participant_name=f"p{i % 3}",
+        turns=[
+            TurnLog(turn_id=t, agent_visible_message=f"Вопрос {t}?", user_message=f"ответ {i}/{t}", internal_thoughts="eval=partial")
+            for t in range(1, 4)
+        ],
+        final_feedback=FinalFeedback(
+            grade="Junior",
+            hiring_recommendation="No Hire",
+            confidence_score=50,
+            soft_skills=SoftSkills(clarity="ok", honesty="ok", engagement="ok"),
+        ),
+        meta={"i": i},
+    )
+
+
+def bundled(archive: LogArchive) -> list:
+    return sorted(e.session_id for e in archive.find() if e.bundle)
+
+
+def test_add_roll_get_round_trip(tmp_path):
+    archive = LogArchive(str(tmp_path), dict_size=4096)
+    for i in range(12):
+        assert archive.add(f"s{i}", make_log(i), date=f"2026-10-{10 + i % 2:02d}") > 0
+
+    # до сворачивания сессии читаются из pending/
+    assert archive.pending_count() == 12
+    assert archive.get("s3") == make_log(3)
+    assert all(e.bundle == "" for e in archive.find())
+
+    bundle = archive.roll()
+    assert bundle is not None
+    assert archive.pending_count() == 0
+    assert list(archive.rolling_dir.iterdir()) == []
+    assert bundled(archive) == sorted(f"s{i}" for i in range(12))
+    for i in range(12):
+        assert archive.get(f"s{i}") == make_log(i)
+
+    assert {e.session_id for e in archive.find(participant="p1")} == {"s1", "s4", "s7", "s10"}
+    assert {e.session_id for e in archive.find(date_from="2026-10-11")} == {f"s{i}" for i in range(1, 12, 2)}
+    assert archive.get("missing") is None
+    # нечего сворачивать
+    assert archive.roll() is None
+
+
+def test_roll_respects_min_sessions(tmp_path):
+    archive = LogArchive(str(tmp_path))
+    archive.add("a", make_log(0))
+    assert archive.roll(min_sessions=2) is None
+    assert archive.pending_count() == 1
+    archive.add("b", make_log(1))
+    assert archive.roll(min_sessions=2) is not None
+    assert bundled(archive) == ["a", "b"]
+
+
+def test_interrupted_claim_is_resumed(tmp_path):
+    archive = LogArchive(str(tmp_path), stale_s=3600)
+    for i in range(4):
+        archive.add(f"s{i}", make_log(i))
+    # процесс забрал файлы в rolling/ и упал, не дописав бандл
+    staging = archive.rolling_dir / "bundle-crashed"
+    staging.mkdir()
+    for f in sorted(archive.pending_dir.glob("*.json"))[:3]:
+        os.rename(f, staging / f.name)
+
+    # забранные, но не свернутые сессии по-прежнему читаются
+    assert archive.get("s0") == make_log(0)
+    assert {e.session_id for e in archive.find()} == {"s0", "s1", "s2", "s3"}
+
+    # свежий каталог — может, его ещё сворачивают: не трогаем
+    archive.roll()
+    assert len(list(staging.glob("*.json"))) == 3
+
+    # устаревший — файлы возвращаются в pending/ и попадают в следующий бандл
+    old = staging.stat().st_mtime - 7200
+    os.utime(staging, (old, old))
+    assert archive.roll() is not None
+    assert not staging.exists()
+    assert bundled(archive) == ["s0", "s1", "s2", "s3"]
+    for i in range(4):
+        assert archive.get(f"s{i}") == make_log(i)
+
+
+def test_interrupted_after_index_write_is_cleaned_up(tmp_path):
+    archive = LogArchive(str(tmp_path), stale_s=0)
+    for i in range(3):
+        archive.add(f"s{i}", make_log(i))
+    bundle = archive.roll()
+    # упали после записи индекса, но до удаления rolling/<bundle>: остались копии файлов
+    staging = archive.rolling_dir / bundle
+    staging.mkdir()
+    (staging / "2026-10-19__s0.json").write_text("{}", encoding="utf-8")
+
+    assert archive.roll() is None
+    assert not staging.exists()
+    assert archive.pending_count() == 0
+    assert bundled(archive) == ["s0", "s1", "s2"]
+    assert archive.get("s0") == make_log(0)
+
+
+def test_failed_roll_returns_sessions_to_pending(tmp_path, monkeypatch):
+    archive = LogArchive(str(tmp_path))
+    for i in range(3):
+        archive.add(f"s{i}", make_log(i))
+
+    def broken(bundle, files):
+        (archive.bundles_dir / f"{bundle}.zst").write_bytes(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archive, "_write_bundle", broken)
+    with pytest.raises(OSError):
+        archive.roll()
+    assert archive.pending_count() == 3
+    assert list(archive.rolling_dir.iterdir()) == []
+    assert list(archive.bundles_dir.iterdir()) == []
+
+    monkeypatch.undo()
+    assert archive.roll() is not None
+    assert bundled(archive) == ["s0", "s1", "s2"]
+
+
+def test_concurrent_rolls_claim_each_session_once(tmp_path):
+    archives = [LogArchive(str(tmp_path), dict_size=4096) for _ in range(3)]
+    added = 90
+    errors = []
+
+    def writer() -> None:
+        for i in range(added):
+            archives[0].add(f"s{i}", make_log(i))
+
+    def roller(archive: LogArchive, stop: threading.Event) -> None:
+        try:
+            while not stop.is_set():
+                archive.roll()
+        except Exception as e:
+            errors.append(e)
+
+    stop = threading.Event()
+    rollers = [threading.Thread(target=roller, args=(a, stop)) for a in archives]
+    for t in rollers:
+        t.start()
+    writer()
+    stop.set()
+    for t in rollers:
+        t.join()
+    archives[0].roll()
+
+    assert errors == []
+    entries = archives[0].find()
+    assert sorted(e.session_id for e in entries) == sorted(f"s{i}" for i in range(added))
+    assert all(e.bundle for e in entries)
+    for i in range(0, added, 7):
+        assert archives[1].get(f"s{i}") == make_log(i)
+
+
+def test_background_roller(tmp_path):
+    archive = LogArchive(str(tmp_path), bundle_size=2, poll_s=0.01).start()
+    try:
+        archive.add("a", make_log(0))
+        archive.add("b", make_log(1))
+        for _ in range(500):
+            if archive.pending_count() == 0:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        archive.stop()
+    assert bundled(archive) == ["a", "b"]
+    assert archive.last_error is None
+
+
+def test_finalize_moves_log_from_store_to_archive(tmp_path):
+    store = open_store(f"sqlite:{tmp_path / 'logs.db'}")
+    archive = LogArchive(str(tmp_path / "archive"))
+    log = make_log(0)
+    try:
+        logger = InterviewLogger(store=store, session_id="s0", archive=archive)
+        logger.start(log.participant_name, meta={})
+        logger.finalize(log.final_feedback)
+        assert store.get("s0") is None
+        assert archive.get("s0").final_feedback == log.final_feedback
+        assert logger.last_error is None
+    finally:
+        store.close()
+
+
+def test_finalize_keeps_log_in_store_when_archive_fails(tmp_path, monkeypatch):
+    store = open_store(f"sqlite:{tmp_path / 'logs.db'}")
+    archive = LogArchive(str(tmp_path / "archive"))
+    log = make_log(0)
+
+    def broken(session_id, log, date=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archive, "add", broken)
+    try:
+        logger = InterviewLogger(store=store, session_id="s0", archive=archive)
+        logger.start(log.participant_name, meta={})
+        logger.finalize(log.final_feedback)
+        assert store.get("s0").final_feedback == log.final_feedback
+        assert "disk full" in logger.last_error
+    finally:
+        store.close()
+    assert archive.pending_count() == 0
@@ -0,0 +1,143 @@
+"""
+Дедлайн, хедж и запасной вариант generate_within_budget / agenerate_within_budget на медленной заглушке LLM.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+import pytest
+
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.llm.base import Message
+from interview_coach.llm.budget import LatencyBudget, agenerate_within_budget, generate_within_budget
+from interview_coach.memory import Memory
+from interview_coach.question_bank import QUESTIONS
+
+MESSAGES = [Message(role="user", content="Переформулируй вопрос")]
+
+
+class ScriptedLLM:
+    """i-й вызов ждёт script[i][0] секунд и возвращает script[i][1] (или поднимает его, если это исключение)"""
+
+    def __init__(self, script: List[Tuple[float, Union[str, Exception]]]):
+        self.script = script
+        self.started: List[float] = []
+        self._lock = threading.Lock()
+
+    def generate(self, messages: List[Message], temperature: float = 0.2, deadline: Optional[float] = None) -> str:
+        with self._lock:
+            i = len(self.started)
+            self.started.append(time.monotonic())
+        delay, result = self.script[min(i, len(self.script) - 1)]
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def warmed(turn_budget_s: float, observed_s: float = 0.05) -> LatencyBudget:
+    """бюджет с накопленными замерами: хедж — через observed_s"""
+    return LatencyBudget(turn_budget_s=turn_budget_s, min_samples=10, latencies=[observed_s] * 10)
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_hedge_fires_after_percentile_and_faster_reply_wins(executor):
+    llm = ScriptedLLM([(0.5, "медленный?"), (0.01, "хедж?")])
+    budget = warmed(turn_budget_s=2.0, observed_s=0.05)
+    t0 = time.monotonic()
+    text = generate_within_budget(llm, MESSAGES, executor, budget)
+    assert text == "хедж?"
+    assert len(llm.started) == 2
+    # хедж ушел не раньше перцентиля и задолго до ответа первого запроса
+    assert 0.05 <= llm.started[1] - t0 < 0.3
+    assert budget.hedged == 1 and budget.failed == 0
+    assert time.monotonic() - t0 < 0.4
+
+
+def test_first_result_wins_over_hedge(executor):
+    llm = ScriptedLLM([(0.1, "первый?"), (0.5, "хедж?")])
+    budget = warmed(turn_budget_s=2.0, observed_s=0.05)
+    t0 = time.monotonic()
+    assert generate_within_budget(llm, MESSAGES, executor, budget) == "первый?"
+    assert budget.hedged == 1
+    assert time.monotonic() - t0 < 0.4
+
+
+def test_no_hedge_without_samples(executor):
+    llm = ScriptedLLM([(0.1, "ответ?")])
+    budget = LatencyBudget(turn_budget_s=2.0)
+    assert generate_within_budget(llm, MESSAGES, executor, budget) == "ответ?"
+    assert len(llm.started) == 1 and budget.hedged == 0
+    assert len(budget.latencies) == 1
+
+
+def test_fast_failure_is_retried_without_waiting_for_hedge(executor):
+    llm = ScriptedLLM([(0.0, RuntimeError("503")), (0.01, "повтор?")])
+    budget = warmed(turn_budget_s=2.0, observed_s=1.0)
+    t0 = time.monotonic()
+    assert generate_within_budget(llm, MESSAGES, executor, budget) == "повтор?"
+    assert budget.retried == 1 and budget.hedged == 0
+    assert llm.started[1] - t0 < 0.5
+
+
+def test_budget_runs_out_returns_none_and_records_censored_sample(executor):
+    llm = ScriptedLLM([(0.5, "поздно?")])
+    budget = warmed(turn_budget_s=0.15, observed_s=0.05)
+    t0 = time.monotonic()
+    assert generate_within_budget(llm, MESSAGES, executor, budget, stage="test") is None
+    assert time.monotonic() - t0 < 0.3
+    # исходный запрос + хедж, оба не успели
+    assert len(llm.started) == 2
+    assert budget.failed == 1
+    assert list(budget.violations)[-1]["stage"] == "test"
+    assert list(budget.latencies)[-1] == budget.turn_budget_s
+
+
+def test_all_requests_fail_returns_none(executor):
+    llm = ScriptedLLM([(0.0, RuntimeError("down"))])
+    budget = LatencyBudget(turn_budget_s=2.0)
+    t0 = time.monotonic()
+    assert generate_within_budget(llm, MESSAGES, executor, budget) is None
+    assert len(llm.started) == budget.max_requests
+    assert budget.failed == 1 and len(budget.violations) == 0
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_exhausted_budget_returns_none_immediately(executor):
+    llm = ScriptedLLM([(0.3, "поздно?")])
+    budget = LatencyBudget(turn_budget_s=0.0)
+    t0 = time.monotonic()
+    assert generate_within_budget(llm, MESSAGES, executor, budget) is None
+    assert time.monotonic() - t0 < 0.1
+    assert budget.failed == 1 and len(budget.violations) == 1
+
+
+def test_async_hedge_and_fallback(executor):
+    async def main() -> Tuple[Optional[str], Optional[str]]:
+        hedged = await agenerate_within_budget(
+            ScriptedLLM([(0.5, "медленный?"), (0.01, "хедж?")]), MESSAGES, executor, warmed(2.0, 0.05)
+        )
+        late = await agenerate_within_budget(ScriptedLLM([(0.5, "поздно?")]), MESSAGES, executor, warmed(0.1, 0.05))
+        return hedged, late
+
+    assert asyncio.run(main()) == ("хедж?", None)
+
+
+def test_observer_falls_back_to_bank_question():
+    budget = LatencyBudget(turn_budget_s=0.1)
+    observer = ObserverAgent(llm=ScriptedLLM([(0.5, "Переформулированный вопрос?")]), budget=budget)
+    memory = Memory(selection_seed=1)
+    profile = {"participant_name": "a", "position": "Backend Developer", "target_grade": "Junior", "experience": "1 год"}
+    plan = observer.analyze_turn(profile, memory, None, "Привет, я бэкенд-разработчик")
+    assert plan.plan["next_question"] in {q.text for q in QUESTIONS}
+    assert "llm=fallback" in plan.internal_note
@@ -0,0 +1,175 @@
+"""
+Кассеты LLM (cassette.py): strict/fuzzy сопоставление, порядок повторных ответов, раздача по сессиям,
+дубли одного вызова (хедж) и воспроизводимость параллельных сессий.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pytest
+
+from interview_coach.llm.base import Message, llm_call, session_scope
+from interview_coach.llm.cassette import CassetteMiss, RecordingLLM, ReplayLLM
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.question_bank import QUESTIONS_BY_ID
+from interview_coach.schemas import CandidateProfile
+from interview_coach.scripts.load_test import ANSWER_KINDS
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+
+class CountingLLM:
+    """каждый ответ уникален: по нему видно, какой по счету вызов его породил"""
+
+    def __init__(self):
+        self._n = itertools.count(1)
+
+    def generate(self, messages: List[Message], temperature: float = 0.2, deadline: Optional[float] = None) -> str:
+        return f"Ответ №{next(self._n)} на «{messages[-1].content[:40]}»?"
+
+
+def prompt(text: str, system: str = "Ты интервьюер.") -> List[Message]:
+    return [Message("system", system), Message("user", text)]
+
+
+LONG = "Переформулируй вопрос про индексы в PostgreSQL для кандидата уровня Middle, кратко и вежливо"
+
+
+def test_strict_replay_and_miss(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    rec = RecordingLLM(CountingLLM(), path)
+    a = rec.generate(prompt("вопрос A"))
+    b = rec.generate(prompt("вопрос B"))
+
+    replay = ReplayLLM(path)
+    # пробелы и переносы в шаблонах не меняют ключ
+    assert replay.generate(prompt("вопрос   B\n")) == b
+    assert replay.generate(prompt("вопрос A")) == a
+    with pytest.raises(CassetteMiss):
+        replay.generate(prompt("вопрос C"))
+    with pytest.raises(CassetteMiss):
+        replay.generate(prompt("вопрос A"), temperature=0.7)
+    assert replay.stats() == {"prompts": 2, "exact": 2, "fuzzy": 0, "miss": 2}
+
+
+def test_fuzzy_matches_close_prompt_only(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    reply = RecordingLLM(CountingLLM(), path).generate(prompt(LONG))
+
+    replay = ReplayLLM(path, match="fuzzy", min_similarity=0.8)
+    assert replay.generate(prompt(LONG + " пожалуйста")) == reply
+    with pytest.raises(CassetteMiss):
+        replay.generate(prompt("Расскажи про сборщик мусора в Python"))
+    with pytest.raises(CassetteMiss):
+        replay.generate(prompt(LONG + " пожалуйста"), temperature=0.9)
+    assert replay.stats()["fuzzy"] == 1 and replay.stats()["miss"] == 2
+    # strict ту же близкую формулировку не принимает
+    with pytest.raises(CassetteMiss):
+        ReplayLLM(path).generate(prompt(LONG + " пожалуйста"))
+    with pytest.raises(ValueError):
+        ReplayLLM(path, match="nearest")
+
+
+def test_repeated_prompt_replays_in_recorded_order(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    rec = RecordingLLM(CountingLLM(), path)
+    recorded = [rec.generate(prompt("тот же вопрос")) for _ in range(3)]
+    replay = ReplayLLM(path)
+    # по кругу: после последнего — снова первый
+    assert [replay.generate(prompt("тот же вопрос")) for _ in range(4)] == recorded + recorded[:1]
+
+
+def test_sessions_get_their_own_sequences(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    rec = RecordingLLM(CountingLLM(), path)
+    recorded: Dict[str, List[str]] = {"s1": [], "s2": []}
+    # при записи сессии чередовались: s1, s2, s1, s2
+    for sid in ("s1", "s2", "s1", "s2"):
+        with session_scope(sid):
+            recorded[sid].append(rec.generate(prompt("общий вопрос")))
+
+    replay = ReplayLLM(path)
+    got: Dict[str, List[str]] = {"s1": [], "s2": []}
+    # при воспроизведении — другой порядок, а последовательность каждой сессии та же
+    for sid in ("s2", "s2", "s1", "s1"):
+        with session_scope(sid):
+            got[sid].append(replay.generate(prompt("общий вопрос")))
+    assert got == recorded
+
+
+def test_hedge_duplicates_share_one_record(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    rec = RecordingLLM(CountingLLM(), path)
+    token = llm_call.set(101)
+    try:
+        first = rec.generate(prompt("вопрос"))
+        rec.generate(prompt("вопрос"))  # хедж того же вызова
+    finally:
+        llm_call.reset(token)
+    assert rec.recorded == 1
+
+    second = rec.generate(prompt("вопрос"))
+    replay = ReplayLLM(path)
+    token = llm_call.set(7)
+    try:
+        # оба дубля вызова получают один ответ, курсор не сдвигается
+        assert replay.generate(prompt("вопрос")) == first
+        assert replay.generate(prompt("вопрос")) == first
+    finally:
+        llm_call.reset(token)
+    assert replay.generate(prompt("вопрос")) == second
+
+
+def test_expired_deadline_is_a_timeout(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    RecordingLLM(CountingLLM(), path).generate(prompt("вопрос"))
+    with pytest.raises(TimeoutError):
+        ReplayLLM(path).generate(prompt("вопрос"), deadline=0.0)
+
+
+def run_sessions(llm, sids: List[str], workers: int) -> Dict[str, List[str]]:
+    """интервью параллельно; вернуть реплики интервьюера по сессиям"""
+    observer = ObserverAgent(llm=llm)
+
+    def one(sid: str) -> List[str]:
+        idx = int(sid[1:])
+        orch = Orchestrator(
+            router=RouterAgent(),
+            observer=observer,
+            interviewer=InterviewerAgent(),
+            hiring_manager=HiringManagerAgent(),
+            logger=InterviewLogger(path="/dev/null", session_id=sid),
+            memory=Memory(selection_seed=idx),
+        )
+        profile = CandidateProfile(participant_name=sid, position="Backend Developer", target_grade="Middle", experience="")  # type: ignore
+        rnd = random.Random(idx)
+        replies = [orch.start(profile)]
+        for _ in range(6):
+            q = orch.last_question
+            answer = ANSWER_KINDS[rnd.choice(["correct", "partial"])](QUESTIONS_BY_ID.get(q.qid) if q else None, rnd)
+            replies.append(orch.handle_user_message(profile, replies[-1], answer))
+        return replies
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(sids, pool.map(one, sids)))
+
+
+def test_parallel_sessions_replay_identically(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_TURN_BUDGET_S", "30")
+    path = str(tmp_path / "c.jsonl")
+    sids = [f"s{i}" for i in range(8)]
+    recorded = run_sessions(RecordingLLM(CountingLLM(), path), sids, workers=4)
+    assert any("Ответ №" in r for replies in recorded.values() for r in replies)
+
+    for workers, order in ((8, sids), (3, list(reversed(sids)))):
+        replay = ReplayLLM(path)
+        assert run_sessions(replay, order, workers=workers) == recorded
+        assert replay.stats()["miss"] == 0
@@ -0,0 +1,244 @@
+"""
+Перенос сессий между воркерами (cluster.py): сессия, переехавшая посреди интервью, идет так же, как без переезда.
+Сессии детерминированы: seed выбора вопросов и ответы кандидата выводятся из session_id, LLM не используется.
+"""
+from __future__ import annotations
+
+import json
+import random
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pytest
+
+from interview_coach.cluster import Coordinator, SessionWorker, WorkerClient, WorkerError
+from interview_coach.log_store import open_store
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.question_bank import QUESTIONS_BY_ID
+from interview_coach.schemas import CandidateProfile
+from interview_coach.scripts.load_test import ANSWER_KINDS, PERSONAS
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+SESSIONS = 20
+TURNS = 8
+
+
+def _seed(session_id: str) -> int:
+    return zlib.crc32(session_id.encode("utf-8"))
+
+
+def make_factory(store: Any) -> Callable[[str], Orchestrator]:
+    def factory(session_id: str) -> Orchestrator:
+        return Orchestrator(
+            router=RouterAgent(),
+            observer=ObserverAgent(),
+            interviewer=InterviewerAgent(),
+            hiring_manager=HiringManagerAgent(),
+            logger=InterviewLogger(store=store, session_id=session_id),
+            memory=Memory(selection_seed=_seed(session_id)),
+        )
+
+    return factory
+
+
+def profile_for(idx: int) -> CandidateProfile:
+    persona = list(PERSONAS)[idx % len(PERSONAS)]
+    return CandidateProfile(
+        participant_name=f"cluster-{idx}",
+        position="Backend Developer",
+        target_grade=["Junior", "Middle", "Senior"][idx % 3],  # type: ignore
+        experience=f"persona={persona}",
+    )
+
+
+def answers(idx: int) -> Iterator[Callable[[Optional[str]], str]]:
+    """ответы кандидата по очереди; последний — стоп"""
+    rnd = random.Random(idx)
+    persona = PERSONAS[list(PERSONAS)[idx % len(PERSONAS)]]
+    kinds, weights = list(persona), list(persona.values())
+    for _ in range(TURNS):
+        kind = rnd.choices(kinds, weights)[0]
+        yield lambda qid, kind=kind: ANSWER_KINDS[kind](QUESTIONS_BY_ID.get(qid or ""), rnd)
+    yield lambda qid: "Стоп интервью"
+
+
+def play(idx: int, start: Callable[[], str], turn: Callable[[str], Dict[str, Any]], between: Callable[[], None] = lambda: None) -> Dict[str, Any]:
+    """прогнать сессию до конца; between() вызывается после каждого хода"""
+    replies = [start()]
+    qid: Optional[str] = None
+    for answer in answers(idx):
+        result = turn(answer(qid))
+        if result["reply"] is None:
+            return {"replies": replies, "final_feedback": result["final_feedback"]}
+        replies.append(result["reply"])
+        qid = result["question_id"]
+        between()
+    raise AssertionError("session did not stop")
+
+
+def call(worker: SessionWorker, op: str, **args: Any) -> Any:
+    # через JSON, как по сокету: состояние сессии должно переживать сериализацию
+    response = json.loads(json.dumps(worker.handle(json.loads(json.dumps({"op": op, **args})))))
+    assert response["ok"], response["error"]
+    return response["result"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = open_store(f"sqlite:{tmp_path / 'logs.db'}")
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def serve(tmp_path):
+    workers: List[SessionWorker] = []
+
+    def start(name: str, worker_cls: type = SessionWorker, factory: Optional[Callable[[str], Orchestrator]] = None) -> str:
+        address = f"unix:{tmp_path / (name + '.sock')}"
+        worker = worker_cls(address, factory, name=name)
+        threading.Thread(target=worker.serve_forever, daemon=True).start()
+        workers.append(worker)
+        client = WorkerClient(address, timeout_s=5.0)
+        for _ in range(200):
+            try:
+                client.call("ping")
+                break
+            except OSError:
+                threading.Event().wait(0.01)
+        client.close()
+        return address
+
+    yield start
+    for w in workers:
+        w.shutdown()
+
+
+def test_export_import_after_every_turn_matches_uninterrupted_run(store, tmp_path):
+    plain_store = open_store(f"sqlite:{tmp_path / 'plain.db'}")
+    try:
+        for idx in range(SESSIONS):
+            sid = f"seeded-{idx}"
+            plain = SessionWorker("unix:plain", make_factory(plain_store))
+            expected = play(
+                idx,
+                lambda: call(plain, "start", session_id=sid, profile=profile_for(idx).model_dump()),
+                lambda msg: call(plain, "turn", session_id=sid, user_msg=msg),
+            )
+
+            # та же сессия (тот же seed) переезжает между двумя узлами после каждого хода
+            nodes = [SessionWorker("unix:a", make_factory(store)), SessionWorker("unix:b", make_factory(store))]
+            where = [0]
+
+            def move() -> None:
+                src, dst = nodes[where[0]], nodes[1 - where[0]]
+                state = call(src, "export", session_id=sid)
+                assert call(dst, "import", session_id=sid, state=state)
+                assert call(src, "drop", session_id=sid)
+                where[0] = 1 - where[0]
+
+            got = play(
+                idx,
+                lambda: call(nodes[0], "start", session_id=sid, profile=profile_for(idx).model_dump()),
+                lambda msg: call(nodes[where[0]], "turn", session_id=sid, user_msg=msg),
+                move,
+            )
+            assert got == expected, f"session {idx} diverged after moving"
+            assert nodes[0].op_sessions() == nodes[1].op_sessions() == []
+
+            # лог дописывался с обоих узлов: все ходы и финальный отчёт в одном логе
+            plain_log, moved_log = plain_store.get(sid), store.get(sid)
+            assert moved_log is not None and plain_log is not None
+            assert [t.agent_visible_message for t in moved_log.turns] == [t.agent_visible_message for t in plain_log.turns]
+            assert moved_log.final_feedback is not None
+            assert moved_log.final_feedback == plain_log.final_feedback
+    finally:
+        plain_store.close()
+
+
+def test_rebalance_moves_sessions_and_they_finish(store, serve):
+    factory = make_factory(store)
+    coord = Coordinator({"w0": serve("w0", factory=factory), "w1": serve("w1", factory=factory)})
+    extra = serve("extra", factory=factory)
+    try:
+        sids = [f"rebalance-{idx}" for idx in range(SESSIONS)]
+        greetings = {sid: coord.start(sid, profile_for(idx)) for idx, sid in enumerate(sids)}
+        plans = {sid: answers(idx) for idx, sid in enumerate(sids)}
+        qids: Dict[str, Optional[str]] = {sid: None for sid in sids}
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def step() -> None:
+            for sid in sids:
+                if sid in results:
+                    continue
+                r = coord.turn(sid, next(plans[sid])(qids[sid]))
+                if r["reply"] is None:
+                    results[sid] = r
+                else:
+                    qids[sid] = r["question_id"]
+
+        step()
+        moved_in = coord.add_node("extra", extra)
+        assert moved_in > 0
+        assert all(coord.owner(sid) in {"w0", "w1", "extra"} for sid in sids)
+        step()
+        on_w0 = sum(1 for sid in sids if coord.owner(sid) == "w0")
+        assert coord.remove_node("w0") == on_w0
+        assert all(coord.owner(sid) != "w0" for sid in sids)
+        while len(results) < len(sids):
+            step()
+
+        assert all(results[sid]["final_feedback"] is not None for sid in sids)
+        stats = coord.stats()
+        assert stats["failed_moves"] == 0
+        assert set(stats["nodes"]) == {"w1", "extra"}
+        assert sum(s["sessions"] for s in stats["nodes"].values()) == 0
+        assert all(greetings[sid] for sid in sids)
+        for sid in sids:
+            log = store.get(sid)
+            assert log is not None and log.final_feedback is not None and len(log.turns) == TURNS
+    finally:
+        coord.close()
+
+
+class _BrokenImport(SessionWorker):
+    def op_import(self, session_id: str, state: Dict[str, Any]) -> bool:
+        raise RuntimeError("import failed")
+
+
+def test_failed_import_keeps_session_on_source(store, serve):
+    factory = make_factory(store)
+    coord = Coordinator({"w0": serve("w0", factory=factory)})
+    broken = serve("broken", worker_cls=_BrokenImport, factory=factory)
+    try:
+        sids = [f"stuck-{idx}" for idx in range(4)]
+        for idx, sid in enumerate(sids):
+            coord.start(sid, profile_for(idx))
+
+        assert coord.add_node("broken", broken) == 0
+        stats = coord.stats()
+        assert stats["failed_moves"] > 0 and "import failed" in stats["last_error"]
+        assert stats["nodes"]["broken"]["sessions"] == 0
+        # не переехавшие сессии разморожены и продолжаются на источнике
+        assert all(coord.owner(sid) == "w0" for sid in sids)
+        assert all(coord.turn(sid, "Стоп интервью")["final_feedback"] is not None for sid in sids)
+
+        # вывод w0: его сессии идут на единственный оставшийся узел, импорт там не проходит
+        fresh = [f"fresh-{idx}" for idx in range(4)]
+        for idx, sid in enumerate(fresh):
+            coord.start(sid, profile_for(idx))
+        on_w0 = [sid for sid in fresh if coord.owner(sid) == "w0"]
+        assert on_w0
+        with pytest.raises(WorkerError):
+            coord.remove_node("w0")
+        assert all(coord.owner(sid) == "w0" for sid in on_w0)
+        assert all(coord.turn(sid, "Стоп интервью")["final_feedback"] is not None for sid in fresh)
+    finally:
+        coord.close()
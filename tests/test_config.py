@@ -0,0 +1,162 @@
+"""
+Горячая перезагрузка конфигурации (config.py): подмена версии, отказ от невалидной с сохранением прежней,
+ревизия внешнего банка по manifest.json.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from interview_coach.config import DEFAULT_CONFIG, ConfigError, ConfigWatcher
+from interview_coach.question_bank import MANIFEST, BankRevisionError, dump_partitions, load_partition
+
+
+def write_json(path: Path, data) -> None:
+    # новый inode и mtime на каждую запись: подпись stat меняется даже в пределах одного тика часов
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data) if not isinstance(data, str) else data, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def config_path(tmp_path) -> Path:
+    path = tmp_path / "config.json"
+    write_json(path, {"version": "v1", "scoring": {"correct_at": 0.7, "partial_at": 0.3}})
+    return path
+
+
+def test_initial_load_and_unchanged_file(config_path):
+    watcher = ConfigWatcher(str(config_path))
+    assert watcher.current.version == "v1"
+    assert watcher.current.bank.correct_at == 0.7
+    assert watcher.history == ["v1"]
+    assert watcher.check() is False
+    assert watcher.history == ["v1"]
+
+
+def test_invalid_initial_config_raises(tmp_path):
+    path = tmp_path / "config.json"
+    write_json(path, {"scoring": {"correct_at": 0.2, "partial_at": 0.5}})
+    with pytest.raises(ConfigError):
+        ConfigWatcher(str(path))
+
+
+def test_reload_swaps_version(config_path):
+    watcher = ConfigWatcher(str(config_path))
+    before = watcher.current
+    write_json(config_path, {"version": "v2", "router": {"offtopic": ["Погода"]}, "penalties": {"offtopic": 3}})
+    assert watcher.check() is True
+    assert watcher.current.version == "v2"
+    assert watcher.current.router.offtopic == ("погода",)
+    assert watcher.current.penalties.offtopic == 3.0
+    assert watcher.history == ["v1", "v2"]
+    # версия неизменяемая: кто взял старую ссылку, доигрывает с ней
+    assert before.version == "v1"
+
+
+def test_version_defaults_to_content_hash(config_path):
+    write_json(config_path, {"scoring": {"correct_at": 0.8}})
+    watcher = ConfigWatcher(str(config_path))
+    assert len(watcher.current.version) == 12
+    write_json(config_path, {"scoring": {"correct_at": 0.9}})
+    assert watcher.check() is True
+    assert watcher.history[0] != watcher.history[1]
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        "{not json",
+        ["not", "an", "object"],
+        {"version": "v2", "scoring": {"correct_at": "high"}},
+        {"version": "v2", "scoring": {"correct_at": 0.2, "partial_at": 0.5}},
+        {"version": "v2", "router": {"offtopic": []}},
+        {"version": "v2", "penalties": {"hallucination": -1}},
+        {"version": "v2", "bank_dir": "missing"},
+    ],
+)
+def test_invalid_config_keeps_previous(config_path, bad):
+    watcher = ConfigWatcher(str(config_path))
+    before = watcher.current
+    write_json(config_path, bad)
+    assert watcher.check() is False
+    assert watcher.current is before
+    assert watcher.last_error
+    assert watcher.history == ["v1"]
+
+    # исправили — подхватывается, ошибка сброшена
+    write_json(config_path, {"version": "v3"})
+    assert watcher.check() is True
+    assert watcher.current.version == "v3" and watcher.last_error is None
+    assert watcher.history == ["v1", "v3"]
+
+
+def test_missing_file_keeps_previous(config_path):
+    watcher = ConfigWatcher(str(config_path))
+    config_path.unlink()
+    assert watcher.check() is False
+    assert watcher.current.version == "v1" and watcher.last_error
+
+
+def test_manifest_revision_triggers_reload(tmp_path):
+    bank = tmp_path / "bank"
+    dump_partitions(str(bank))
+    path = tmp_path / "config.json"
+    write_json(path, {"version": "v1", "bank_dir": "bank"})
+    watcher = ConfigWatcher(str(path))
+    first = watcher.current
+    manifest = json.loads((bank / MANIFEST).read_text(encoding="utf-8"))
+    assert first.bank.bank_dir == str(bank) and first.bank.revision == manifest["revision"]
+    q_before = first.partition("Backend Developer", "Junior").questions[0]
+
+    # новая ревизия банка в том же каталоге: файл конфигурации не менялся, меняется только манифест
+    junior = bank / "backend" / "Junior.json"
+    items = json.loads(junior.read_text(encoding="utf-8"))
+    items[0]["text"] = "Обновленный вопрос?"
+    write_json(junior, json.dumps(items, ensure_ascii=False))
+    write_json(bank / MANIFEST, {"revision": "rev-2", "strings": manifest["strings"]})
+
+    assert watcher.check() is True
+    assert watcher.current.version == "v1" and watcher.current.bank.revision == "rev-2"
+    assert watcher.history == ["v1", "v1"]
+    assert watcher.current.partition("Backend Developer", "Junior").questions[0].text == "Обновленный вопрос?"
+    # сессия старой версии держит свою партицию; собрать старую ревизию из новых файлов нельзя
+    assert first.partition("Backend Developer", "Junior").questions[0] == q_before
+    with pytest.raises(BankRevisionError):
+        load_partition("Backend Developer", "Middle", replace(first.bank, correct_at=0.66))
+
+
+def test_broken_manifest_keeps_previous(tmp_path):
+    bank = tmp_path / "bank"
+    dump_partitions(str(bank))
+    path = tmp_path / "config.json"
+    write_json(path, {"version": "v1", "bank_dir": "bank"})
+    watcher = ConfigWatcher(str(path))
+    before = watcher.current
+    write_json(bank / MANIFEST, {"strings": None})
+    assert watcher.check() is False
+    assert watcher.current is before and "revision" in watcher.last_error
+
+
+def test_background_thread_picks_up_change(config_path):
+    watcher = ConfigWatcher(str(config_path), poll_s=0.01).start()
+    try:
+        write_json(config_path, {"version": "v2"})
+        deadline = time.monotonic() + 5
+        while watcher.current.version != "v2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    assert watcher.current.version == "v2"
+    assert watcher.history == ["v1", "v2"]
+
+
+def test_config_round_trips_through_json(config_path):
+    current = ConfigWatcher(str(config_path)).current
+    assert type(current).from_dict(json.loads(json.dumps(current.to_dict()))) == current
+    assert type(DEFAULT_CONFIG).from_dict(DEFAULT_CONFIG.to_dict()) == DEFAULT_CONFIG
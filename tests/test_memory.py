@@ -0,0 +1,35 @@
+"""
+Память сессии (memory.py): transcript как обычное свойство поверх context и конструктор из старого формата.
+"""
+from __future__ import annotations
+
+import dataclasses
+
+from interview_coach.memory import Memory
+
+
+def exchanges(n: int):
+    return [{"interviewer": f"Вопрос {i}?", "user": f"Ответ {i}"} for i in range(n)]
+
+
+def test_transcript_is_not_a_field():
+    assert "transcript" not in {f.name for f in dataclasses.fields(Memory)}
+    assert Memory().transcript == []
+
+
+def test_from_transcript_keeps_other_fields():
+    memory = Memory.from_transcript(exchanges(2), selection_seed=5, difficulty=3)
+    assert memory.transcript == exchanges(2)
+    assert (memory.selection_seed, memory.difficulty) == (5, 3)
+
+
+def test_setter_rebuilds_context_and_folds_old_exchanges():
+    memory = Memory()
+    memory.add_exchange("Старый вопрос?", "старый ответ")
+    window = memory.context.max_recent
+    memory.transcript = exchanges(window + 3)
+    # прежняя история заменена, в окне — последние реплики, ранние свернуты в сводку
+    recent = memory.transcript
+    assert 0 < len(recent) <= window and recent == exchanges(window + 3)[-len(recent):]
+    assert memory.context.summary_text() and "Старый вопрос" not in memory.context.summary_text()
+    assert memory.context.max_recent == window
@@ -0,0 +1,77 @@
+"""
+Партиции банка (question_bank.py): вопросы под позицию и грейд, явный признак fallback на весь диапазон грейда
+и его след в meta сессии.
+"""
+from __future__ import annotations
+
+import gc
+import json
+from typing import Any, Dict
+
+import pytest
+
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.question_bank import BankSource, dump_partitions, load_partition, preload_partitions
+from interview_coach.schemas import CandidateProfile
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+
+def start_meta(position: str, grade: str = "Middle") -> Dict[str, Any]:
+    orch = Orchestrator(
+        router=RouterAgent(),
+        observer=ObserverAgent(),
+        interviewer=InterviewerAgent(),
+        hiring_manager=HiringManagerAgent(),
+        logger=InterviewLogger(path="/dev/null", session_id="s"),
+        memory=Memory(selection_seed=0),
+    )
+    orch.start(CandidateProfile(participant_name="p", position=position, target_grade=grade, experience=""))  # type: ignore
+    return orch.logger.log.meta
+
+
+def test_own_questions_no_fallback():
+    part = load_partition("Backend Developer", "Middle")
+    assert not part.position_fallback
+    assert all("backend" in q.positions for q in part.questions)
+    assert "position_fallback" not in start_meta("Backend Developer")
+
+
+@pytest.mark.parametrize("grade", ["Junior", "Middle", "Senior"])
+def test_position_without_questions_falls_back_to_band(grade):
+    part = load_partition("Frontend Developer", grade)
+    # во встроенном банке frontend-вопросов нет: партиция — весь диапазон грейда, и это видно
+    assert part.position_fallback and part.questions
+    assert start_meta("Frontend Developer", grade)["position_fallback"] == {
+        "position": "Frontend Developer", "used": "frontend", "whole_band": True,
+    }
+
+
+def test_unrecognized_position_is_recorded():
+    assert start_meta("Повар")["position_fallback"] == {"position": "Повар", "used": "backend", "whole_band": False}
+
+
+def test_external_bank_partition_is_not_a_fallback(tmp_path):
+    bank = tmp_path / "bank"
+    dump_partitions(str(bank), strings=False)
+    (bank / "frontend").mkdir()
+    items = json.loads((bank / "backend" / "Middle.json").read_text(encoding="utf-8"))
+    (bank / "frontend" / "Middle.json").write_text(json.dumps(items[:2], ensure_ascii=False), encoding="utf-8")
+    part = load_partition("Frontend Developer", "Middle", BankSource(bank_dir=str(bank)))
+    assert not part.position_fallback and len(part.questions) == 2
+
+
+def test_preload_freezes_only_on_request():
+    before = gc.get_freeze_count()
+    preload_partitions(grades=["Junior"])
+    assert gc.get_freeze_count() == before
+    try:
+        preload_partitions(grades=["Junior"], freeze=True)
+        assert gc.get_freeze_count() > before
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,139 @@
+"""
+Пакетный пересчёт отчётов (resummarize.py): пропуск неизменившихся сессий по fingerprint, пересчёт при смене
+банка/порогов, одинаковая статистика без пула и в пуле процессов при битых сессиях.
+"""
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import replace
+from typing import List, Tuple
+
+import pytest
+
+from interview_coach.config import DEFAULT_CONFIG
+from interview_coach.logger import InterviewLogger
+from interview_coach.log_store import open_store
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.question_bank import QUESTIONS_BY_ID
+from interview_coach.resummarize import ReportWriter, resummarize
+from interview_coach.schemas import CandidateProfile, InterviewLog
+from interview_coach.scripts.load_test import ANSWER_KINDS
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+SESSIONS = 6
+
+
+def play(store, idx: int) -> None:
+    orch = Orchestrator(
+        router=RouterAgent(),
+        observer=ObserverAgent(),
+        interviewer=InterviewerAgent(),
+        hiring_manager=HiringManagerAgent(),
+        logger=InterviewLogger(store=store, session_id=f"s{idx}"),
+        memory=Memory(selection_seed=idx),
+    )
+    profile = CandidateProfile(
+        participant_name=f"p{idx}", position="Backend Developer", target_grade=["Junior", "Middle"][idx % 2], experience="",  # type: ignore
+    )
+    rnd = random.Random(idx)
+    msg = orch.start(profile)
+    for _ in range(5):
+        q = orch.last_question
+        kind = rnd.choice(["correct", "partial", "unknown"])
+        msg = orch.handle_user_message(profile, msg, ANSWER_KINDS[kind](QUESTIONS_BY_ID.get(q.qid) if q else None, rnd))
+    assert orch.handle_user_message(profile, msg, "Стоп интервью") is None
+
+
+@pytest.fixture(scope="module")
+def logs(tmp_path_factory) -> List[Tuple[str, InterviewLog]]:
+    store = open_store(f"sqlite:{tmp_path_factory.mktemp('logs') / 'logs.db'}")
+    try:
+        for idx in range(SESSIONS):
+            play(store, idx)
+        return [(sid, store.get(sid)) for sid in sorted(store.session_ids())]
+    finally:
+        store.close()
+
+
+def broken(log: InterviewLog) -> InterviewLog:
+    log = log.model_copy(deep=True)
+    log.meta["session_state"]["evaluations"] = "not a list of evaluations"
+    return log
+
+
+def test_rewrites_only_what_changed(logs, tmp_path):
+    out = str(tmp_path / "reports")
+    first = resummarize(logs, out)
+    assert first == {"seen": SESSIONS, "skipped": 0, "written": SESSIONS, "missing_state": 0, "failed": 0}
+
+    # ничего не изменилось — всё пропускается
+    assert resummarize(logs, out)["skipped"] == SESSIONS
+    # force — пересчитываем всё
+    assert resummarize(logs, out, force=True)["written"] == SESSIONS
+
+    # отчёт удалили руками — манифест его не спасает
+    writer = ReportWriter(out)
+    (writer.dir / "s0.json").unlink()
+    writer.close()
+    again = resummarize(logs, out)
+    assert (again["written"], again["skipped"]) == (1, SESSIONS - 1)
+
+    # изменились входы одной сессии (штрафы версии правил) — пересчитывается только она
+    changed = list(logs)
+    log = changed[1][1].model_copy(deep=True)
+    log.meta["penalties"] = {"offtopic": 9.0, "hallucination": 9.0}
+    changed[1] = (changed[1][0], log)
+    again = resummarize(changed, out)
+    assert (again["written"], again["skipped"]) == (1, SESSIONS - 1)
+
+
+def report(out: str, sid: str) -> dict:
+    writer = ReportWriter(out)
+    try:
+        return json.loads((writer.dir / f"{sid}.json").read_text(encoding="utf-8"))
+    finally:
+        writer.close()
+
+
+def test_new_bank_thresholds_rescore_everything(logs, tmp_path):
+    out = str(tmp_path / "reports")
+    resummarize(logs, out)
+    before = {sid: report(out, sid) for sid, _ in logs}
+
+    strict = replace(DEFAULT_CONFIG, bank=replace(DEFAULT_CONFIG.bank, correct_at=0.99, partial_at=0.98))
+    assert resummarize(logs, out, config=strict)["written"] == SESSIONS
+    after = {sid: report(out, sid) for sid, _ in logs}
+    # ответы переоценены по новым порогам, а не взяты из сессии
+    assert any(after[sid]["final_feedback"] != before[sid]["final_feedback"] for sid in before)
+    assert all(after[sid]["inputs_fingerprint"] != before[sid]["inputs_fingerprint"] for sid in before)
+    assert resummarize(logs, out, config=strict)["skipped"] == SESSIONS
+
+
+def test_sessions_without_state_are_counted(logs, tmp_path):
+    unfinished = InterviewLog(participant_name="x")
+    stats = resummarize(list(logs) + [("unfinished", unfinished)], str(tmp_path / "reports"))
+    assert stats["missing_state"] == 1 and stats["seen"] == SESSIONS
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_bad_session_is_counted_not_fatal(logs, tmp_path, workers):
+    bad = list(logs)
+    bad[2] = (bad[2][0], broken(bad[2][1]))
+    out = str(tmp_path / "reports")
+    stats = resummarize(bad, out, workers=workers)
+    assert stats == {"seen": SESSIONS, "skipped": 0, "written": SESSIONS - 1, "missing_state": 0, "failed": 1}
+    # битая сессия не записана и при следующем прогоне пробуется снова
+    assert resummarize(bad, out, workers=workers)["failed"] == 1
+
+
+def test_pool_and_serial_write_same_reports(logs, tmp_path):
+    resummarize(logs, str(tmp_path / "serial"), workers=0)
+    resummarize(logs, str(tmp_path / "pool"), workers=1, max_in_flight=2)
+    for sid, _ in logs:
+        assert report(str(tmp_path / "serial"), sid) == report(str(tmp_path / "pool"), sid)
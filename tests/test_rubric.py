@@ -0,0 +1,98 @@
+"""
+Скомпилированная рубрика (rubric.py) против прежней оценки подстроками expected_points.
+"""
+from __future__ import annotations
+
+import random
+import re
+from typing import Any, Dict, List
+
+import pytest
+
+from interview_coach.question_bank import QUESTIONS
+from interview_coach.rubric import Rubric, RubricPoint, compile_rubric
+from interview_coach.scoring import score_answer
+
+
+def legacy_score(answer: str, expected_points: List[str]) -> Dict[str, Any]:
+    """оценка до компилированных рубрик: каждый expected_point — подстрока нормализованного ответа"""
+    t = re.sub(r"\s+", " ", answer.strip().lower())
+    if any(re.search(p, t) for p in ["не знаю", "не уверен", "затрудняюсь", "без понятия"]):
+        return {"label": "unknown", "coverage": 0.0, "matched": [], "missing": expected_points}
+    matched = [p for p in expected_points if p.lower() in t]
+    coverage = 0.0 if not expected_points else len(matched) / len(expected_points)
+    if coverage >= 0.65:
+        label = "correct"
+    elif coverage >= 0.30:
+        label = "partial"
+    else:
+        label = "wrong"
+    return {"label": label, "coverage": coverage, "matched": matched, "missing": [p for p in expected_points if p not in matched]}
+
+
+FIXED_ANSWERS = [
+    "",
+    "   ",
+    "Не знаю.",
+    "Честно,  НЕ   знаю",
+    "Без понятия, не сталкивался.",
+    "list и dict изменяемые, tuple неизменяемый, set хранит уникальные элементы, dict — по ключу",
+    "LIST, Dict,\tSET\n\ntuple",
+    "iterable -> iter() -> iterator, __iter__ и __next__, в конце StopIteration",
+    "for x in iterable",
+    "неизменяемый",  # "изменяем" внутри "неизменяем": засчитываются оба
+    "Кстати, какая у вас сегодня погода?",
+]
+
+
+def generated_answers(n: int = 400, seed: int = 7) -> List[tuple]:
+    """ответы из пунктов, эталонов и шума; регистр и пробелы — случайные"""
+    rnd = random.Random(seed)
+    noise = ["ну", "вот", "например", "и", "то есть", "не знаю", "  ", "\n", "—", ","]
+    cases = []
+    for _ in range(n):
+        q = rnd.choice(QUESTIONS)
+        parts = rnd.sample(q.expected_points, rnd.randint(0, len(q.expected_points)))
+        parts += rnd.sample(noise, rnd.randint(0, 3))
+        if rnd.random() < 0.3:
+            ref = q.reference_answer
+            cut = rnd.randint(0, len(ref))
+            parts.append(ref[:cut])
+        rnd.shuffle(parts)
+        sep = rnd.choice([" ", "  ", ", ", "\t", ""])
+        text = sep.join(p.upper() if rnd.random() < 0.2 else p for p in parts)
+        cases.append((q, text))
+    return cases
+
+
+CASES = [(q, a) for q in QUESTIONS for a in FIXED_ANSWERS] + generated_answers()
+
+
+@pytest.mark.parametrize("question,answer", CASES)
+def test_compiled_matches_legacy(question, answer):
+    assert score_answer(answer, question.expected_points) == legacy_score(answer, question.expected_points)
+
+
+NEGATION_RUBRIC = Rubric(
+    points=(
+        RubricPoint(name="индекс", synonyms=("индекс",), required=True),
+        RubricPoint(name="ленивые вычисления", synonyms=("ленивый",)),
+        RubricPoint(name="кэш", stems=("кэш", "cache")),
+    ),
+    negations=("не", "нет"),
+)
+
+
+@pytest.mark.parametrize(
+    "answer,matched",
+    [
+        ("используем индекс и кэш", ["индекс", "кэш"]),
+        ("индекса нет, но есть cache", ["индекс", "кэш"]),
+        ("не индекс, а ленивая загрузка", ["ленивые вычисления"]),
+        ("нет кэша", []),
+        ("ленивых итераторов нет", ["ленивые вычисления"]),
+        ("неиндексированный", []),
+    ],
+)
+def test_negation_rubric(answer, matched):
+    assert compile_rubric(NEGATION_RUBRIC).score(answer)["matched"] == matched
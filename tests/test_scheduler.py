@@ -0,0 +1,189 @@
+"""
+Планировщик ходов (scheduler.py): очередь по кругу между сессиями, приоритет живых ходов, admission control,
+деградация под нагрузкой.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, List
+
+import pytest
+
+from interview_coach.scheduler import BATCH, INTERACTIVE, Overloaded, TurnScheduler, schedule_turn
+
+
+class Gate:
+    """занимает воркер, пока тест не откроет ворота: очередь за это время набирается целиком"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, degraded: bool) -> str:
+        self.started.set()
+        assert self.release.wait(5)
+        return "gate"
+
+
+@pytest.fixture
+def one_worker():
+    scheduler = TurnScheduler(workers=1, max_queue=64, shed_wait_s=60)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def block(scheduler: TurnScheduler) -> Gate:
+    gate = Gate()
+    scheduler.submit("gate", gate)
+    assert gate.started.wait(5)
+    return gate
+
+
+def recorder(order: List[str], name: str):
+    def fn(degraded: bool) -> str:
+        order.append(name)
+        return name
+
+    return fn
+
+
+def test_sessions_are_served_round_robin(one_worker):
+    gate = block(one_worker)
+    order: List[str] = []
+    futures = []
+    for sid, n in (("a", 3), ("b", 3), ("c", 1)):
+        for i in range(1, n + 1):
+            futures.append(one_worker.submit(sid, recorder(order, f"{sid}{i}")))
+    gate.release.set()
+    for f in futures:
+        f.result(5)
+    # одна сессия не забирает воркер пачкой своих ходов; внутри сессии — порядок отправки
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3", "b3"]
+
+
+def test_interactive_before_batch(one_worker):
+    gate = block(one_worker)
+    order: List[str] = []
+    futures = [one_worker.submit(f"batch{i}", recorder(order, f"batch{i}"), priority=BATCH) for i in range(3)]
+    futures += [one_worker.submit(f"live{i}", recorder(order, f"live{i}"), priority=INTERACTIVE) for i in range(2)]
+    assert one_worker.metrics()["queue_depth_by_class"] == {"interactive": 2, "batch": 3}
+    gate.release.set()
+    for f in futures:
+        f.result(5)
+    assert order == ["live0", "live1", "batch0", "batch1", "batch2"]
+
+
+def test_turns_of_one_session_never_overlap():
+    scheduler = TurnScheduler(workers=4, shed_wait_s=60)
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    order: List[int] = []
+
+    def turn(i: int):
+        def fn(degraded: bool) -> None:
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.005)
+            order.append(i)
+            with lock:
+                active["now"] -= 1
+
+        return fn
+
+    try:
+        futures = [scheduler.submit("s", turn(i)) for i in range(20)]
+        # другие сессии идут параллельно и не мешают
+        others = [scheduler.submit(f"o{i}", lambda d: time.sleep(0.005)) for i in range(8)]
+        for f in futures + others:
+            f.result(5)
+    finally:
+        scheduler.shutdown()
+    assert active["max"] == 1
+    assert order == list(range(20))
+
+
+def test_full_queue_rejects():
+    scheduler = TurnScheduler(workers=1, max_queue=2, shed_wait_s=60)
+    try:
+        gate = block(scheduler)
+        scheduler.submit("a", lambda d: None)
+        scheduler.submit("b", lambda d: None)
+        with pytest.raises(Overloaded):
+            scheduler.submit("c", lambda d: None)
+        assert scheduler.metrics()["rejected"] == 1
+        gate.release.set()
+    finally:
+        scheduler.shutdown()
+    m = scheduler.metrics()
+    assert m["admitted"] == 3 and m["completed"] == 3 and m["queue_depth"] == 0
+
+
+def test_deep_queue_sheds():
+    scheduler = TurnScheduler(workers=1, max_queue=10, shed_depth=2, shed_wait_s=60)
+    seen: List[Any] = []
+    try:
+        gate = block(scheduler)
+        futures = [scheduler.submit(f"s{i}", lambda d, i=i: seen.append((i, d))) for i in range(4)]
+        gate.release.set()
+        for f in futures:
+            f.result(5)
+    finally:
+        scheduler.shutdown()
+    # пока за ходом в очереди ещё >= shed_depth, он выполняется без LLM
+    assert seen == [(0, True), (1, True), (2, False), (3, False)]
+    assert scheduler.metrics()["shed"] == 2
+
+
+def test_long_wait_sheds():
+    scheduler = TurnScheduler(workers=1, shed_wait_s=0.05)
+    try:
+        gate = block(scheduler)
+        waited = scheduler.submit("late", lambda d: d)
+        time.sleep(0.1)
+        gate.release.set()
+        assert waited.result(5) is True
+        assert scheduler.submit("idle", lambda d: d).result(5) is False
+    finally:
+        scheduler.shutdown()
+    assert scheduler.metrics()["wait_max_s"] >= 0.05
+
+
+def test_failure_goes_to_future(one_worker):
+    def boom(degraded: bool) -> None:
+        raise ValueError("bad turn")
+
+    with pytest.raises(ValueError):
+        one_worker.submit("s", boom).result(5)
+    assert one_worker.submit("s", lambda d: "next").result(5) == "next"
+    m = one_worker.metrics()
+    assert m["failed"] == 1 and m["completed"] == 1
+
+
+def test_schedule_turn_disables_llm_when_degraded():
+    class FakeOrchestrator:
+        def handle_user_message(self, profile, interviewer_msg, user_msg, allow_llm=True):
+            return allow_llm
+
+    scheduler = TurnScheduler(workers=1, shed_wait_s=0.0)
+    try:
+        assert schedule_turn(scheduler, "s", FakeOrchestrator(), None, "Вопрос?", "ответ").result(5) is False
+    finally:
+        scheduler.shutdown()
+    relaxed = TurnScheduler(workers=1, shed_wait_s=60)
+    try:
+        assert schedule_turn(relaxed, "s", FakeOrchestrator(), None, "Вопрос?", "ответ").result(5) is True
+    finally:
+        relaxed.shutdown()
+
+
+def test_shutdown_drains_and_refuses_new_turns():
+    scheduler = TurnScheduler(workers=1, shed_wait_s=60)
+    gate = block(scheduler)
+    futures = [scheduler.submit("s", lambda d, i=i: i) for i in range(3)]
+    threading.Timer(0.05, gate.release.set).start()
+    scheduler.shutdown()
+    assert [f.result(0) for f in futures] == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        scheduler.submit("s", lambda d: None)
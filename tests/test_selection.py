@@ -0,0 +1,145 @@
+"""
+Выбор вопросов (selection.py): пулы со swap-remove, без повторов в сессии, воспроизводимость по seed,
+поведение при исчерпании пулов.
+"""
+from __future__ import annotations
+
+import random
+from collections import Counter
+from typing import List, Optional
+
+from interview_coach.question_bank import QUESTIONS, Question
+from interview_coach.selection import QuestionSelector, _Pool
+
+
+def make_questions() -> List[Question]:
+    """по 3 вопроса на (тема, сложность): 4 темы x 5 сложностей"""
+    return [
+        Question(qid=f"{t}-{d}-{i}", topic=t, difficulty=d, text=f"{t} {d} {i}?", expected_points=[])
+        for t in ("sql", "http", "python", "testing")
+        for d in range(1, 6)
+        for i in range(3)
+    ]
+
+
+def run_session(selector: QuestionSelector, turns: int, difficulty: int = 3, preferred: Optional[str] = None) -> List[str]:
+    asked_ids: List[str] = []
+    asked_topics: List[str] = []
+    for _ in range(turns):
+        q = selector.pick(difficulty, asked_ids, asked_topics, preferred_topic=preferred)
+        asked_ids.append(q.qid)
+        asked_topics.append(q.topic)
+    return asked_ids
+
+
+def test_pool_swap_remove_keeps_positions_consistent():
+    qs = make_questions()[:6]
+    pool = _Pool()
+    for q in qs + qs[:2]:
+        pool.add(q)  # повторное добавление не дублирует
+    assert len(pool) == 6
+
+    pool.remove(qs[1].qid)  # из середины: на его место встает последний
+    assert [q.qid for q in pool.items] == [qs[0].qid, qs[5].qid, qs[2].qid, qs[3].qid, qs[4].qid]
+    pool.remove(qs[4].qid)  # последний
+    pool.remove("missing")  # нет такого — ничего не делаем
+    pool.remove(qs[1].qid)  # уже удален
+    assert [q.qid for q in pool.items] == [qs[0].qid, qs[5].qid, qs[2].qid, qs[3].qid]
+    assert all(pool.items[i].qid == qid for qid, i in pool.pos.items())
+    assert set(pool.pos) == {q.qid for q in pool.items}
+
+    rnd = random.Random(0)
+    for _ in range(len(pool)):
+        pool.remove(pool.items[rnd.randrange(len(pool))].qid)
+        assert all(pool.items[i].qid == qid for qid, i in pool.pos.items())
+    assert len(pool) == 0 and pool.pos == {}
+
+
+def test_no_repeats_until_bank_is_exhausted():
+    qs = make_questions()
+    for seed in range(20):
+        asked = run_session(QuestionSelector(qs, seed=seed), len(qs))
+        assert len(set(asked)) == len(qs)
+
+
+def test_avoids_topics_of_last_two_questions():
+    qs = make_questions()
+    selector = QuestionSelector(qs, seed=1)
+    asked_ids: List[str] = []
+    asked_topics: List[str] = []
+    for _ in range(12):
+        q = selector.pick(3, asked_ids, asked_topics)
+        assert q.topic not in asked_topics[-2:]
+        assert abs(q.difficulty - 3) <= 1
+        asked_ids.append(q.qid)
+        asked_topics.append(q.topic)
+
+
+def test_preferred_topic_wins_while_it_has_questions():
+    qs = make_questions()
+    asked = run_session(QuestionSelector(qs, seed=2), 9, difficulty=3, preferred="sql")
+    # окно сложности 2..4 — 9 вопросов по sql, потом тема кончается
+    assert all(qid.startswith("sql-") for qid in asked)
+    nxt = run_session(QuestionSelector(qs, seed=2, asked_ids=asked), 1, difficulty=3, preferred="sql")
+    assert not nxt[0].startswith("sql-")
+
+
+def test_same_seed_same_sequence():
+    qs = make_questions()
+    a = run_session(QuestionSelector(qs, seed=42), 30)
+    b = run_session(QuestionSelector(qs, seed=42), 30)
+    assert a == b
+    assert len({tuple(run_session(QuestionSelector(qs, seed=s), 30)) for s in range(5)}) > 1
+
+
+def test_state_rollback_repeats_pick():
+    qs = make_questions()
+    selector = QuestionSelector(qs, seed=7)
+    state = selector.getstate()
+    first = selector.pick(3, [], [])
+    selector.setstate(state)
+    assert selector.pick(3, [], []) is first
+    # без seed — глобальный random, состояния нет
+    assert QuestionSelector(qs).getstate() is None
+
+
+def test_resume_from_asked_ids_matches_uninterrupted():
+    qs = make_questions()
+    full = QuestionSelector(qs, seed=3)
+    asked = run_session(full, 10)
+    state = full.getstate()
+
+    resumed = QuestionSelector(qs, seed=3, asked_ids=asked)
+    resumed.setstate(state)
+    topics = [qid.split("-")[0] for qid in asked]
+    assert resumed.pick(3, asked, topics).qid == full.pick(3, asked, topics).qid
+
+
+def test_exhausted_window_falls_back_to_remaining_then_whole_bank():
+    qs = make_questions()
+    window = [q.qid for q in qs if q.difficulty in (4, 5)]
+    selector = QuestionSelector(qs, seed=5, asked_ids=window)
+    # окно 4..6 пусто — берем любой оставшийся
+    q = selector.pick(5, window, [])
+    assert q.difficulty <= 3
+
+    everything = [q.qid for q in qs]
+    selector = QuestionSelector(qs, seed=5, asked_ids=everything)
+    picks = Counter(selector.pick(3, everything, []).qid for _ in range(50))
+    # вопросы кончились — повтор из всего банка, а не ошибка
+    assert set(picks) <= set(everything) and len(picks) > 1
+
+
+def test_only_recent_topics_left_in_window():
+    qs = make_questions()
+    keep = {"sql", "http"}
+    asked = [q.qid for q in qs if q.topic not in keep]
+    selector = QuestionSelector(qs, seed=9, asked_ids=asked)
+    # в окне остались только темы двух последних вопросов — повторяем тему, но вопрос новый
+    q = selector.pick(3, asked, ["sql", "http"])
+    assert q.topic in keep and q.qid not in asked
+
+
+def test_builtin_bank_session_has_no_repeats():
+    asked = run_session(QuestionSelector(QUESTIONS, seed=11), len(QUESTIONS), difficulty=2)
+    assert len(set(asked)) == len(QUESTIONS)
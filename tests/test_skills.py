@@ -0,0 +1,135 @@
+"""
+Навыки кандидатов между сессиями (skills.py): SQLite + LRU-кэш, сверка кэша с базой, TTL, warm start.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from interview_coach.logger import InterviewLogger
+from interview_coach.memory import Memory
+from interview_coach.orchestrator import Orchestrator
+from interview_coach.schemas import CandidateProfile
+from interview_coach.skills import CandidateSkills, SkillStore, candidate_key, warm_start_difficulty
+
+from interview_coach.agents.router import RouterAgent
+from interview_coach.agents.observer import ObserverAgent
+from interview_coach.agents.interviewer import InterviewerAgent
+from interview_coach.agents.hiring_manager import HiringManagerAgent
+
+KEY = candidate_key("Алекс  Иванов", "Backend Developer")
+EVALS = [
+    {"topic": "SQL", "eval": "wrong"},
+    {"topic": "SQL", "eval": "partial"},
+    {"topic": "Python basics", "eval": "correct"},
+]
+
+
+def test_candidate_key_normalizes_name_and_position():
+    assert candidate_key("алекс иванов", "Python backend") == KEY
+
+
+def test_write_reopen_read(tmp_path):
+    path = str(tmp_path / "skills.db")
+    written = SkillStore(path).record_session(KEY, 3, EVALS)
+
+    got = SkillStore(path).get(KEY)
+    assert got == written
+    assert got.difficulty == 3 and got.sessions == 1
+    assert got.topics["SQL"] == {"mastery": 0.25, "seen": 2.0}
+    assert got.weak_topics() == ["SQL"]
+
+
+def test_update_is_not_hidden_by_cached_entry(tmp_path):
+    path = str(tmp_path / "skills.db")
+    reader, writer = SkillStore(path), SkillStore(path)
+    writer.record_session(KEY, 2, EVALS)
+    assert reader.get(KEY).sessions == 1  # теперь профиль в кэше reader
+
+    # другой процесс (здесь — другой экземпляр) обновил профиль
+    writer.record_session(KEY, 4, [{"topic": "SQL", "eval": "correct"}])
+    got = reader.get(KEY)
+    assert got.sessions == 2 and got.difficulty == 4
+    assert got.topics["SQL"]["mastery"] == 0.625
+
+    # удаление в базе тоже видно сквозь кэш
+    writer.put(CandidateSkills(key=KEY, updated_at=0.0))
+    writer.evict_stale()
+    assert reader.get(KEY) is None
+
+
+def test_unchanged_profile_is_served_from_cache(tmp_path, monkeypatch):
+    store = SkillStore(str(tmp_path / "skills.db"))
+    store.record_session(KEY, 2, EVALS)
+    loads = []
+    original = store._load
+    monkeypatch.setattr(store, "_load", lambda key, conn=None: loads.append(key) or original(key, conn))
+    first = store.get(KEY)
+    assert store.get(KEY) is first
+    assert loads == []
+
+
+def test_cache_is_bounded(tmp_path):
+    store = SkillStore(str(tmp_path / "skills.db"), cache_size=2)
+    for i in range(5):
+        store.record_session(f"c{i}|backend", 1, EVALS)
+    assert list(store._cache) == ["c3|backend", "c4|backend"]
+    assert store.get("c0|backend").sessions == 1
+
+
+def test_stale_profile_starts_over(tmp_path):
+    store = SkillStore(str(tmp_path / "skills.db"), ttl_s=3600)
+    store.put(CandidateSkills(key=KEY, difficulty=5, sessions=7, updated_at=time.time() - 7200))
+    assert store.get(KEY) is None
+    fresh = store.record_session(KEY, 2, EVALS)
+    assert fresh.sessions == 1 and fresh.difficulty == 2
+    store.put(CandidateSkills(key="old|backend", updated_at=1.0))
+    assert store.evict_stale() == 1
+
+
+def test_concurrent_record_session_loses_no_update(tmp_path):
+    path = str(tmp_path / "skills.db")
+    stores = [SkillStore(path) for _ in range(3)]
+    per_thread = 20
+
+    def worker(store: SkillStore) -> None:
+        for _ in range(per_thread):
+            store.record_session(KEY, 2, EVALS)
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in stores for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert SkillStore(path).get(KEY).sessions == len(threads) * per_thread
+
+
+def test_warm_start_difficulty_is_clamped_to_grade_band():
+    skills = CandidateSkills(key=KEY, difficulty=5)
+    assert warm_start_difficulty(skills, "Junior") == 3
+    assert warm_start_difficulty(skills, "Senior") == 5
+    assert warm_start_difficulty(CandidateSkills(key=KEY, difficulty=1), "Senior") == 2
+
+
+def test_orchestrator_warm_starts_returning_candidate(tmp_path):
+    store = SkillStore(str(tmp_path / "skills.db"))
+    store.record_session(KEY, 3, EVALS)
+
+    orch = Orchestrator(
+        router=RouterAgent(),
+        observer=ObserverAgent(),
+        interviewer=InterviewerAgent(),
+        hiring_manager=HiringManagerAgent(),
+        logger=InterviewLogger(path=str(tmp_path / "log.json")),
+        memory=Memory(selection_seed=1),
+        skills=store,
+    )
+    orch.start(CandidateProfile(
+        participant_name="Алекс Иванов", position="Python backend", target_grade="Middle", experience="3 года",  # type: ignore
+    ))
+    assert orch.memory.difficulty == 3
+    assert orch.memory.focus_topics == ["SQL"]
+
+    # новый кандидат — старт по грейду
+    orch.start(CandidateProfile(participant_name="Новый", position="Backend Developer", target_grade="Middle", experience=""))  # type: ignore
+    assert orch.memory.difficulty == 2
@@ -0,0 +1,66 @@
+"""
+Потоковая оценка (StreamingTurnScorer, RubricStream): после последнего куска — то же, что оценка всего ответа,
+при любых границах кусков, в том числе внутри ключевого слова.
+"""
+from __future__ import annotations
+
+import random
+from typing import List
+
+from interview_coach.question_bank import QUESTIONS
+from interview_coach.rubric import compile_rubric
+from interview_coach.scoring import StreamingTurnScorer, score_turn
+
+from tests.test_rubric import CASES, NEGATION_RUBRIC, legacy_score
+
+
+def chunkings(text: str, rnd: random.Random) -> List[List[str]]:
+    """разбиения ответа: каждая точка разреза на два куска, по символу и случайные куски"""
+    out = [[text[:i], text[i:]] for i in range(len(text) + 1)]
+    out.append(list(text))
+    for _ in range(5):
+        cuts = sorted(rnd.sample(range(len(text) + 1), min(len(text) + 1, rnd.randint(1, 6))))
+        out.append([text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])])
+    return out
+
+
+def test_streaming_matches_whole_answer_for_every_split():
+    rnd = random.Random(3)
+    for question, answer in CASES[:: 4]:
+        expected = score_turn(answer, question)
+        assert expected["score"] == legacy_score(answer, question.expected_points)
+        for chunks in chunkings(answer, rnd):
+            scorer = StreamingTurnScorer(question)
+            for c in chunks:
+                scorer.feed(c)
+            assert scorer.snapshot() == expected, chunks
+
+
+def test_streaming_keyword_split_across_chunks():
+    question = next(q for q in QUESTIONS if q.qid == "py_for_1")
+    scorer = StreamingTurnScorer(question)
+    for c in ["сначала Stop", "Iter", "ation, потом __ne", "xt__"]:
+        scorer.feed(c)
+    snap = scorer.snapshot()
+    assert {"StopIteration", "__next__", "iter"} <= set(snap["score"]["matched"])
+    assert snap == score_turn("сначала StopIteration, потом __next__", question)
+
+
+def test_unknown_phrase_split_across_chunks():
+    question = QUESTIONS[0]
+    scorer = StreamingTurnScorer(question)
+    for c in ["list, dict. Не ", " зна", "ю, что дальше"]:
+        scorer.feed(c)
+    assert scorer.snapshot()["score"]["label"] == "unknown"
+
+
+def test_negation_rubric_streaming_matches_whole_answer():
+    rnd = random.Random(5)
+    compiled = compile_rubric(NEGATION_RUBRIC)
+    for answer in ["не индекс, а ленивая загрузка", "нет  кэша, но индексы есть", "Не   ленивые, НЕТ cache", "индекс не нужен"]:
+        expected = compiled.score(answer)
+        for chunks in chunkings(answer, rnd):
+            stream = compiled.stream()
+            for c in chunks:
+                stream.feed(c)
+            assert stream.result() == expected, chunks
@@ -0,0 +1,81 @@
+"""
+Таблица строк банка (strings.py): чтение по смещению, одна таблица на путь в процессе,
+вытеснение прежней версии файла и разрешение её смещений по qid.
+"""
+from __future__ import annotations
+
+import os
+import pickle
+
+import pytest
+
+from interview_coach import strings
+from interview_coach.question_bank import QUESTIONS, QUESTIONS_BY_ID, BankSource, dump_partitions, load_partition
+from interview_coach.strings import open_string_table, table_by_digest, write_string_table
+
+
+def rewrite(path: str, texts) -> dict:
+    refs = write_string_table(path, texts)
+    # новая версия файла должна отличаться по mtime даже в пределах одного тика часов
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    return refs
+
+
+def tables_for(path: str) -> list:
+    return [k for k in strings._TABLES if k[0] == os.path.abspath(path)]
+
+
+def test_get_by_ref(tmp_path):
+    path = str(tmp_path / "strings.bin")
+    refs = write_string_table(path, ["альфа", "бета", "альфа"])
+    table = open_string_table(path)
+    assert len(refs) == 2 and {table.get(r) for r in refs.values()} == {"альфа", "бета"}
+    assert open_string_table(path) is table
+    with pytest.raises(KeyError):
+        table.get(0)
+
+
+def test_new_version_evicts_previous(tmp_path):
+    path = str(tmp_path / "strings.bin")
+    rewrite(path, ["один"])
+    old = open_string_table(path)
+    refs = rewrite(path, ["два", "три"])
+    new = open_string_table(path)
+
+    assert [strings._TABLES[k] for k in tables_for(path)] == [new]
+    assert table_by_digest(old.digest) is None and table_by_digest(new.digest) is new
+    with pytest.raises(ValueError):
+        old.get(len(strings.MAGIC))  # mmap прежней версии закрыт
+    assert new.get(refs["три"]) == "три"
+    # в другой процесс старую таблицу уже не передать: файл другой
+    with pytest.raises(ValueError):
+        pickle.loads(pickle.dumps(old))
+    assert pickle.loads(pickle.dumps(new)) is new
+
+
+def test_same_content_elsewhere_keeps_digest(tmp_path):
+    a, b = str(tmp_path / "a.bin"), str(tmp_path / "b.bin")
+    rewrite(a, ["общее"])
+    rewrite(b, ["общее"])
+    ta, tb = open_string_table(a), open_string_table(b)
+    assert ta.digest == tb.digest and table_by_digest(ta.digest) is ta
+    rewrite(a, ["другое"])
+    open_string_table(a)
+    # таблица по другому пути с тем же содержимым остается доступной по digest
+    assert table_by_digest(tb.digest) is tb
+
+
+def test_old_partition_resolves_by_qid_after_rewrite(tmp_path):
+    bank = tmp_path / "bank"
+    dump_partitions(str(bank))
+    part = load_partition("Backend Developer", "Middle", BankSource(bank_dir=str(bank)))
+    q = part.questions[0]
+    assert q.reference_ref is not None and q.reference_text() == QUESTIONS_BY_ID[q.qid].reference_answer
+
+    # банк переписан: смещения старой партиции указывают в другие строки
+    rewrite(str(bank / "strings.bin"), [x.reference_answer for x in reversed(QUESTIONS)])
+    current = open_string_table(str(bank / "strings.bin"))
+    assert current.digest != q.strings_id and [strings._TABLES[k] for k in tables_for(str(bank / "strings.bin"))] == [current]
+    # таблица с прежним digest может быть открыта по другому пути (такой же банк) — иначе эталон по qid
+    assert q.reference_text() == QUESTIONS_BY_ID[q.qid].reference_answer